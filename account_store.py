@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+账号配置存储
+内存中按用户名索引账号；新增账号延迟合并写入（先写临时文件再替换），
+并按修改时间检测 accounts_config.json 的外部修改（包括其他服务进程的保存），自动重新加载
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+from file_lock import locked
+
+# 进程退出时保存所有存储中尚未写入的新增账号（只注册一次退出回调，弱引用不阻止回收已不再使用的存储）
+_stores = weakref.WeakSet()
+_stores_lock = threading.Lock()
+
+
+def _flush_all():
+    with _stores_lock:
+        stores = list(_stores)
+    for store in stores:
+        try:
+            store.flush()
+        except Exception as e:
+            print(f"❌ 保存账号配置失败: {e}")
+
+
+atexit.register(_flush_all)
+
+
+def normalize_accounts(config):
+    """将配置文件内容转换为 {username: account}（支持数组格式和对象格式）"""
+    accounts = config.get('accounts', {})
+    if isinstance(accounts, list):
+        # 数组格式：转换为以username为key的对象格式
+        normalized = {}
+        for account in accounts:
+            username = account.get('username')
+            if username:
+                normalized[username] = {
+                    'username': username,
+                    'password': account.get('password'),
+                    'display_name': account.get('description', username),
+                    'enabled': account.get('active', True)
+                }
+        return normalized
+    return dict(accounts or {})
+
+
+class AccountStore:
+    """
+    账号配置存储
+
+    读取时返回当前账号字典的快照（写入时整体替换，不修改已返回的字典，遍历期间可以安全地并发写入）。
+
+    Args:
+        config_file (str): 账号配置文件路径
+        save_delay (float): 新增账号后延迟保存的秒数（合并短时间内的多次新增），<=0 时立即保存
+        reload_interval (float): 检查配置文件修改时间的最短间隔（秒），<0 时不自动重新加载
+    """
+
+    def __init__(self, config_file, save_delay=2.0, reload_interval=2.0):
+        self.config_file = config_file
+        self.save_delay = save_delay
+        self.reload_interval = reload_interval
+
+        self._accounts = {}
+        self._lock = threading.RLock()
+        self._save_timer = None
+        # 尚未写入文件的新增账号，以及仅在内存中修改的密码（重新加载后保留）
+        self._pending = {}
+        self._password_overrides = {}
+        self._file_signature = None
+        self._last_stat = 0.0
+        # 替换为内存中的账号后不再读写配置文件
+        self.detached = False
+
+        self.version = 0
+        self.reloads = 0
+        self.saves = 0
+
+        with _stores_lock:
+            _stores.add(self)
+
+    # ---- 读取 ----
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """
+        读取配置文件（文件不存在时返回False）
+
+        Returns:
+            bool: 是否成功读取
+        """
+        with self._lock:
+            signature = self._signature()
+            if signature is None:
+                return False
+
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                accounts = normalize_accounts(json.load(f))
+
+            # 保留尚未保存的新增账号和内存中修改的密码
+            for username, account in self._pending.items():
+                accounts.setdefault(username, account)
+            for username, password in self._password_overrides.items():
+                if username in accounts:
+                    accounts[username] = dict(accounts[username], password=password)
+
+            self._accounts = accounts
+            self._file_signature = signature
+            self._last_stat = time.monotonic()
+            self.version += 1
+            return True
+
+    def maybe_reload(self):
+        """配置文件在外部被修改时重新加载（按 reload_interval 限制检查频率）"""
+        if self.detached or self.reload_interval < 0:
+            return False
+        now = time.monotonic()
+        if now - self._last_stat < self.reload_interval:
+            return False
+
+        with self._lock:
+            self._last_stat = now
+            signature = self._signature()
+            if signature is None or signature == self._file_signature:
+                return False
+            try:
+                self.load()
+            except (OSError, ValueError) as e:
+                # 文件正在被编辑或内容无效时保留当前账号，下次再试
+                print(f"⚠️ 重新加载账号配置失败: {e}")
+                self._file_signature = signature
+                return False
+            self.reloads += 1
+            print(f"🔄 账号配置已变化，重新加载了 {len(self._accounts)} 个账号")
+            return True
+
+    @property
+    def accounts(self):
+        self.maybe_reload()
+        return self._accounts
+
+    def replace(self, accounts):
+        """替换为内存中的账号（不读写配置文件）"""
+        with self._lock:
+            self.detached = True
+            self._pending.clear()
+            self._accounts = dict(accounts)
+            self.version += 1
+
+    # ---- 修改 ----
+
+    def add(self, username, account):
+        """新增账号（已存在时返回False），延迟保存到配置文件"""
+        with self._lock:
+            if username in self._accounts:
+                return False
+            accounts = dict(self._accounts)
+            accounts[username] = account
+            self._accounts = accounts
+            self._pending[username] = account
+            self.version += 1
+        self.schedule_save()
+        return True
+
+    def set_password(self, username, password):
+        """仅在内存中修改账号密码，返回是否有变化"""
+        with self._lock:
+            account = self._accounts.get(username)
+            if account is None or account.get('password') == password:
+                return False
+            accounts = dict(self._accounts)
+            accounts[username] = dict(account, password=password)
+            self._accounts = accounts
+            self._password_overrides[username] = password
+            self.version += 1
+            return True
+
+    # ---- 保存 ----
+
+    def schedule_save(self):
+        """延迟保存，合并短时间内的多次新增"""
+        if self.detached:
+            return
+        if self.save_delay <= 0:
+            self.flush()
+            return
+
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._flush_safely)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _flush_safely(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ 保存账号配置失败: {e}")
+
+    def flush(self):
+        """立即保存尚未写入的新增账号，没有需要保存的内容时返回False"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self.detached or not self._pending:
+                return False
+            return self.save()
+
+    def save(self):
+        """将当前账号写入配置文件（先写临时文件再替换），外部修改过的文件先合并再写入"""
+        with self._lock, locked(self.config_file):
+            if self._signature() != self._file_signature and self._file_signature is not None:
+                try:
+                    self.load()
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ 保存前重新读取账号配置失败: {e}")
+
+            directory = os.path.dirname(os.path.abspath(self.config_file))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.accounts_', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'accounts': self._accounts}, f, ensure_ascii=False, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # 保留原文件的权限（临时文件默认只有所有者可读写）
+                if os.path.exists(self.config_file):
+                    os.chmod(temp_path, os.stat(self.config_file).st_mode & 0o777)
+                os.replace(temp_path, self.config_file)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            # 内存中修改的密码随其他账号一并写入了文件
+            self._pending.clear()
+            self._password_overrides.clear()
+            self._file_signature = self._signature()
+            self.saves += 1
+            return True
+
+    def stats(self):
+        return {
+            'accounts': len(self._accounts),
+            'version': self.version,
+            'pending': len(self._pending),
+            'reloads': self.reloads,
+            'saves': self.saves
+        }
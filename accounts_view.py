@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+管理员账号列表视图
+根据账号配置和检查结果构建前端使用的账号列表与统计信息，并缓存序列化结果
+"""
+import hashlib
+import json
+import threading
+from datetime import date, datetime, timedelta
+
+from record_parser import parse_jp_date
+
+# 分页默认值
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# 支持的排序字段（前缀 - 表示降序）
+SORT_FIELDS = ('expiryDate', 'lastCheck', 'username', 'displayName')
+
+
+def parse_iso_timestamp(value):
+    """解析ISO格式时间为时间戳，无法解析时返回None"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def build_account_entry(username, account, cached_info, default_last_check=None):
+    """构建单个账号在前端显示的信息（不包含密码，生成时由后端按用户名读取）"""
+    cached_info = cached_info or {}
+    has_record = cached_info.get('has_riding_record', None)
+    record_info = cached_info.get('info')
+    if not isinstance(record_info, dict):
+        record_info = {}
+    record_details = record_info.get('riding_record_details') or {}
+    last_check = record_info.get('check_time', None)
+
+    # 构建详细的记录信息
+    detailed_record_info = None
+    if record_details:
+        detailed_record_info = {
+            'boardingDate': record_details.get('riding_date'),
+            'expiryDate': record_details.get('expiry_date'),
+            'status': record_details.get('status'),
+            'validityStatus': record_details.get('expiry_status')
+        }
+
+    entry = {
+        'username': username,
+        'displayName': account.get('display_name', username),
+        'enabled': account.get('enabled', True),
+        'hasRecord': has_record,
+        'recordDetails': detailed_record_info,
+        'lastCheck': last_check or default_last_check
+    }
+    return entry
+
+
+def build_accounts_view(accounts, results, default_last_check=None):
+    """
+    构建启用账号的列表和统计信息
+
+    Args:
+        accounts (dict): 账号配置 {username: account}
+        results (dict): 检查结果 {username: {'has_riding_record', 'info'}}
+        default_last_check (str): 没有检查时间时使用的默认值
+
+    Returns:
+        dict: {'accounts': [...], 'statistics': {...}}
+    """
+    account_list = []
+    accounts_with_records = 0
+
+    for username, account in accounts.items():
+        if not account.get('enabled', True):
+            continue
+
+        entry = build_account_entry(username, account, results.get(username), default_last_check)
+        account_list.append(entry)
+        if entry['hasRecord']:
+            accounts_with_records += 1
+
+    enabled_accounts = len(account_list)
+
+    # 计算统计信息
+    success_rate = round((accounts_with_records / enabled_accounts) * 100, 1) if enabled_accounts > 0 else 0
+
+    return {
+        'accounts': account_list,
+        'statistics': {
+            'totalAccounts': enabled_accounts,
+            'enabledAccounts': enabled_accounts,
+            'accountsWithRecords': accounts_with_records,
+            'successRate': success_rate
+        }
+    }
+
+
+class AccountsIndex:
+    """
+    账号列表索引
+
+    构建时为每个账号预先计算筛选和排序所需的字段，并按需缓存
+    (筛选条件, 排序) 对应的有序结果，之后每次分页只需切片，成本与页大小成正比。
+    """
+
+    def __init__(self, accounts, results, today=None):
+        view = build_accounts_view(accounts, results)
+        self.entries = view['accounts']
+        self.statistics = view['statistics']
+        self.today = today or date.today()
+
+        self._expiry = []
+        self._expiry_state = []
+        self._last_check = []
+        for entry in self.entries:
+            expiry = parse_jp_date((entry['recordDetails'] or {}).get('expiryDate'))
+            expiry = expiry.date() if expiry else None
+            self._expiry.append(expiry)
+            if expiry is None:
+                self._expiry_state.append('unknown')
+            else:
+                self._expiry_state.append('valid' if expiry >= self.today else 'expired')
+            self._last_check.append(parse_iso_timestamp(entry['lastCheck']))
+
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def _sort_key(self, field):
+        if field == 'expiryDate':
+            # 没有有效期的账号排在最后
+            return lambda i: (self._expiry[i] is None, self._expiry[i] or date.max)
+        if field == 'lastCheck':
+            return lambda i: (self._last_check[i] is None, self._last_check[i] or 0)
+        if field == 'displayName':
+            return lambda i: self.entries[i]['displayName']
+        return lambda i: self.entries[i]['username']
+
+    def _matches(self, i, has_record, expiry, checked_after, checked_before):
+        entry_has_record = self.entries[i]['hasRecord']
+        if has_record == 'unknown':
+            if entry_has_record is not None:
+                return False
+        elif has_record is not None and bool(entry_has_record) != has_record:
+            return False
+
+        if expiry is not None and self._expiry_state[i] != expiry:
+            return False
+
+        last_check = self._last_check[i]
+        if checked_after is not None and (last_check is None or last_check < checked_after):
+            return False
+        if checked_before is not None and (last_check is not None and last_check >= checked_before):
+            return False
+        return True
+
+    def _ordered(self, has_record, expiry, checked_after, checked_before, sort):
+        """获取（并缓存）满足筛选条件的有序下标列表"""
+        key = (has_record, expiry, checked_after, checked_before, sort)
+        with self._lock:
+            cached = self._views.get(key)
+        if cached is not None:
+            return cached
+
+        indices = [i for i in range(len(self.entries))
+                   if self._matches(i, has_record, expiry, checked_after, checked_before)]
+        if sort:
+            descending = sort.startswith('-')
+            indices.sort(key=self._sort_key(sort.lstrip('-')), reverse=descending)
+
+        with self._lock:
+            # 限制缓存的视图数量
+            if len(self._views) >= 64:
+                self._views.clear()
+            self._views[key] = indices
+        return indices
+
+    def query(self, has_record=None, expiry=None, checked_within_hours=None, stale_after_hours=None,
+              sort=None, offset=0, limit=DEFAULT_PAGE_SIZE, fields=None, now=None):
+        """
+        分页查询账号列表
+
+        Args:
+            has_record: True / False / 'unknown'（未检查）/ None（不筛选）
+            expiry: 'valid' / 'expired' / 'unknown' / None
+            checked_within_hours: 只返回最近N小时内检查过的账号
+            stale_after_hours: 只返回超过N小时未检查（或从未检查）的账号
+            sort: 排序字段，见 SORT_FIELDS，前缀 - 表示降序
+            offset / limit: 分页参数
+            fields: 返回的字段列表，None 表示全部字段（密码不会返回）
+            now: 计算时间条件使用的当前时间戳，默认为当前时间
+
+        Returns:
+            dict: {'accounts', 'statistics', 'pagination'}
+        """
+        # 时间条件按分钟取整，便于复用缓存的视图
+        now_minute = query_minute(now)
+        checked_after = now_minute - checked_within_hours * 3600 if checked_within_hours is not None else None
+        checked_before = now_minute - stale_after_hours * 3600 if stale_after_hours is not None else None
+
+        indices = self._ordered(has_record, expiry, checked_after, checked_before, sort)
+        page = indices[offset:offset + limit]
+
+        if fields is None:
+            fields = list(self.entries[0].keys()) if self.entries else []
+        fields = [field for field in fields if field != 'password']
+
+        accounts = [{field: self.entries[i].get(field) for field in fields} for i in page]
+        next_offset = offset + limit if offset + limit < len(indices) else None
+
+        return {
+            'accounts': accounts,
+            'statistics': self.statistics,
+            'pagination': {
+                'offset': offset,
+                'limit': limit,
+                'total': len(indices),
+                'nextOffset': next_offset
+            }
+        }
+
+
+def query_minute(now=None):
+    """时间条件（checkedWithinHours / staleAfterHours）使用的当前时间，按分钟取整"""
+    return int((now if now is not None else datetime.now().timestamp()) // 60 * 60)
+
+
+def parse_list_query(params):
+    """
+    从请求参数解析分页查询条件；没有任何分页/筛选参数时返回None（返回完整列表）
+
+    支持: limit, offset, hasRecord(true/false/unknown), expiry(valid/expired/unknown),
+          checkedWithinHours, staleAfterHours, sort, fields
+    """
+    keys = ('limit', 'offset', 'hasRecord', 'expiry', 'checkedWithinHours', 'staleAfterHours', 'sort', 'fields')
+    if not any(params.get(key) not in (None, '') for key in keys):
+        return None
+
+    def to_number(key, cast):
+        value = params.get(key)
+        if value in (None, ''):
+            return None
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'参数 {key} 无效: {value}')
+
+    query = {
+        'offset': max(0, to_number('offset', int) or 0),
+        'limit': min(MAX_PAGE_SIZE, max(1, to_number('limit', int) or DEFAULT_PAGE_SIZE)),
+        'checked_within_hours': to_number('checkedWithinHours', float),
+        'stale_after_hours': to_number('staleAfterHours', float)
+    }
+
+    has_record = params.get('hasRecord')
+    if has_record in (None, ''):
+        query['has_record'] = None
+    elif str(has_record).lower() in ('true', '1'):
+        query['has_record'] = True
+    elif str(has_record).lower() in ('false', '0'):
+        query['has_record'] = False
+    elif str(has_record).lower() == 'unknown':
+        query['has_record'] = 'unknown'
+    else:
+        raise ValueError(f'参数 hasRecord 无效: {has_record}')
+
+    expiry = params.get('expiry') or None
+    if expiry not in (None, 'valid', 'expired', 'unknown'):
+        raise ValueError(f'参数 expiry 无效: {expiry}')
+    query['expiry'] = expiry
+
+    sort = params.get('sort') or None
+    if sort is not None and (not isinstance(sort, str) or sort.lstrip('-') not in SORT_FIELDS):
+        raise ValueError(f'参数 sort 无效: {sort}')
+    query['sort'] = sort
+
+    fields = params.get('fields')
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    elif fields is not None and (not isinstance(fields, list) or not all(isinstance(field, str) for field in fields)):
+        raise ValueError(f'参数 fields 无效: {fields}')
+    query['fields'] = fields or None
+
+    return query
+
+
+class AccountsViewCache:
+    """
+    缓存序列化后的账号列表和分页索引
+
+    以 (结果存储版本, 账号配置版本, 日期) 作为缓存键，任一变化时重新构建；
+    同时生成ETag供条件请求使用。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._body = None
+        self._etag = None
+        self._index = None
+        self.hits = 0
+        self.misses = 0
+
+    def _current_key(self, manager):
+        return (manager.results_store.version(), manager.accounts_version, date.today())
+
+    def _refresh(self, manager):
+        key = self._current_key(manager)
+
+        with self._lock:
+            if key == self._key:
+                self.hits += 1
+                return self._body, self._etag, self._index
+
+        index = AccountsIndex(manager.accounts, manager.results_store.get_all())
+        body = json.dumps({'accounts': index.entries, 'statistics': index.statistics},
+                          ensure_ascii=False).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            self.misses += 1
+            self._key, self._body, self._etag, self._index = key, body, etag, index
+        return body, etag, index
+
+    def get(self, manager):
+        """返回完整列表的 (JSON字节串, ETag)"""
+        body, etag, _ = self._refresh(manager)
+        return body, etag
+
+    def get_index(self, manager):
+        """返回分页查询使用的 AccountsIndex 及其ETag"""
+        _, etag, index = self._refresh(manager)
+        return index, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
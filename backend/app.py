@@ -3,41 +3,99 @@
 乘车记录管理系统后端API
 基于Flask的RESTful API服务
 """
-from flask import Flask, request, jsonify, send_from_directory, send_file
+import time
+
+# 启动耗时统计：各阶段（导入、索引前端文件、恢复后台任务等）的秒数
+_startup_began = _startup_mark = time.perf_counter()
+STARTUP_TIMINGS = {}
+
+
+def startup_phase(name):
+    """记录启动阶段耗时（从上一阶段结束到现在）"""
+    global _startup_mark
+    now = time.perf_counter()
+    STARTUP_TIMINGS[name] = round(now - _startup_mark, 4)
+    _startup_mark = now
+
+
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
+import hashlib
+import importlib.util
 import json
 import os
+import queue
 import sys
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
+# 快速启动模式：推迟导入selenium（第一次生成时）、不逐个打印账号列表
+FAST_START = os.getenv('FAST_START', 'false').lower() == 'true'
+
+startup_phase('flask')
+
 # 添加父目录到Python路径以导入乘车记录管理器
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from multi_account_certificate_manager import MultiAccountRidingRecordManager
+    from multi_account_certificate_manager import MultiAccountRidingRecordManager, RESULTS_DIR
+    from job_queue import JOB_QUEUED, JOB_RUNNING, JobQueue
+    from accounts_view import AccountsViewCache, build_accounts_view, parse_list_query, query_minute
+    from metrics import registry as metrics_registry
+    from recheck_scheduler import RecheckPolicy, RecheckScheduler
+    from file_lock import ProcessLease
+    from static_assets import StaticAssets
 except ImportError as e:
     print(f"❌ 无法导入乘车记录管理器: {e}")
     print("请确保 multi_account_certificate_manager.py 文件存在")
     sys.exit(1)
 
-# 尝试导入生成功能（可选）
+startup_phase('core_modules')
+
+# 生成功能（可选，需要selenium）
 GENERATION_AVAILABLE = False
 generate_riding_record = None
-
-try:
-    from headless_automation import generate_riding_record
-    GENERATION_AVAILABLE = True
-    print("✅ 生成功能可用")
-except ImportError as e:
-    print(f"⚠️ 生成功能不可用: {e}")
-    print("💡 如需使用生成功能，请安装 selenium: pip install selenium")
-    GENERATION_AVAILABLE = False
+get_browser_pool = None
+driver_resolver = None
+_generation_loaded = False
+_generation_lock = threading.Lock()
+
+def load_generation():
+    """
+    导入生成功能（headless_automation / selenium），只导入一次
+
+    Returns:
+        bool: 生成功能是否可用
+    """
+    global GENERATION_AVAILABLE, generate_riding_record, get_browser_pool, driver_resolver, _generation_loaded
+    if _generation_loaded:
+        return GENERATION_AVAILABLE
+    with _generation_lock:
+        if not _generation_loaded:
+            try:
+                from headless_automation import driver_resolver, generate_riding_record, get_browser_pool
+                GENERATION_AVAILABLE = True
+                print("✅ 生成功能可用")
+            except ImportError as e:
+                print(f"⚠️ 生成功能不可用: {e}")
+                print("💡 如需使用生成功能，请安装 selenium: pip install selenium")
+                GENERATION_AVAILABLE = False
+            _generation_loaded = True
+    return GENERATION_AVAILABLE
+
+if FAST_START:
+    # 只检查selenium是否已安装，实际导入推迟到第一次生成
+    GENERATION_AVAILABLE = importlib.util.find_spec('selenium') is not None
+    print(f"💤 快速启动：生成功能{'将在第一次生成时加载' if GENERATION_AVAILABLE else '不可用（未安装selenium）'}")
+else:
+    load_generation()
+
+startup_phase('generation')
 
 app = Flask(__name__)
 CORS(app)
@@ -52,31 +110,43 @@ def health_check():
     })
 
 # 静态文件服务（用于Docker部署）
+# 启动时索引前端构建目录；带哈希的文件长期缓存，预压缩的 .br/.gz 按 Accept-Encoding 返回
+FRONTEND_DIST = os.getenv('FRONTEND_DIST', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      'frontend', 'dist'))
+static_assets = StaticAssets(FRONTEND_DIST)
+startup_phase('static_assets')
+
+
+def frontend_not_built():
+    return jsonify({
+        'error': 'Frontend not built',
+        'message': 'Please build the frontend first or use development mode'
+    }), 404
+
+
 @app.route('/')
 def serve_index():
     """提供前端主页"""
-    try:
-        return send_file('../frontend/dist/index.html')
-    except FileNotFoundError:
-        return jsonify({
-            'error': 'Frontend not built',
-            'message': 'Please build the frontend first or use development mode'
-        }), 404
+    entry = static_assets.lookup(StaticAssets.INDEX)
+    if entry is None:
+        return frontend_not_built()
+    return static_assets.response(entry, request, Response)
 
 @app.route('/<path:path>')
 def serve_static(path):
-    """提供前端静态文件"""
-    try:
-        return send_from_directory('../frontend/dist', path)
-    except FileNotFoundError:
-        # 对于SPA路由，返回index.html
-        try:
-            return send_file('../frontend/dist/index.html')
-        except FileNotFoundError:
-            return jsonify({
-                'error': 'Frontend not built',
-                'message': 'Please build the frontend first or use development mode'
-            }), 404  # 允许跨域请求
+    """提供前端静态文件（对于SPA路由返回index.html）"""
+    # 未定义的API路径不回退到index.html，返回JSON 404
+    if path == 'api' or path.startswith('api/'):
+        return jsonify({
+            'success': False,
+            'message': '接口不存在'
+        }), 404
+    entry = static_assets.lookup(path)
+    if entry is None:
+        if not static_assets.built:
+            return frontend_not_built()
+        return jsonify({'error': 'Not found'}), 404
+    return static_assets.response(entry, request, Response)
 
 # 配置 - 从环境变量读取
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'PASSWD')
@@ -85,18 +155,126 @@ HOST = os.getenv('HOST', '0.0.0.0')
 PORT = int(os.getenv('PORT', '8000'))
 DEBUG = os.getenv('DEBUG', 'true').lower() == 'true'
 
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', '2'))
+BATCH_GENERATE_CONCURRENCY = int(os.getenv('BATCH_GENERATE_CONCURRENCY', os.getenv('GENERATION_MAX_CONCURRENCY', '2')))
+JOBS_DIR = os.getenv('JOBS_DIR', os.path.join(RESULTS_DIR, 'jobs'))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '60'))
+RECHECK_ENABLED = os.getenv('RECHECK_ENABLED', 'false').lower() == 'true'
+
 # 全局管理器实例
 manager = None
 manager_lock = threading.Lock()
 
+# 管理员账号列表缓存（结果或账号配置变化时失效）
+accounts_view_cache = AccountsViewCache()
+
+# 后台任务队列（生成/检查所有账号在线程池中执行）
+job_queue = JobQueue(JOBS_DIR, max_workers=JOB_MAX_WORKERS,
+                     heartbeat_interval=max(1.0, JOB_STALE_SECONDS / 6), stale_after=JOB_STALE_SECONDS)
+startup_phase('job_queue')
+
+def warm_browser_pool():
+    """后台探测ChromeDriver（结果缓存，之后启动浏览器不再探测），并预热浏览器池（BROWSER_POOL_SIZE>0 时）"""
+    try:
+        driver_resolver.resolve()
+    except Exception as e:
+        print(f"⚠️ ChromeDriver 探测失败: {e}")
+        return
+    try:
+        pool = get_browser_pool()
+        if pool:
+            pool.warm()
+            print(f"✅ 浏览器池已预热: {pool.stats()}")
+    except Exception as e:
+        print(f"⚠️ 浏览器池预热失败: {e}")
+
+# 快速启动模式下ChromeDriver在第一次生成时探测（有磁盘缓存时只检查文件是否变化），浏览器池在第一次生成时创建
+if GENERATION_AVAILABLE and not FAST_START:
+    threading.Thread(target=warm_browser_pool, daemon=True).start()
+
 def get_manager():
     """获取管理器实例（线程安全）"""
     global manager
     with manager_lock:
         if manager is None:
-            manager = MultiAccountRidingRecordManager(CONFIG_FILE)
+            manager = MultiAccountRidingRecordManager(CONFIG_FILE, verbose=not FAST_START)
         return manager
 
+# 定期复查调度器（RECHECK_ENABLED=true 时在后台按到期时间检查账号）
+recheck_scheduler = RecheckScheduler(
+    get_manager,
+    policy=RecheckPolicy(
+        min_interval=float(os.getenv('RECHECK_MIN_INTERVAL', '3600')),
+        max_interval=float(os.getenv('RECHECK_MAX_INTERVAL', str(7 * 86400))),
+        no_record_interval=float(os.getenv('RECHECK_NO_RECORD_INTERVAL', str(6 * 3600))),
+        expiry_fraction=float(os.getenv('RECHECK_EXPIRY_FRACTION', '0.1')),
+        failure_backoff=float(os.getenv('RECHECK_FAILURE_BACKOFF', '300'))
+    ),
+    max_workers=int(os.getenv('RECHECK_MAX_WORKERS', os.getenv('CHECK_MAX_WORKERS', '2'))),
+    batch_size=int(os.getenv('RECHECK_BATCH_SIZE', '50')),
+    poll_interval=float(os.getenv('RECHECK_POLL_INTERVAL', '30')),
+    # 多个worker进程中只有一个执行定期复查
+    lease=ProcessLease(os.path.join(RESULTS_DIR, 'recheck.lock'))
+)
+
+# 开发服务器调试模式的自动重载会启动两个进程，只在实际服务请求的子进程中启动调度器
+# （gunicorn等WSGI服务器下各worker都会尝试启动，由租约保证只有一个进程执行）
+RELOADER_PARENT = __name__ == '__main__' and DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+if RECHECK_ENABLED and not RELOADER_PARENT:
+    recheck_scheduler.start()
+    print("⏰ 定期复查已启用")
+startup_phase('scheduler')
+
+def session_pool_stat(key):
+    """管理器尚未创建时不导出会话池指标"""
+    return manager.session_pool.stats()[key] if manager is not None else None
+
+def outbound_stat(key):
+    return manager.http.stats()[key] if manager is not None else None
+
+def browser_pool_stat(key):
+    # 只读取已创建的浏览器池，不为导出指标导入selenium
+    pool = get_browser_pool() if get_browser_pool else None
+    return pool.stats()[key] if pool else None
+
+# /api/metrics 中除阶段耗时直方图外导出的状态指标
+metrics_registry.gauge('riding_record_http_sessions', 'Pooled HTTP sessions.',
+                       lambda: session_pool_stat('sessions'))
+metrics_registry.counter('riding_record_http_session_hits_total', 'HTTP session pool hits.',
+                         lambda: session_pool_stat('hits'))
+metrics_registry.counter('riding_record_http_session_misses_total', 'HTTP session pool misses.',
+                         lambda: session_pool_stat('misses'))
+metrics_registry.counter('riding_record_http_retries_total', 'Outbound HTTP requests retried.',
+                         lambda: outbound_stat('retries'))
+metrics_registry.counter('riding_record_http_throttled_total', 'Outbound HTTP 429/503 responses (rate decreased).',
+                         lambda: outbound_stat('throttled'))
+metrics_registry.counter('riding_record_http_circuit_rejected_total', 'Outbound HTTP requests rejected by an open circuit.',
+                         lambda: outbound_stat('rejected'))
+metrics_registry.counter('riding_record_static_memory_hits_total', 'Frontend files served from the in-memory index.',
+                         lambda: static_assets.hits)
+metrics_registry.counter('riding_record_static_not_modified_total', 'Frontend requests answered with 304 Not Modified.',
+                         lambda: static_assets.not_modified)
+metrics_registry.gauge('riding_record_browser_pool_idle', 'Idle browsers in the browser pool.',
+                       lambda: browser_pool_stat('idle'))
+metrics_registry.counter('riding_record_browser_pool_leases_total', 'Browser pool leases.',
+                         lambda: browser_pool_stat('leases'))
+metrics_registry.gauge('riding_record_startup_seconds', 'Seconds spent importing and initialising the backend module.',
+                       lambda: STARTUP_TIMINGS.get('total'))
+metrics_registry.gauge('riding_record_jobs_running', 'Background jobs currently running.',
+                       lambda: job_queue.count(JOB_RUNNING))
+metrics_registry.gauge('riding_record_jobs_queued', 'Background jobs waiting to run.',
+                       lambda: job_queue.count(JOB_QUEUED))
+metrics_registry.gauge('riding_record_recheck_scheduled', 'Accounts in the re-check queue.',
+                       lambda: recheck_scheduler.stats()['scheduled'])
+metrics_registry.gauge('riding_record_recheck_overdue', 'Accounts past their re-check due time.',
+                       lambda: recheck_scheduler.stats()['overdue'])
+metrics_registry.counter('riding_record_recheck_checks_total', 'Scheduled re-checks performed.',
+                         lambda: recheck_scheduler.checks)
+metrics_registry.counter('riding_record_accounts_view_cache_hits_total', 'Admin accounts view cache hits.',
+                         lambda: accounts_view_cache.hits)
+metrics_registry.counter('riding_record_accounts_view_cache_misses_total', 'Admin accounts view cache misses.',
+                         lambda: accounts_view_cache.misses)
+
 @app.route('/api/riding-record/check', methods=['POST'])
 def check_riding_record():
     """检查单个账号的乘车记录"""
@@ -123,7 +301,7 @@ def check_riding_record():
             manager.add_account(username, password, username, True)
         else:
             # 如果用户存在，更新密码（可能已更改）
-            manager.accounts[username]['password'] = password
+            manager.update_account_password(username, password)
             print(f"🔄 更新用户 {username} 的密码")
 
         has_record, record_info = manager.check_riding_record_for_user_force_login(username)
@@ -141,6 +319,10 @@ def check_riding_record():
         if has_record and isinstance(record_info, dict) and 'riding_record_details' in record_info:
             result['details'] = record_info['riding_record_details']
 
+        # 证书页面与上次检查相比是否有变化
+        if isinstance(record_info, dict) and 'changed' in record_info:
+            result['changed'] = record_info['changed']
+
         # 如果是新用户，添加提示信息
         if not user_exists:
             result['message'] += f' (用户 {username} 已保存到配置文件)'
@@ -154,65 +336,79 @@ def check_riding_record():
             'message': f'查询失败: {str(e)}'
         }), 500
 
+def run_generation(username, password, progress=None):
+    """生成乘车记录，成功后立即查询并更新结果文件"""
+    print(f"🚀 开始为用户 {username} 生成乘车记录...")
+    if not load_generation():
+        return {
+            'success': False,
+            'message': '生成功能不可用，请安装 selenium 模块'
+        }
+
+    if progress:
+        progress(0, 2, '生成乘车记录')
+    result = generate_riding_record(username, password, manager=get_manager())
+
+    # 如果生成成功，立即查询并更新结果文件
+    if result.get('success'):
+        if progress:
+            progress(1, 2, '查询生成结果')
+        try:
+            # 使用共享的管理器（同一个出站请求层的限速和熔断），以请求中的密码登录
+            mgr = get_manager()
+            account = {'username': username, 'password': password, 'display_name': username, 'enabled': True}
+            has_record, record_info = mgr.check_riding_record_for_user(username, force_login=True, account=account)
+            if has_record and isinstance(record_info, dict):
+                mgr.update_single_user_result(username, record_info)
+                print(f"✅ 生成成功后已更新 {username} 的记录到文件")
+        except Exception as e:
+            print(f"⚠️ 生成成功但更新文件失败: {e}")
+
+    if progress:
+        progress(2, 2, '完成')
+    return result
+
+def parse_generate_request():
+    """解析生成请求参数，返回 (username, password, 错误响应)"""
+    data = request.get_json(silent=True)
+    print(f"📋 请求数据: {data}")
+
+    if data is None:
+        print("❌ 请求数据为空")
+        return None, None, (jsonify({
+            'success': False,
+            'message': '请求数据为空'
+        }), 400)
+
+    username = data.get('username')
+    password = data.get('password')
+    if username and not password:
+        # 管理员页面的账号列表不再包含密码：未提供密码时使用配置中该账号的密码
+        account = get_manager().accounts.get(username)
+        if account and account.get('enabled', True):
+            password = account.get('password')
+    print(f"👤 用户名: {username}, 密码长度: {len(password) if password else 0}")
+
+    if not username or not password:
+        print(f"❌ 用户名或密码为空: username={username}, password={'有' if password else '无'}")
+        return None, None, (jsonify({
+            'success': False,
+            'message': '用户名和密码不能为空'
+        }), 400)
+
+    return username, password, None
+
 @app.route('/api/riding-record/generate', methods=['POST'])
 def generate_riding_record_api():
-    """生成单个账号的乘车记录"""
+    """生成单个账号的乘车记录（同步执行）"""
     try:
         print(f"📥 收到生成请求")
-        data = request.get_json()
-        print(f"📋 请求数据: {data}")
-
-        if data is None:
-            print("❌ 请求数据为空")
-            return jsonify({
-                'success': False,
-                'message': '请求数据为空'
-            }), 400
-
-        username = data.get('username')
-        password = data.get('password')
-        print(f"👤 用户名: {username}, 密码长度: {len(password) if password else 0}")
+        username, password, error_response = parse_generate_request()
+        if error_response:
+            return error_response
 
-        if not username or not password:
-            print(f"❌ 用户名或密码为空: username={username}, password={'有' if password else '无'}")
-            return jsonify({
-                'success': False,
-                'message': '用户名和密码不能为空'
-            }), 400
-        
         # 调用headless_automation.py中的生成功能
-        print(f"🚀 开始为用户 {username} 生成乘车记录...")
-        print(f"🔧 生成功能状态: GENERATION_AVAILABLE={GENERATION_AVAILABLE}, generate_riding_record={generate_riding_record is not None}")
-
-        if GENERATION_AVAILABLE and generate_riding_record:
-            result = generate_riding_record(username, password)
-
-            # 如果生成成功，立即查询并更新结果文件
-            if result.get('success'):
-                try:
-                    temp_manager = MultiAccountRidingRecordManager(CONFIG_FILE)
-                    temp_manager.accounts = {
-                        username: {
-                            'username': username,
-                            'password': password,
-                            'display_name': username,
-                            'enabled': True
-                        }
-                    }
-
-                    has_record, record_info = temp_manager.check_riding_record_for_user_force_login(username)
-                    if has_record and isinstance(record_info, dict):
-                        temp_manager.update_single_user_result(username, record_info)
-                        print(f"✅ 生成成功后已更新 {username} 的记录到文件")
-                except Exception as e:
-                    print(f"⚠️ 生成成功但更新文件失败: {e}")
-        else:
-            result = {
-                'success': False,
-                'message': '生成功能不可用，请安装 selenium 模块'
-            }
-
-        return jsonify(result)
+        return jsonify(run_generation(username, password))
         
     except Exception as e:
         print(f"生成乘车记录失败: {e}")
@@ -248,76 +444,38 @@ def admin_login():
 
 @app.route('/api/admin/accounts', methods=['GET'])
 def get_accounts():
-    """获取所有账号信息（从缓存加载，快速显示）"""
+    """获取所有账号信息（从缓存加载，快速显示；支持ETag条件请求和分页/筛选/排序）"""
     try:
-        mgr = get_manager()
-
-        # 读取缓存的结果文件
-        results_file = os.path.join('results', 'multi_account_results.json')
-        cached_results = {}
+        try:
+            list_query = parse_list_query(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
 
-        if os.path.exists(results_file):
-            try:
-                with open(results_file, 'r', encoding='utf-8') as f:
-                    cached_results = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                cached_results = {}
-
-        accounts = []
-        total_accounts = 0
-        enabled_accounts = 0
-        accounts_with_records = 0
-
-        for username, account in mgr.accounts.items():
-            if not account.get('enabled', True):
-                continue
-
-            # 从缓存中获取记录信息
-            cached_info = cached_results.get(username, {})
-            has_record = cached_info.get('has_riding_record', None)
-            record_details = cached_info.get('info', {}).get('riding_record_details', {})
-            last_check = cached_info.get('info', {}).get('check_time', None)
-
-            # 构建详细的记录信息
-            detailed_record_info = None
-            if record_details:
-                detailed_record_info = {
-                    'boardingDate': record_details.get('riding_date'),
-                    'expiryDate': record_details.get('expiry_date'),
-                    'status': record_details.get('status'),
-                    'validityStatus': record_details.get('expiry_status')
-                }
-
-            account_info = {
-                'username': username,
-                'password': account.get('password', ''),  # 添加密码字段用于生成功能
-                'displayName': account.get('display_name', username),
-                'enabled': account.get('enabled', True),
-                'hasRecord': has_record,
-                'recordDetails': detailed_record_info,
-                'lastCheck': last_check
-            }
-            accounts.append(account_info)
-
-            total_accounts += 1
-            enabled_accounts += 1
-            if has_record:
-                accounts_with_records += 1
-
-        # 计算统计信息
-        success_rate = round((accounts_with_records / enabled_accounts) * 100, 1) if enabled_accounts > 0 else 0
-
-        statistics = {
-            'totalAccounts': total_accounts,
-            'enabledAccounts': enabled_accounts,
-            'accountsWithRecords': accounts_with_records,
-            'successRate': success_rate
-        }
+        mgr = get_manager()
+        if list_query is None:
+            body, etag = accounts_view_cache.get(mgr)
+        else:
+            index, base_etag = accounts_view_cache.get_index(mgr)
+            now = time.time()
+            body = json.dumps(index.query(**list_query, now=now), ensure_ascii=False).encode('utf-8')
+            etag = f"{base_etag}-{hashlib.sha1(request.query_string).hexdigest()[:16]}"
+            # 按检查时间筛选的结果随时间变化，ETag 同时包含筛选使用的分钟
+            if list_query['checked_within_hours'] is not None or list_query['stale_after_hours'] is not None:
+                etag += f"-{query_minute(now)}"
+
+        # 内容未变化时直接返回304
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(body)
+            response.mimetype = 'application/json'
 
-        return jsonify({
-            'accounts': accounts,
-            'statistics': statistics
-        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
         print(f"获取账号信息失败: {e}")
@@ -327,93 +485,454 @@ def get_accounts():
         }), 500
 
 
+def run_check_all(force_login=False, progress=None, list_query=None):
+    """检查所有账号的乘车记录并构建账号列表和统计信息（list_query 见 parse_list_query）"""
+    mgr = get_manager()
+
+    progress_callback = None
+    if progress:
+        progress_callback = lambda done, total, username: progress(done, total, f'已检查 {username}')
+
+    # 执行实时检查
+    mgr.check_all_accounts(force_login=force_login, progress_callback=progress_callback)
+
+    # 分页查询时只返回请求的一页
+    if list_query is not None:
+        index, _ = accounts_view_cache.get_index(mgr)
+        result = index.query(**list_query)
+        print(f"✅ 检查完成，共 {result['statistics']['enabledAccounts']} 个账号，{result['statistics']['accountsWithRecords']} 个有记录")
+        return dict(result, success=True)
+
+    # 读取最新的检查结果，构建账号列表信息
+    view = build_accounts_view(mgr.accounts, mgr.results_store.get_all(),
+                               default_last_check=datetime.now().isoformat())
+    statistics = view['statistics']
+
+    print(f"✅ 检查完成，共 {statistics['enabledAccounts']} 个账号，{statistics['accountsWithRecords']} 个有记录")
+
+    return {
+        'success': True,
+        'statistics': statistics,
+        'accounts': view['accounts']
+    }
+
 @app.route('/api/admin/check-all', methods=['POST'])
 def check_all_accounts():
-    """检查所有账号的乘车记录（重新登录网站查询最新信息）"""
+    """检查所有账号的乘车记录（重新登录网站查询最新信息，同步执行）"""
     try:
         print("🚀 开始检查所有账号的乘车记录...")
-        mgr = get_manager()
 
-        # 执行实时检查（强制重新登录，不使用cookies缓存）
-        mgr.check_all_accounts_force_login()
+        # 默认优先使用cookie缓存访问证书页面，forceLogin=true 时强制重新登录
+        data = request.get_json(silent=True) or {}
+        try:
+            list_query = parse_list_query(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
 
-        # 读取最新的结果文件
-        results_file = os.path.join('..', 'results', 'multi_account_results.json')
-        results = {}
+        return jsonify(run_check_all(force_login=bool(data.get('forceLogin', False)), list_query=list_query))
 
-        if os.path.exists(results_file):
-            try:
-                with open(results_file, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                results = {}
-
-        # 构建账号列表信息（包含最新的检查结果）
-        accounts_list = []
-        total_accounts = 0
-        enabled_accounts = 0
-        accounts_with_records = 0
-
-        for username, account_config in mgr.accounts.items():
-            if not account_config.get('enabled', True):
-                continue
-
-            account_result = results.get(username, {})
-            has_record = account_result.get('has_riding_record', None)
-            record_details = account_result.get('info', {}).get('riding_record_details', {})
-            last_check = account_result.get('info', {}).get('check_time', None)
-
-            # 构建详细的记录信息
-            detailed_record_info = None
-            if record_details:
-                detailed_record_info = {
-                    'boardingDate': record_details.get('riding_date'),
-                    'expiryDate': record_details.get('expiry_date'),
-                    'status': record_details.get('status'),
-                    'validityStatus': record_details.get('expiry_status')
-                }
-
-            account_info = {
+    except Exception as e:
+        print(f"检查所有账号失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'检查失败: {str(e)}'
+        }), 500
+
+def generate_and_verify(mgr, username, password, emit):
+    """为单个账号生成乘车记录，成功后立即查询验证并更新结果文件"""
+    emit({'type': 'progress', 'username': username, 'stage': 'generating'})
+    result = generate_riding_record(username, password, manager=mgr)
+
+    if not result.get('success'):
+        emit({
+            'type': 'progress',
+            'username': username,
+            'stage': 'done',
+            'success': False,
+            'message': result.get('message')
+        })
+        return False
+
+    emit({'type': 'progress', 'username': username, 'stage': 'verifying'})
+    has_record, record_info = mgr.check_riding_record_for_user_force_login(username)
+    if has_record and isinstance(record_info, dict):
+        mgr.update_single_user_result(username, record_info)
+
+    event = {
+        'type': 'progress',
+        'username': username,
+        'stage': 'done',
+        'success': True,
+        'hasRecord': has_record,
+        'message': result.get('message')
+    }
+    if has_record and isinstance(record_info, dict):
+        event['details'] = record_info.get('riding_record_details')
+    emit(event)
+    return True
+
+def run_batch_generation(mgr, usernames, max_workers):
+    """
+    批量生成流水线：并发生成并逐个验证，以生成器形式产出进度事件
+
+    Yields:
+        dict: start / progress / summary 事件
+    """
+    events = queue.Queue()
+    total = len(usernames)
+    yield {'type': 'start', 'total': total, 'concurrency': max_workers}
+
+    def worker(username):
+        try:
+            password = mgr.accounts[username].get('password')
+            return generate_and_verify(mgr, username, password, events.put)
+        except Exception as e:
+            events.put({
+                'type': 'progress',
                 'username': username,
-                'displayName': account_config.get('display_name', username),
-                'enabled': account_config.get('enabled', True),
-                'hasRecord': has_record,
-                'recordDetails': detailed_record_info,
-                'lastCheck': last_check or datetime.now().isoformat()
-            }
-            accounts_list.append(account_info)
-
-            total_accounts += 1
-            enabled_accounts += 1
-            if has_record:
-                accounts_with_records += 1
-
-        # 计算统计信息
-        success_rate = round((accounts_with_records / enabled_accounts) * 100, 1) if enabled_accounts > 0 else 0
-
-        statistics = {
-            'totalAccounts': total_accounts,
-            'enabledAccounts': enabled_accounts,
-            'accountsWithRecords': accounts_with_records,
-            'successRate': success_rate
-        }
+                'stage': 'done',
+                'success': False,
+                'message': f'生成失败: {str(e)}'
+            })
+            return False
+
+    succeeded = 0
+    finished = 0
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-generate')
+    try:
+        for username in usernames:
+            executor.submit(worker, username)
+
+        while finished < total:
+            event = events.get()
+            if event.get('stage') == 'done':
+                finished += 1
+                if event.get('success'):
+                    succeeded += 1
+                event['completed'] = finished
+                event['total'] = total
+            yield event
+    finally:
+        # 客户端断开连接时生成器被关闭，取消尚未开始的账号，正在生成的账号完成后结束
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield {'type': 'summary', 'total': total, 'succeeded': succeeded, 'failed': total - succeeded}
+
+@app.route('/api/admin/batch-generate', methods=['POST'])
+def batch_generate():
+    """批量生成乘车记录，以 NDJSON（默认）或 SSE 流式返回每个账号的进度"""
+    if not load_generation():
+        return jsonify({
+            'success': False,
+            'message': '生成功能不可用，请安装 selenium 模块'
+        }), 503
 
-        print(f"✅ 检查完成，共 {enabled_accounts} 个账号，{accounts_with_records} 个有记录")
+    try:
+        data = request.get_json(silent=True) or {}
+        mgr = get_manager()
 
+        # 默认处理所有启用的账号
+        enabled = [username for username, account in mgr.accounts.items() if account.get('enabled', True)]
+        requested = data.get('usernames')
+        if requested is not None and (not isinstance(requested, list)
+                                      or not all(isinstance(username, str) for username in requested)):
+            return jsonify({
+                'success': False,
+                'message': 'usernames 必须是用户名字符串列表'
+            }), 400
+        if requested is None:
+            usernames = enabled
+        else:
+            # 显式指定了账号时只处理其中已启用的账号，不回退到全部账号
+            usernames = [username for username in requested if username in enabled]
+
+        if not usernames:
+            return jsonify({
+                'success': False,
+                'message': 'usernames 中没有已启用的账号' if requested is not None else '没有可生成的账号'
+            }), 400
+
+        concurrency = data.get('concurrency')
+        if concurrency is None:
+            concurrency = BATCH_GENERATE_CONCURRENCY
+        elif isinstance(concurrency, str) and concurrency.strip().isdigit():
+            concurrency = int(concurrency)
+        if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+            return jsonify({
+                'success': False,
+                'message': 'concurrency 必须是正整数'
+            }), 400
+
+        max_workers = min(concurrency, BATCH_GENERATE_CONCURRENCY, len(usernames))
+        print(f"🚀 开始批量生成 {len(usernames)} 个账号的乘车记录（并发 {max_workers}）")
+
+        use_sse = 'text/event-stream' in request.headers.get('Accept', '')
+
+        def stream():
+            for event in run_batch_generation(mgr, usernames, max_workers):
+                payload = json.dumps(event, ensure_ascii=False)
+                yield f"data: {payload}\n\n" if use_sse else payload + "\n"
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        print(f"批量生成失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'批量生成失败: {str(e)}'
+        }), 500
+
+@app.route('/api/jobs/riding-record/generate', methods=['POST'])
+def submit_generate_job():
+    """提交生成乘车记录的后台任务"""
+    try:
+        username, password, error_response = parse_generate_request()
+        if error_response:
+            return error_response
+
+        job_id = job_queue.submit('generate', run_generation, username, password)
+        return jsonify({
+            'success': True,
+            'jobId': job_id,
+            'status': 'queued'
+        }), 202
+
+    except Exception as e:
+        print(f"提交生成任务失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'提交任务失败: {str(e)}'
+        }), 500
+
+@app.route('/api/jobs/admin/check-all', methods=['POST'])
+def submit_check_all_job():
+    """提交检查所有账号的后台任务"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            list_query = parse_list_query(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        job_id = job_queue.submit('check-all', run_check_all,
+                                  force_login=bool(data.get('forceLogin', False)),
+                                  list_query=list_query)
+        return jsonify({
+            'success': True,
+            'jobId': job_id,
+            'status': 'queued'
+        }), 202
+
+    except Exception as e:
+        print(f"提交检查任务失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'提交任务失败: {str(e)}'
+        }), 500
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """列出最近的后台任务"""
+    return jsonify({
+        'success': True,
+        'jobs': job_queue.list_jobs(request.args.get('limit', 50, type=int))
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """查询后台任务的状态和进度"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': '任务不存在'
+        }), 404
+
+    job.pop('result', None)
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """获取已完成后台任务的结果"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': '任务不存在'
+        }), 404
+
+    if job['status'] == 'failed':
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'message': f"任务失败: {job.get('error')}"
+        }), 500
+
+    if job['status'] != 'succeeded':
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'message': '任务尚未完成'
+        }), 409
+
+    return jsonify(job['result'])
+
+@app.route('/api/admin/session-pool', methods=['GET'])
+def get_session_pool_stats():
+    """获取HTTP会话池命中统计和出站请求状态（各主机当前速率、熔断状态）"""
+    try:
+        mgr = get_manager()
         return jsonify({
             'success': True,
-            'statistics': statistics,
-            'accounts': accounts_list
+            'sessionPool': mgr.session_pool.stats(),
+            'outbound': mgr.http.stats()
         })
 
     except Exception as e:
-        print(f"检查所有账号失败: {e}")
+        print(f"获取会话池统计失败: {e}")
         return jsonify({
             'success': False,
-            'message': f'检查失败: {str(e)}'
+            'message': f'获取会话池统计失败: {str(e)}'
         }), 500
 
 
+@app.route('/api/admin/recheck', methods=['GET'])
+def get_recheck_schedule():
+    """获取定期复查的状态和即将到期的账号"""
+    try:
+        recheck_scheduler.sync(get_manager())
+        return jsonify({
+            'success': True,
+            'enabled': RECHECK_ENABLED,
+            'scheduler': recheck_scheduler.stats(),
+            'upcoming': recheck_scheduler.upcoming(request.args.get('limit', 20, type=int))
+        })
+
+    except Exception as e:
+        print(f"获取复查计划失败: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'获取复查计划失败: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/recheck/<username>', methods=['POST'])
+def trigger_recheck(username):
+    """让账号在下一轮定期复查中立即检查"""
+    mgr = get_manager()
+    if username not in mgr.accounts:
+        return jsonify({
+            'success': False,
+            'message': f'账号 {username} 不存在'
+        }), 404
+
+    if not RECHECK_ENABLED:
+        return jsonify({
+            'success': False,
+            'enabled': False,
+            'message': '定期复查未启用（RECHECK_ENABLED=false），请求不会被执行'
+        }), 409
+
+    recheck_scheduler.trigger(username)
+    return jsonify({'success': True, 'enabled': True, 'queued': True}), 202
+
+
+@app.route('/api/admin/accounts/<username>/pages', methods=['GET'])
+def get_page_history(username):
+    """获取账号证书页面的归档历史（按时间倒序，相同内容只保存一份）"""
+    try:
+        limit = min(500, max(1, int(request.args.get('limit', 50))))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': '参数 limit 无效'
+        }), 400
+
+    mgr = get_manager()
+    return jsonify({
+        'success': True,
+        'username': username,
+        'pages': mgr.page_archive.history(username, limit=limit)
+    })
+
+
+@app.route('/api/admin/pages/<content_hash>', methods=['GET'])
+def get_archived_page(content_hash):
+    """按内容哈希获取归档的证书页面HTML"""
+    content = get_manager().page_archive.load(content_hash)
+    if content is None:
+        return jsonify({
+            'success': False,
+            'message': '页面不存在'
+        }), 404
+
+    response = make_response(content)
+    response.mimetype = 'text/html'
+    # 归档的是外部站点的HTML：在无脚本、独立源的沙箱中显示，禁止浏览器猜测类型
+    response.headers['Content-Security-Policy'] = 'sandbox'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    # 内容按哈希寻址，不会变化
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    response.set_etag(content_hash)
+    return response
+
+
+@app.route('/api/admin/page-archive', methods=['GET'])
+def get_page_archive_stats():
+    """获取页面归档统计（快照数、去重后的对象数、压缩前后大小）"""
+    return jsonify({
+        'success': True,
+        'pageArchive': get_manager().page_archive.stats()
+    })
+
+
+@app.route('/api/admin/browser-pool', methods=['GET'])
+def get_browser_pool_stats():
+    """获取浏览器池统计"""
+    pool = get_browser_pool() if get_browser_pool else None
+    return jsonify({
+        'success': True,
+        'enabled': pool is not None,
+        'browserPool': pool.stats() if pool else None,
+        'driver': driver_resolver.stats() if driver_resolver else None
+    })
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus文本格式的指标：各阶段耗时直方图、会话池/浏览器池/任务队列状态"""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/admin/startup', methods=['GET'])
+def get_startup_timings():
+    """获取启动耗时（各阶段秒数）以及生成功能和管理器是否已加载"""
+    return jsonify({
+        'success': True,
+        'fastStart': FAST_START,
+        'timings': STARTUP_TIMINGS,
+        'generationLoaded': _generation_loaded,
+        'managerLoaded': manager is not None
+    })
+
+
+startup_phase('routes')
+STARTUP_TIMINGS['total'] = round(time.perf_counter() - _startup_began, 4)
+print(f"⏱️ 启动耗时 {STARTUP_TIMINGS['total']:.2f}s（{'快速启动，' if FAST_START else ''}"
+      + '，'.join(f"{name} {seconds:.2f}s" for name, seconds in STARTUP_TIMINGS.items() if name != 'total') + '）')
+
 
 if __name__ == '__main__':
     print("🚀 启动乘车记录管理系统后端服务...")
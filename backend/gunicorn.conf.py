@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+gunicorn 配置（生产模式）
+用法（在项目根目录）: gunicorn -c backend/gunicorn.conf.py
+
+每个worker进程有独立的管理器、会话池和任务线程池；检查结果（SQLite WAL）、任务状态（JOBS_DIR）、
+cookie缓存和账号配置通过文件在worker之间共享，定期复查只在取得租约的一个worker中执行
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'wsgi:app'
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', os.getenv('WEB_CONCURRENCY', '2')))
+# 线程worker：同步的检查/生成接口和NDJSON/SSE流式响应会长时间占用一个线程
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+# 检查所有账号（同步接口）可能持续较长时间
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = '-' if os.getenv('GUNICORN_ACCESS_LOG', 'false').lower() == 'true' else None
+errorlog = '-'
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+WSGI入口（生产模式）
+gunicorn -c backend/gunicorn.conf.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app  # noqa: E402
+
+application = app
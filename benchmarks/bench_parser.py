@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+证书页面解析微基准
+对比原先逐个 re.findall 的解析方式与 record_parser 的预编译解析
+
+用法:
+    python benchmarks/bench_parser.py [页面文件 ...] [--repeat N]
+
+未指定文件时使用页面归档（results/pages）中每个账号最近的页面以及旧版的 results/*_riding_record_page.html；
+没有保存的页面时使用内置示例页面。
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_archive import PageArchive  # noqa: E402
+from record_parser import CertificatePageParser  # noqa: E402
+
+TARGET_TEXT = os.getenv('TARGET_TEXT', '新幹線乗車証明')
+
+SAMPLE_PAGE = '''<!DOCTYPE html>
+<html lang="ja">
+<head><meta charset="utf-8"><title>証明書</title></head>
+<body>
+%s
+%s
+</body>
+</html>
+'''
+SAMPLE_FILLER = '<div class="filler"><p>推し旅</p></div>\n' * 2000
+SAMPLE_CERTIFICATE = '''<div class="certificate">
+  <h1>新幹線乗車証明</h1>
+  <div class="ridingDate">2025年7月12日</div>
+  <div class="tillDate">2025年8月31日まで</div>
+  <p class="status">CERTIFIED!</p>
+</div>'''
+
+
+def legacy_parse(content):
+    """原先的解析方式（每个字段单独扫描整页）"""
+    result = {'has_target': TARGET_TEXT in content, 'riding_date': None,
+              'expiry_date': None, 'certified': False}
+
+    for pattern in (r'有効期限[：:]\s*(\d{4}年\d{1,2}月\d{1,2}日)まで', r'tillDate[^>]*>([^<]+)</div>'):
+        matches = re.findall(pattern, content, re.IGNORECASE)
+        if matches:
+            expiry_date = matches[0].strip()
+            if expiry_date.endswith('まで'):
+                expiry_date = expiry_date[:-2]
+            result['expiry_date'] = expiry_date
+            break
+
+    for pattern in (r'乗車日[：:]\s*(\d{4}年\d{1,2}月\d{1,2}日)', r'ridingDate[^>]*>([^<]+)</div>'):
+        matches = re.findall(pattern, content, re.IGNORECASE)
+        if matches:
+            result['riding_date'] = matches[0].strip()
+            break
+
+    result['certified'] = bool(re.search(r'CERTIFIED!', content, re.IGNORECASE))
+    return result
+
+
+def load_pages(paths):
+    from_results = not paths
+    if from_results:
+        paths = sorted(glob.glob(os.path.join('results', '*_riding_record_page.html')))
+
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    archive_dir = os.getenv('PAGE_ARCHIVE_DIR', os.path.join('results', 'pages'))
+    if from_results and os.path.exists(os.path.join(archive_dir, 'index.db')):
+        archive = PageArchive(archive_dir)
+        for username, content_hash in sorted(archive.latest_hashes().items()):
+            content = archive.load(content_hash)
+            if content is not None:
+                pages.append((f'{username}@{content_hash[:12]}', content.decode('utf-8', errors='replace')))
+
+    if not pages:
+        print("ℹ️ 未找到保存的证书页面，使用内置示例页面")
+        pages.append(('sample_with_record', SAMPLE_PAGE % (SAMPLE_FILLER, SAMPLE_CERTIFICATE)))
+        pages.append(('sample_without_record', SAMPLE_PAGE % (SAMPLE_FILLER, '')))
+    return pages
+
+
+def bench(func, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, content in pages:
+            func(content)
+    elapsed = time.perf_counter() - started
+    return elapsed / (repeat * len(pages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='证书页面解析微基准')
+    parser.add_argument('pages', nargs='*', help='证书页面HTML文件')
+    parser.add_argument('--repeat', type=int, default=200, help='每个页面的解析次数')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    page_parser = CertificatePageParser(TARGET_TEXT)
+
+    # 确认两种解析方式结果一致
+    mismatches = [name for name, content in pages
+                  if legacy_parse(content) != page_parser.parse(content, extract_details=True)]
+    for name in mismatches:
+        print(f"⚠️ {name}: 解析结果与原实现不一致")
+
+    total_kb = sum(len(content.encode('utf-8')) for _, content in pages) / 1024
+    print(f"📄 页面数: {len(pages)}，合计 {total_kb:.1f} KB，每页重复 {args.repeat} 次")
+
+    for name, content in pages:
+        legacy_us = bench(legacy_parse, [(name, content)], args.repeat)
+        parser_us = bench(page_parser.parse, [(name, content)], args.repeat)
+        print(f"  {name}: 原实现 {legacy_us:.1f} µs，record_parser {parser_us:.1f} µs"
+              f"（{legacy_us / parser_us:.1f}x）")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
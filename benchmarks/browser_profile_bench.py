@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+浏览器配置基准测试（full 与 lightweight 对比）
+启动本地模拟服务器，用两种浏览器配置分别加载语音页面（带图片、字体、音频和第三方脚本），测量:
+
+- pageLoadMs:   driver.get 到 document.readyState == complete 的耗时
+- bytes:        加载页面期间模拟服务器发送的字节数（等待 --settle 秒，包括音频预加载）
+- requests:     模拟服务器收到的请求数
+- rssMb:        Chromium 全部进程的常驻内存之和（Linux，读取 /proc）
+- launchMs:     启动浏览器的耗时
+
+用法:
+    python benchmarks/browser_profile_bench.py --runs 3
+    python benchmarks/browser_profile_bench.py --allowed-hosts 127.0.0.1   # 同时屏蔽第三方请求（localhost 视为第三方）
+
+需要本机安装 Chromium/Chrome 和 chromedriver。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from mock_server import STORY_PATH, mock_env, start_mock_server  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+
+PROFILES = ('full', 'lightweight')
+
+
+def process_tree_rss(root_pid):
+    """root_pid 及其全部子进程的常驻内存之和（字节），不支持 /proc 的平台返回None"""
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # 进程名可能包含空格，父进程号在最后一个 ')' 之后的第二个字段
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    total = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def run_once(headless_automation, server, base_url, profile, cookie, settle):
+    """用指定配置启动浏览器、加载一次语音页面，返回测量结果"""
+    state = server.state
+    profile_dir = tempfile.mkdtemp(prefix='bench_browser_')
+    port = headless_automation.allocate_debugging_port()
+    started = time.perf_counter()
+    driver = headless_automation.create_headless_driver(profile_dir, port, profile=profile)
+    launch = time.perf_counter() - started
+    try:
+        # 先访问同一主机的轻量页面以设置登录cookie
+        driver.get(f'{base_url}/__mock__/stats')
+        driver.add_cookie({'name': 'oshitabi', 'value': cookie, 'path': '/'})
+
+        before = state.stats()
+        started = time.perf_counter()
+        driver.get(f'{base_url}{STORY_PATH}')
+        while driver.execute_script("return document.readyState") != 'complete':
+            time.sleep(0.01)
+        load = time.perf_counter() - started
+        time.sleep(settle)
+        after = state.stats()
+
+        rss = process_tree_rss(driver.service.process.pid)
+        return {
+            'launchMs': round(launch * 1000, 1),
+            'pageLoadMs': round(load * 1000, 1),
+            'bytes': after['bytesSent'] - before['bytesSent'],
+            'requests': sum(after['requests'].values()) - sum(before['requests'].values()),
+            'rssMb': round(rss / 1024 / 1024, 1) if rss is not None else None
+        }
+    finally:
+        driver.quit()
+        headless_automation.release_debugging_port(port)
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def summarize(samples):
+    summary = {'runs': len(samples)}
+    for key in ('launchMs', 'pageLoadMs', 'bytes', 'requests', 'rssMb'):
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        summary[key] = percentile(values, 0.50) if values else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浏览器配置基准测试（full 与 lightweight 对比）')
+    parser.add_argument('--runs', type=int, default=3, help='每种配置的运行次数（取中位数）')
+    parser.add_argument('--settle', type=float, default=1.0, help='页面加载完成后继续统计流量的秒数')
+    parser.add_argument('--allowed-hosts', default='', help='lightweight 配置允许访问的主机（设置后屏蔽第三方请求）')
+    parser.add_argument('--output', default=os.path.join(BENCHMARKS_DIR, 'results'), help='结果保存目录')
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server()
+    os.environ.update(mock_env(base_url))
+    os.environ['BROWSER_ALLOWED_HOSTS'] = args.allowed_hosts
+    os.environ.setdefault('TIMING_LOG', 'false')
+
+    import headless_automation
+    from multi_account_certificate_manager import MultiAccountRidingRecordManager
+
+    manager = MultiAccountRidingRecordManager(os.path.join(tempfile.mkdtemp(prefix='bench_config_'), 'none.json'),
+                                              verbose=False)
+    cookie, _ = manager.login_with_credentials('bench', 'bench_user', 'bench-password')
+    if not cookie:
+        print("❌ 无法登录模拟服务器")
+        return
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'config': {
+            'runs': args.runs,
+            'settle': args.settle,
+            'allowedHosts': args.allowed_hosts,
+            'blockedUrls': headless_automation.BROWSER_BLOCKED_URLS,
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': {}
+    }
+
+    try:
+        for profile in PROFILES:
+            samples = [run_once(headless_automation, server, base_url, profile, cookie, args.settle)
+                       for _ in range(args.runs)]
+            report['results'][profile] = summary = summarize(samples)
+            print(f"⏱️ {profile}: 启动 {summary['launchMs']}ms，页面加载 {summary['pageLoadMs']}ms，"
+                  f"流量 {summary['bytes'] / 1024:.0f}KB（{summary['requests']} 个请求），内存 {summary['rssMb']}MB")
+    finally:
+        server.shutdown()
+
+    full, light = report['results']['full'], report['results']['lightweight']
+    print("\n📊 lightweight 相对 full:")
+    for key, label in (('pageLoadMs', '页面加载'), ('bytes', '流量'), ('rssMb', '内存')):
+        if full.get(key) and light.get(key) is not None:
+            print(f"  {label}: {(light[key] - full[key]) / full[key] * 100:+.1f}%")
+
+    os.makedirs(args.output, exist_ok=True)
+    output_file = os.path.join(args.output, f"browser_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 结果已保存: {output_file}")
+
+
+if __name__ == '__main__':
+    main()
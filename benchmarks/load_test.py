@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+生产模式（gunicorn）负载测试
+在临时工作目录中按不同的worker数启动 gunicorn -c backend/gunicorn.conf.py，
+用多个客户端进程（每个进程多条keep-alive连接）压测指定接口，输出每秒请求数和p50/p95延迟。
+
+- /api/health:          不访问任何共享状态，反映服务器本身的吞吐量
+- /api/admin/accounts:  完整账号列表（缓存的JSON），反映读接口的吞吐量
+
+用法:
+    python benchmarks/load_test.py --workers 1,2,4 --accounts 1000 --duration 10
+
+客户端与服务器在同一台机器上运行，吞吐量随worker数的增长受CPU核数限制（建议客户端进程数不超过核数的一半）。
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from run_benchmarks import percentile, write_accounts_config  # noqa: E402
+
+DEFAULT_ENDPOINTS = ('/api/health', '/api/admin/accounts')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def client_process(port, path, connections, duration, queue):
+    """一个客户端进程：connections 条keep-alive连接循环请求，结束后汇报延迟样本"""
+    samples = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local_samples = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local_samples.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            samples.extend(local_samples)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put((samples, errors[0]))
+
+
+def run_load(port, path, clients, connections, duration):
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=client_process, args=(port, path, connections, duration, queue))
+                 for _ in range(clients)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    samples = []
+    errors = 0
+    for _ in processes:
+        process_samples, process_errors = queue.get()
+        samples.extend(process_samples)
+        errors += process_errors
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requestsPerSecond': round(len(samples) / elapsed, 1) if elapsed > 0 else None,
+        'p50Ms': ms(percentile(samples, 0.50)),
+        'p95Ms': ms(percentile(samples, 0.95))
+    }
+
+
+def start_server(workspace, workers, threads, port, verbose):
+    env = dict(os.environ)
+    env.update({
+        'HOST': '127.0.0.1',
+        'PORT': str(port),
+        'DEBUG': 'false',
+        'GUNICORN_WORKERS': str(workers),
+        'GUNICORN_THREADS': str(threads),
+        'CONFIG_FILE': os.path.join(workspace, 'accounts_config.json'),
+        'RESULTS_DIR': os.path.join(workspace, 'results'),
+        'JOBS_DIR': os.path.join(workspace, 'results', 'jobs'),
+        'TIMING_LOG': 'false',
+        'BROWSER_POOL_SIZE': '0',
+        'RECHECK_ENABLED': 'false'
+    })
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT_DIR, 'backend', 'gunicorn.conf.py')],
+                            cwd=workspace, env=env, stdout=output, stderr=output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gunicorn生产模式负载测试')
+    parser.add_argument('--workers', default='1,2,4', help='gunicorn worker数，逗号分隔')
+    parser.add_argument('--threads', type=int, default=8, help='每个worker的线程数')
+    parser.add_argument('--endpoints', default=','.join(DEFAULT_ENDPOINTS), help='压测的接口，逗号分隔')
+    parser.add_argument('--accounts', type=int, default=1000, help='账号配置中的账号数')
+    parser.add_argument('--duration', type=float, default=10, help='每个接口的压测秒数')
+    parser.add_argument('--clients', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='客户端进程数')
+    parser.add_argument('--connections', type=int, default=8, help='每个客户端进程的连接数')
+    parser.add_argument('--output', default=os.path.join(BENCHMARKS_DIR, 'results'), help='结果保存目录')
+    parser.add_argument('--verbose', action='store_true', help='显示gunicorn的输出')
+    args = parser.parse_args()
+
+    worker_counts = [int(value) for value in args.workers.split(',') if value.strip()]
+    endpoints = [value.strip() for value in args.endpoints.split(',') if value.strip()]
+
+    workspace = tempfile.mkdtemp(prefix='riding_record_load_')
+    os.makedirs(os.path.join(workspace, 'results'), exist_ok=True)
+    write_accounts_config(os.path.join(workspace, 'accounts_config.json'), args.accounts)
+
+    print(f"🧪 {args.accounts} 个账号，{args.clients} 个客户端进程 × {args.connections} 条连接，"
+          f"每个接口 {args.duration}s（CPU核数 {os.cpu_count()}）")
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'config': {
+            'workers': worker_counts,
+            'threads': args.threads,
+            'accounts': args.accounts,
+            'duration': args.duration,
+            'clients': args.clients,
+            'connections': args.connections,
+            'cpuCount': os.cpu_count(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': {}
+    }
+
+    try:
+        for workers in worker_counts:
+            port = free_port()
+            server = start_server(workspace, workers, args.threads, port, args.verbose)
+            try:
+                if not wait_until_ready(port):
+                    print(f"❌ {workers} 个worker的gunicorn未能启动")
+                    continue
+                for path in endpoints:
+                    # 预热（每个worker创建管理器、构建账号列表缓存）
+                    run_load(port, path, 1, workers * 2, 1)
+                    stats = run_load(port, path, args.clients, args.connections, args.duration)
+                    report['results'][f'{path}@{workers}'] = stats
+                    print(f"⏱️ {path} @ {workers} workers: {stats['requestsPerSecond']} 请求/秒，"
+                          f"p50 {stats['p50Ms']}ms，p95 {stats['p95Ms']}ms，错误 {stats['errors']}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    os.makedirs(args.output, exist_ok=True)
+    output_file = os.path.join(args.output, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 结果已保存: {output_file}")
+
+
+if __name__ == '__main__':
+    main()
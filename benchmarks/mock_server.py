@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+JR Central / oshi-tabi 本地模拟服务器
+用于离线基准测试：模拟登录页的 _token、登录后的 redirectForm（otp/loginId/registerId）、
+oshitabi cookie、证书页面以及语音页面和问卷接口，支持配置延迟和错误注入（以及问卷接口不返回表单的情况）
+
+用法:
+    python benchmarks/mock_server.py --port 8900 --latency-ms 50 --error-rate 0.01
+
+启动后按输出的环境变量设置 JR_LOGIN_URL 等地址即可让管理器访问模拟服务器。
+运行中可通过 POST /__mock__/config 修改延迟和错误注入，GET /__mock__/stats 查看请求统计。
+"""
+import argparse
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TARGET_TEXT = '新幹線乗車証明'
+STORY_ITEM_ID = '685b5e4be9c4185cba9c2a94'
+SURVEY_ID = '686028a78a3e46623d889025'
+SURVEY_QUESTION_IDS = [
+    'question-682657575eda8', 'question-682657575f052', 'question-682657575f1ab', 'question-682657575f300',
+    'question-682657575f450', 'question-682657575f594', 'question-682657575f6df'
+]
+
+LOGIN_PATH = '/user/login'
+OSHITABI_LOGIN_PATH = '/orange/login.php'
+CERTIFICATE_PATH = '/bang-dream-10th/mygo/certificate/data'
+STORY_PATH = f'/bang-dream-10th/voice/{STORY_ITEM_ID}'
+SURVEY_PATH = f'/survey/{SURVEY_ID}'
+SURVEY_SUBMIT_PATH = f'/survey/{SURVEY_ID}/answer'
+STATIC_PATH = '/static/'
+
+# 登录时使用此密码视为密码错误
+REJECTED_PASSWORD = 'wrong-password'
+
+LOGIN_PAGE = '''<!DOCTYPE html>
+<html lang="ja">
+<head><meta charset="utf-8"><title>ログイン | JR東海</title></head>
+<body>
+<form method="POST" action="{login_path}?redirect=true">
+  <input type="hidden" name="_token" value="{token}">
+  <input type="text" name="login_id" value="">
+  <input type="password" name="password" value="">
+  <button type="submit">ログイン</button>
+</form>
+</body>
+</html>
+'''
+
+REDIRECT_PAGE = '''<!DOCTYPE html>
+<html lang="ja">
+<head><meta charset="utf-8"><title>リダイレクト</title></head>
+<body onload="document.getElementById('redirectForm').submit()">
+<form id="redirectForm" method="POST" action="{oshitabi_login_path}" data-site="oshi-tabi.voistock.com">
+  <input type="hidden" name="otp" value="{otp}">
+  <input type="hidden" name="loginId" value="{login_id}">
+  <input type="hidden" name="registerId" value="{register_id}">
+</form>
+</body>
+</html>
+'''
+
+CERTIFICATE_PAGE = '''<!DOCTYPE html>
+<html lang="ja">
+<head><meta charset="utf-8"><title>乗車証明 | 推し旅</title></head>
+<body>
+<header><nav>{navigation}</nav></header>
+<main>
+{certificate}
+</main>
+</body>
+</html>
+'''
+
+CERTIFICATE_BLOCK = '''<div class="certificate">
+  <h1>{target_text}</h1>
+  <div class="ridingDate">{riding_date}</div>
+  <div class="tillDate">{till_date}まで</div>
+  <p class="status">CERTIFIED!</p>
+</div>'''
+
+EMPTY_CERTIFICATE_BLOCK = '<div class="certificate empty"><p>乗車記録がありません</p></div>'
+
+STORY_PAGE = '''<!DOCTYPE html>
+<html lang="ja">
+<head><meta charset="utf-8"><meta name="csrf-token" content="{csrf_token}"><title>ボイスストーリー</title>
+<style>@font-face {{ font-family: "Story"; src: url("/static/story.woff2") format("woff2"); }} body {{ font-family: "Story"; }}</style>
+<script src="{third_party}/static/analytics.js" async></script>
+</head>
+<body>
+{images}
+<audio id="voice-player" src="/static/voice.mp3" preload="auto" controls></audio>
+<button onclick="getSurvey('{item_id}', '{survey_id}')">アンケートに回答</button>
+<script>function getSurvey(itemId, surveyId) {{ return [itemId, surveyId]; }}</script>
+</body>
+</html>
+'''
+
+# 语音页面引用的静态资源（与真实页面相近的图片、字体、音频和第三方脚本），内容为固定的伪随机字节
+STATIC_ASSETS = {
+    **{f'cover-{i}.jpg': ('image/jpeg', 120 * 1024) for i in range(8)},
+    'story.woff2': ('font/woff2', 80 * 1024),
+    'voice.mp3': ('audio/mpeg', 1536 * 1024),
+    'analytics.js': ('text/javascript; charset=utf-8', 40 * 1024)
+}
+_static_bodies = {}
+
+
+def static_body(name):
+    if name not in _static_bodies:
+        content_type, size = STATIC_ASSETS[name]
+        if content_type.startswith('text/javascript'):
+            line = f'/* {name} */ window.__analytics = (window.__analytics || 0) + 1;\n'
+            body = (line * (size // len(line))).encode()
+        else:
+            body = random.Random(name).randbytes(size)
+        _static_bodies[name] = body
+    return _static_bodies[name]
+
+SURVEY_FORM = '''<form id="survey-form" method="POST" action="{submit_path}">
+  <input type="hidden" name="_token" value="{csrf_token}">
+  <input type="hidden" name="surveyId" value="{survey_id}">
+  <input type="hidden" name="itemId" value="{item_id}">
+{fields}
+  <button type="submit">送信</button>
+</form>
+'''
+
+
+class MockConfig:
+    """延迟与错误注入配置"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, record_ratio=0.5,
+                 conditional=True, max_rps=0.0, survey_form=True):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # 初始即有乘车记录的账号比例（按 loginId 的哈希确定）
+        self.record_ratio = record_ratio
+        # 证书页面是否返回ETag/Last-Modified并响应条件请求（304）
+        self.conditional = conditional
+        # 每秒最多处理的请求数，超出时返回429（0 = 不限制），用于验证客户端的自适应限速
+        self.max_rps = float(max_rps)
+        # 问卷接口是否返回问卷表单（false 时返回不含表单的页面，用于验证HTTP生成缺少表单时的处理和 auto 回退）
+        self.survey_form = survey_form
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    def update(self, values):
+        for key, value in values.items():
+            if key not in self.__dict__:
+                continue
+            if isinstance(getattr(self, key), bool):
+                value = value if isinstance(value, bool) else str(value).lower() in ('true', '1')
+            setattr(self, key, type(getattr(self, key))(value))
+
+
+class MockState:
+    """模拟服务器的会话、令牌和乘车记录状态"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.csrf_tokens = set()
+        self.otps = {}
+        self.sessions = {}
+        self.started = time.time()
+        # 通过问卷生成了乘车记录的账号 -> 生成时间
+        self.generated = {}
+        self.requests = {}
+        self.errors = 0
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.window_start = 0.0
+        self.window_count = 0
+
+    def issue(self, store, value=None):
+        token = secrets.token_hex(16)
+        with self.lock:
+            if isinstance(store, set):
+                store.add(token)
+            else:
+                store[token] = value
+        return token
+
+    def consume(self, store, token):
+        """取出一次性令牌，不存在时返回None（集合中的令牌返回True）"""
+        with self.lock:
+            if isinstance(store, set):
+                if token in store:
+                    store.discard(token)
+                    return True
+                return None
+            return store.pop(token, None)
+
+    def has_record(self, login_id):
+        if login_id in self.generated:
+            return True
+        return zlib.crc32(login_id.encode('utf-8')) % 1000 < self.config.record_ratio * 1000
+
+    def count(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def over_capacity(self):
+        """按1秒固定窗口计数，超出 max_rps 时返回True"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            if self.window_count > self.config.max_rps:
+                self.throttled += 1
+                return True
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'errors': self.errors,
+                'throttled': self.throttled,
+                'bytesSent': self.bytes_sent,
+                'sessions': len(self.sessions),
+                'generated': len(self.generated)
+            }
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """模拟 JR Central 登录和 oshi-tabi 页面"""
+
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，关闭Nagle算法避免与客户端延迟ACK叠加产生约40ms的额外延迟
+    disable_nagle_algorithm = True
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- 响应工具 ----
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or []):
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+            with self.state.lock:
+                self.state.bytes_sent += len(data)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False), 'application/json; charset=utf-8')
+
+    def _redirect(self, location, headers=None):
+        self._send(302, '', headers=[('Location', location)] + list(headers or []))
+
+    def _form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        return {key: values[0] for key, values in parse_qs(body).items()}
+
+    def _cookie(self, name):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie[name].value if name in cookie else None
+
+    def _current_user(self):
+        token = self._cookie('oshitabi')
+        with self.state.lock:
+            return self.state.sessions.get(token) if token else None
+
+    # ---- 延迟与错误注入 ----
+
+    def _inject(self, path):
+        config = self.state.config
+        self.state.count(path)
+
+        if config.max_rps > 0 and self.state.over_capacity():
+            if self.command == 'POST':
+                self._form()
+            self._send(429, 'Too Many Requests (injected)', 'text/plain; charset=utf-8',
+                       headers=[('Retry-After', '1')])
+            return True
+
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if config.error_rate > 0 and random.random() < config.error_rate:
+            with self.state.lock:
+                self.state.errors += 1
+            # 读掉请求体以保持连接可复用
+            if self.command == 'POST':
+                self._form()
+            self._send(config.error_status, 'Service Unavailable (injected)', 'text/plain; charset=utf-8')
+            return True
+        return False
+
+    # ---- 路由 ----
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith('/__mock__/'):
+            return self._mock_admin(path)
+        if self._inject(path):
+            return
+
+        if path == LOGIN_PATH:
+            return self._login_page()
+        if path == CERTIFICATE_PATH:
+            return self._certificate_page()
+        if path == STORY_PATH:
+            return self._story_page()
+        if path == SURVEY_PATH:
+            return self._survey_form()
+        if path.startswith(STATIC_PATH) and path[len(STATIC_PATH):] in STATIC_ASSETS:
+            name = path[len(STATIC_PATH):]
+            return self._send(200, static_body(name), STATIC_ASSETS[name][0])
+        self._send(404, 'Not Found', 'text/plain; charset=utf-8')
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path.startswith('/__mock__/'):
+            return self._mock_admin(path)
+        if self._inject(path):
+            return
+
+        if path == LOGIN_PATH:
+            return self._login_submit()
+        if path == OSHITABI_LOGIN_PATH:
+            return self._oshitabi_login()
+        if path == SURVEY_SUBMIT_PATH:
+            return self._survey_submit()
+        self._form()
+        self._send(404, 'Not Found', 'text/plain; charset=utf-8')
+
+    def _mock_admin(self, path):
+        if path == '/__mock__/config':
+            if self.command == 'POST':
+                length = int(self.headers.get('Content-Length') or 0)
+                self.state.config.update(json.loads(self.rfile.read(length) or b'{}'))
+            return self._send_json(200, self.state.config.to_dict())
+        if path == '/__mock__/stats':
+            return self._send_json(200, self.state.stats())
+        self._send(404, 'Not Found', 'text/plain; charset=utf-8')
+
+    def _login_page(self):
+        token = self.state.issue(self.state.csrf_tokens)
+        self._send(200, LOGIN_PAGE.format(login_path=LOGIN_PATH, token=token))
+
+    def _login_submit(self):
+        form = self._form()
+        if not self.state.consume(self.state.csrf_tokens, form.get('_token')):
+            return self._send(419, 'Page Expired', 'text/plain; charset=utf-8')
+
+        login_id = form.get('login_id', '')
+        if not login_id or not form.get('password') or form.get('password') == REJECTED_PASSWORD:
+            # 登录失败时重新显示登录页
+            token = self.state.issue(self.state.csrf_tokens)
+            return self._send(200, LOGIN_PAGE.format(login_path=LOGIN_PATH, token=token))
+
+        otp = self.state.issue(self.state.otps, login_id)
+        register_id = zlib.crc32(login_id.encode('utf-8'))
+        self._send(200, REDIRECT_PAGE.format(oshitabi_login_path=OSHITABI_LOGIN_PATH, otp=otp,
+                                             login_id=login_id, register_id=register_id))
+
+    def _oshitabi_login(self):
+        form = self._form()
+        login_id = self.state.consume(self.state.otps, form.get('otp'))
+        if login_id is None or login_id != form.get('loginId'):
+            return self._redirect(f'{LOGIN_PATH}?redirect=true')
+
+        session = self.state.issue(self.state.sessions, login_id)
+        self._send(200, '<!DOCTYPE html><html><body>ok</body></html>',
+                   headers=[('Set-Cookie', f'oshitabi={session}; Path=/; Max-Age=7200; HttpOnly')])
+
+    def _certificate_page(self):
+        login_id = self._current_user()
+        if login_id is None:
+            return self._redirect(f'{LOGIN_PATH}?redirect=true')
+
+        if self.state.has_record(login_id):
+            certificate = CERTIFICATE_BLOCK.format(target_text=TARGET_TEXT, riding_date='2025年7月12日',
+                                                   till_date='2099年8月31日')
+        else:
+            certificate = EMPTY_CERTIFICATE_BLOCK
+        navigation = ''.join(f'<a href="/bang-dream-10th/page/{i}">ページ{i}</a>' for i in range(200))
+        body = CERTIFICATE_PAGE.format(navigation=navigation, certificate=certificate).encode('utf-8')
+
+        if not self.state.config.conditional:
+            return self._send(200, body)
+
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        last_modified = formatdate(self.state.generated.get(login_id, self.state.started), usegmt=True)
+        validators = [('ETag', etag), ('Last-Modified', last_modified)]
+        if etag in (self.headers.get('If-None-Match') or ''):
+            return self._send(304, b'', headers=validators)
+        self._send(200, body, headers=validators)
+
+    def _story_page(self):
+        if self._current_user() is None:
+            return self._redirect(f'{LOGIN_PATH}?redirect=true')
+        # 第三方脚本通过另一个主机名（localhost）访问同一个服务器
+        images = '\n'.join(f'<img src="/static/{name}" alt="">' for name in STATIC_ASSETS if name.endswith('.jpg'))
+        self._send(200, STORY_PAGE.format(csrf_token=secrets.token_hex(16), item_id=STORY_ITEM_ID, survey_id=SURVEY_ID,
+                                          images=images, third_party=f'http://localhost:{self.server.server_address[1]}'))
+
+    def _survey_form(self):
+        if self._current_user() is None:
+            return self._redirect(f'{LOGIN_PATH}?redirect=true')
+        if not self.state.config.survey_form:
+            return self._send(200, '<div class="survey closed"><p>アンケートは終了しました</p></div>')
+        fields = '\n'.join(f'  <input type="text" id="{question_id}" name="answers[{i}]">'
+                           for i, question_id in enumerate(SURVEY_QUESTION_IDS))
+        self._send(200, SURVEY_FORM.format(submit_path=SURVEY_SUBMIT_PATH, csrf_token=secrets.token_hex(16),
+                                           survey_id=SURVEY_ID, item_id=STORY_ITEM_ID, fields=fields))
+
+    def _survey_submit(self):
+        form = self._form()
+        login_id = self._current_user()
+        if login_id is None:
+            return self._redirect(f'{LOGIN_PATH}?redirect=true')
+
+        answered = sum(1 for i in range(len(SURVEY_QUESTION_IDS)) if form.get(f'answers[{i}]'))
+        if answered != len(SURVEY_QUESTION_IDS):
+            return self._send_json(422, {'result': 'error', 'message': 'missing answers'})
+
+        with self.state.lock:
+            self.state.generated[login_id] = time.time()
+        self._send_json(200, {'result': 'ok'})
+
+
+def start_mock_server(host='127.0.0.1', port=0, **config):
+    """
+    在后台线程中启动模拟服务器
+
+    Returns:
+        tuple: (server, base_url)；server.state 为 MockState，调用 server.shutdown() 停止
+    """
+    state = MockState(MockConfig(**config))
+    handler = type('BoundMockRequestHandler', (MockRequestHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+
+    thread = threading.Thread(target=server.serve_forever, name='mock-server', daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def mock_env(base_url):
+    """让管理器和生成流程访问模拟服务器所需的环境变量"""
+    return {
+        'JR_LOGIN_URL': f'{base_url}{LOGIN_PATH}?redirect=true',
+        'OSHITABI_LOGIN_URL': f'{base_url}{OSHITABI_LOGIN_PATH}',
+        'RIDING_RECORD_URL': f'{base_url}{CERTIFICATE_PATH}',
+        'VOICE_STORY_URL': f'{base_url}{STORY_PATH}',
+        'SURVEY_FORM_URL': f'{base_url}/survey/{{survey_id}}',
+        'TARGET_TEXT': TARGET_TEXT
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JR Central / oshi-tabi 本地模拟服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=0, help='每个请求的平均延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='延迟的随机抖动范围（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='注入错误响应的比例（0-1）')
+    parser.add_argument('--error-status', type=int, default=503, help='注入错误时返回的HTTP状态码')
+    parser.add_argument('--record-ratio', type=float, default=0.5, help='初始即有乘车记录的账号比例')
+    parser.add_argument('--no-conditional', action='store_true', help='证书页面不返回ETag/Last-Modified')
+    parser.add_argument('--max-rps', type=float, default=0, help='每秒最多处理的请求数，超出时返回429（0 = 不限制）')
+    parser.add_argument('--no-survey-form', action='store_true', help='问卷接口不返回问卷表单')
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.host, args.port, latency_ms=args.latency_ms,
+                                         jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                                         error_status=args.error_status, record_ratio=args.record_ratio,
+                                         conditional=not args.no_conditional, max_rps=args.max_rps,
+                                         survey_form=not args.no_survey_form)
+    print(f"🧪 模拟服务器已启动: {base_url}")
+    print("请设置以下环境变量:")
+    for name, value in mock_env(base_url).items():
+        print(f"{name}={value}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
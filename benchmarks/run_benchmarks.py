@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+离线基准测试
+启动本地模拟服务器（benchmarks/mock_server.py），在 10/100/1000 个账号规模下测量:
+
+- check_all_force_login: MultiAccountRidingRecordManager.check_all_accounts_force_login
+- flask_check_all:       POST /api/admin/check-all（forceLogin）
+- flask_accounts:        GET /api/admin/accounts（完整列表）
+- flask_accounts_page:   GET /api/admin/accounts?limit=50&sort=-expiryDate
+- flask_check_user:      POST /api/riding-record/check（逐个账号）
+- http_generate:         generate_riding_record(mode='http')，HttpSurveyGenerator 登录并提交问卷（逐个账号）
+- http_generate_no_form: 问卷接口不返回表单时的 http 模式（应失败且不提交问卷）
+- http_generate_auto:    问卷接口不返回表单时的 auto 模式（应回退到浏览器方式）
+
+输出每个场景的 账号/秒 和 p50/p95 延迟，结果保存为JSON，可用 --compare 与之前的结果对比。
+http_generate* 场景的错误数为结果与预期不一致的账号数。
+
+用法:
+    python benchmarks/run_benchmarks.py --sizes 10,100 --latency-ms 20 --compare benchmarks/results/baseline.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from mock_server import mock_env, start_mock_server  # noqa: E402
+
+SCENARIOS = ('check_all_force_login', 'flask_check_all', 'flask_accounts', 'flask_accounts_page', 'flask_check_user',
+             'http_generate', 'http_generate_no_form', 'http_generate_auto')
+
+
+def percentile(samples, fraction):
+    """最近秩法百分位数"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed, accounts, errors=0):
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'accounts': accounts,
+        'samples': len(samples),
+        'errors': errors,
+        'totalSeconds': round(elapsed, 3),
+        'accountsPerSecond': round(accounts / elapsed, 2) if elapsed > 0 else None,
+        'p50Ms': ms(percentile(samples, 0.50)),
+        'p95Ms': ms(percentile(samples, 0.95)),
+        'maxMs': ms(max(samples) if samples else None)
+    }
+
+
+def time_calls(obj, name):
+    """包装对象方法以记录每次调用的耗时和失败次数（结果信息为字符串时视为失败）"""
+    original = getattr(obj, name)
+    samples = []
+    errors = []
+
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = original(*args, **kwargs)
+        except Exception:
+            errors.append(1)
+            raise
+        finally:
+            samples.append(time.perf_counter() - started)
+        if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], str):
+            errors.append(1)
+        return result
+
+    setattr(obj, name, timed)
+    return samples, errors
+
+
+def write_accounts_config(path, size):
+    accounts = {
+        f'bench{size}_{i:04d}': {
+            'username': f'bench{size}_{i:04d}',
+            'password': 'password',
+            'display_name': f'基准账号 {i}',
+            'enabled': True
+        }
+        for i in range(size)
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'accounts': accounts}, f, ensure_ascii=False)
+    return list(accounts)
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """屏蔽被测代码的逐账号输出"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def run_manager_check_all(config_path, size, workers):
+    from multi_account_certificate_manager import MultiAccountRidingRecordManager
+
+    manager = MultiAccountRidingRecordManager(config_path, max_workers=workers)
+    samples, errors = time_calls(manager, 'check_riding_record_for_user')
+    started = time.perf_counter()
+    manager.check_all_accounts_force_login()
+    return summarize(samples, time.perf_counter() - started, size, len(errors))
+
+
+def reset_app_manager(app_module, config_path):
+    """让Flask应用使用新的账号配置"""
+    app_module.CONFIG_FILE = config_path
+    app_module.manager = None
+    app_module.accounts_view_cache.invalidate()
+    return app_module.get_manager()
+
+
+def run_flask_check_all(app_module, client, config_path, size):
+    manager = reset_app_manager(app_module, config_path)
+    samples, errors = time_calls(manager, 'check_riding_record_for_user')
+    started = time.perf_counter()
+    response = client.post('/api/admin/check-all', json={'forceLogin': True})
+    elapsed = time.perf_counter() - started
+    return summarize(samples, elapsed, size, len(errors) + (response.status_code != 200))
+
+
+def run_flask_get(client, url, size, repeat):
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        request_started = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - request_started)
+        errors += response.status_code != 200
+    elapsed = time.perf_counter() - started
+    # 吞吐量按返回的账号数计（完整列表每次返回全部账号）
+    returned = size if 'limit=' not in url else min(size, 50)
+    return summarize(samples, elapsed, returned * repeat, errors)
+
+
+def run_flask_check_user(client, usernames):
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for username in usernames:
+        request_started = time.perf_counter()
+        response = client.post('/api/riding-record/check', json={'username': username, 'password': 'password'})
+        samples.append(time.perf_counter() - request_started)
+        errors += response.status_code != 200
+    return summarize(samples, time.perf_counter() - started, len(usernames), errors)
+
+
+def run_http_generate(server, config_path, usernames, mode='http', survey_form=True):
+    """
+    通过 generate_riding_record 驱动 HttpSurveyGenerator，检查每个账号的结果是否符合预期:
+    有问卷表单时应生成成功（模拟服务器记录了该账号），没有表单时 http 模式应失败且不提交问卷，
+    auto 模式应回退到浏览器方式（结果不再是 mode='http'）
+    """
+    from headless_automation import generate_riding_record
+    from mock_server import SURVEY_SUBMIT_PATH
+    from multi_account_certificate_manager import MultiAccountRidingRecordManager
+
+    manager = MultiAccountRidingRecordManager(config_path)
+    state = server.state
+    submitted = state.stats()['requests'].get(SURVEY_SUBMIT_PATH, 0)
+    state.config.survey_form = survey_form
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    try:
+        for username in usernames:
+            request_started = time.perf_counter()
+            result = generate_riding_record(username, 'password', manager=manager, mode=mode)
+            samples.append(time.perf_counter() - request_started)
+            if survey_form:
+                expected = result.get('success') and result.get('mode') == 'http' and username in state.generated
+            elif mode == 'http':
+                expected = not result.get('success') and result.get('mode') == 'http'
+            else:
+                expected = result.get('mode') != 'http'
+            errors += not expected
+    finally:
+        state.config.survey_form = True
+    elapsed = time.perf_counter() - started
+
+    if not survey_form:
+        # 缺少表单时不应提交问卷
+        errors += state.stats()['requests'].get(SURVEY_SUBMIT_PATH, 0) - submitted
+    return summarize(samples, elapsed, len(usernames), errors)
+
+
+def compare(current, baseline_path):
+    """与之前保存的结果对比，打印吞吐量和延迟的变化"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\n📈 与 {baseline_path}（{baseline.get('timestamp')}）对比:")
+    for key, stats in current['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(key)
+        if not previous:
+            print(f"  {key}: 基准结果中没有此场景")
+            continue
+
+        changes = []
+        for field in ('accountsPerSecond', 'p50Ms', 'p95Ms'):
+            old, new = previous.get(field), stats.get(field)
+            if old and new is not None:
+                changes.append(f"{field} {old} → {new} ({(new - old) / old * 100:+.1f}%)")
+        print(f"  {key}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准测试（使用本地模拟服务器）')
+    parser.add_argument('--sizes', default='10,100,1000', help='账号数量，逗号分隔')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='要运行的场景，逗号分隔')
+    parser.add_argument('--workers', type=int, default=8, help='检查所有账号时的并发线程数')
+    parser.add_argument('--latency-ms', type=float, default=20, help='模拟服务器的平均响应延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='延迟的随机抖动范围（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='模拟服务器注入错误响应的比例')
+    parser.add_argument('--max-rps', type=float, default=0, help='模拟服务器每秒最多处理的请求数，超出返回429（0 = 不限制）')
+    parser.add_argument('--no-conditional', action='store_true', help='模拟服务器不支持ETag/304（测量完整抓取和解析）')
+    parser.add_argument('--accounts-repeat', type=int, default=50, help='账号列表接口的请求次数')
+    parser.add_argument('--user-check-limit', type=int, default=100, help='逐个账号查询/生成场景最多处理的账号数')
+    parser.add_argument('--fallback-limit', type=int, default=3,
+                        help='http_generate_no_form / http_generate_auto 场景处理的账号数（auto 会启动浏览器流程）')
+    parser.add_argument('--output', default=os.path.join(BENCHMARKS_DIR, 'results'), help='结果保存目录')
+    parser.add_argument('--compare', help='与之前保存的结果JSON对比')
+    parser.add_argument('--verbose', action='store_true', help='显示被测代码的输出')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    server, base_url = start_mock_server(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                         error_rate=args.error_rate, conditional=not args.no_conditional,
+                                         max_rps=args.max_rps)
+    workspace = tempfile.mkdtemp(prefix='riding_record_bench_')
+    original_cwd = os.getcwd()
+    output_dir = os.path.abspath(args.output)
+
+    # 被测代码在导入时读取环境变量
+    os.environ.update(mock_env(base_url))
+    os.environ.update({
+        'TIMING_LOG': 'false',
+        'CHECK_MAX_WORKERS': str(args.workers),
+        'HOST_RATE_LIMIT': '0',
+        'RESULTS_EXPORT_INTERVAL': '0',
+        'JOBS_DIR': os.path.join(workspace, 'jobs'),
+        'BROWSER_POOL_SIZE': '0',
+        # auto 回退到浏览器时只使用本机的 chromedriver，不联网获取
+        'CHROMEDRIVER_DOWNLOAD': 'false'
+    })
+
+    print(f"🧪 模拟服务器: {base_url}（延迟 {args.latency_ms}±{args.jitter_ms}ms，错误率 {args.error_rate}）")
+    print(f"📁 工作目录: {workspace}")
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'config': {
+            'sizes': sizes,
+            'workers': args.workers,
+            'latencyMs': args.latency_ms,
+            'jitterMs': args.jitter_ms,
+            'errorRate': args.error_rate,
+            'maxRps': args.max_rps,
+            'conditional': not args.no_conditional,
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'scenarios': {}
+    }
+
+    try:
+        app_module = client = None
+        if any(name.startswith('flask_') for name in scenarios):
+            os.chdir(workspace)
+            with quiet(not args.verbose):
+                import app as app_module
+            client = app_module.app.test_client()
+
+        for size in sizes:
+            # 每个规模使用独立的目录（results/ 为相对路径）
+            size_dir = os.path.join(workspace, f'accounts_{size}')
+            os.makedirs(os.path.join(size_dir, 'results'), exist_ok=True)
+            os.chdir(size_dir)
+            config_path = os.path.join(size_dir, 'accounts_config.json')
+            usernames = write_accounts_config(config_path, size)
+
+            for name in scenarios:
+                print(f"⏱️ {name} @ {size} 个账号...", end=' ', flush=True)
+                with quiet(not args.verbose):
+                    if name == 'check_all_force_login':
+                        stats = run_manager_check_all(config_path, size, args.workers)
+                    elif name == 'flask_check_all':
+                        stats = run_flask_check_all(app_module, client, config_path, size)
+                    elif name == 'flask_accounts':
+                        reset_app_manager(app_module, config_path)
+                        stats = run_flask_get(client, '/api/admin/accounts', size, args.accounts_repeat)
+                    elif name == 'flask_accounts_page':
+                        reset_app_manager(app_module, config_path)
+                        stats = run_flask_get(client, '/api/admin/accounts?limit=50&sort=-expiryDate',
+                                              size, args.accounts_repeat)
+                    elif name == 'flask_check_user':
+                        reset_app_manager(app_module, config_path)
+                        stats = run_flask_check_user(client, usernames[:args.user_check_limit])
+                    elif name == 'http_generate':
+                        stats = run_http_generate(server, config_path, usernames[:args.user_check_limit])
+                    elif name == 'http_generate_no_form':
+                        stats = run_http_generate(server, config_path, usernames[-args.fallback_limit:],
+                                                  survey_form=False)
+                    else:
+                        stats = run_http_generate(server, config_path, usernames[-args.fallback_limit:],
+                                                  mode='auto', survey_form=False)
+
+                report['scenarios'][f'{name}@{size}'] = stats
+                print(f"{stats['accountsPerSecond']} 账号/秒，p50 {stats['p50Ms']}ms，"
+                      f"p95 {stats['p95Ms']}ms，错误 {stats['errors']}")
+    finally:
+        os.chdir(original_cwd)
+        server.shutdown()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    report['mockServer'] = server.state.stats()
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 结果已保存: {output_file}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
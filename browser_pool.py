@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+无头浏览器池
+预先启动若干个Chrome实例，按任务租用，用完后清理状态放回池中，
+避免每次生成都冷启动Chromium
+"""
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+# 已分配给正在运行的浏览器的调试端口
+_reserved_ports = set()
+_reserved_ports_lock = threading.Lock()
+
+
+def allocate_debugging_port():
+    """分配一个当前空闲且未被其他浏览器占用的远程调试端口"""
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        with _reserved_ports_lock:
+            if port not in _reserved_ports:
+                _reserved_ports.add(port)
+                return port
+
+
+def release_debugging_port(port):
+    """释放远程调试端口"""
+    with _reserved_ports_lock:
+        _reserved_ports.discard(port)
+
+
+class PooledBrowser:
+    """池中的一个浏览器实例"""
+
+    def __init__(self, driver, profile_dir, debugging_port):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.debugging_port = debugging_port
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    预热的浏览器池
+
+    Args:
+        driver_factory (callable): driver_factory(profile_dir, debugging_port) -> WebDriver
+        size (int): 池中浏览器数量
+        max_uses (int): 单个浏览器最多使用次数，达到后销毁重建
+        reset_urls (list): 归还时需要清理存储的页面地址（按origin清理localStorage/sessionStorage）
+    """
+
+    def __init__(self, driver_factory, size=2, max_uses=20, reset_urls=None):
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_uses = max_uses
+        self.reset_origins = sorted({self._origin(url) for url in (reset_urls or []) if url})
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._free_slots = size
+        self._closed = False
+
+        self.launched = 0
+        self.recycled = 0
+        self.leases = 0
+
+    @staticmethod
+    def _origin(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _reserve_slot(self):
+        """占用一个浏览器名额，池已满或已关闭时返回False"""
+        with self._lock:
+            if self._closed or self._free_slots <= 0:
+                return False
+            self._free_slots -= 1
+            return True
+
+    def _launch(self):
+        """启动一个新的浏览器实例（独立的调试端口和用户数据目录）"""
+        port = allocate_debugging_port()
+        profile_dir = tempfile.mkdtemp(prefix="selenium_pool_")
+        try:
+            driver = self.driver_factory(profile_dir, port)
+        except Exception:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            release_debugging_port(port)
+            with self._lock:
+                self._free_slots += 1
+            raise
+
+        with self._lock:
+            self.launched += 1
+        print(f"🌐 浏览器池启动新实例（端口 {port}）")
+        return PooledBrowser(driver, profile_dir, port)
+
+    def _destroy(self, browser):
+        """关闭浏览器并删除其临时目录"""
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            print(f"⚠️ 关闭浏览器实例失败: {e}")
+        shutil.rmtree(browser.profile_dir, ignore_errors=True)
+        release_debugging_port(browser.debugging_port)
+        with self._lock:
+            self._free_slots += 1
+
+    def _is_healthy(self, browser):
+        """健康检查：浏览器仍能执行脚本"""
+        try:
+            return browser.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _reset(self, browser):
+        """清理cookie、localStorage和sessionStorage，供下一个账号使用"""
+        driver = browser.driver
+        driver.delete_all_cookies()
+        try:
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            for origin in self.reset_origins:
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                    'origin': origin,
+                    'storageTypes': 'local_storage,session_storage,indexeddb,cache_storage,service_workers'
+                })
+        except Exception:
+            # 非Chromium驱动不支持CDP时，退回到清理当前页面的存储
+            driver.execute_script("localStorage.clear(); sessionStorage.clear();")
+        driver.get('about:blank')
+
+    def warm(self):
+        """预先启动池中全部浏览器"""
+        while self._reserve_slot():
+            self._idle.put(self._launch())
+
+    def acquire(self, timeout=None):
+        """租用一个健康的浏览器实例"""
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve_slot():
+                    browser = self._launch()
+                else:
+                    browser = self._idle.get(timeout=timeout)
+
+            if self._is_healthy(browser):
+                with self._lock:
+                    self.leases += 1
+                return browser
+
+            print(f"⚠️ 浏览器实例（端口 {browser.debugging_port}）健康检查失败，重新启动")
+            self._destroy(browser)
+
+    def release(self, browser, discard=False):
+        """归还浏览器实例；达到使用次数上限或出错时销毁"""
+        browser.uses += 1
+
+        if discard or self._closed or browser.uses >= self.max_uses:
+            with self._lock:
+                self.recycled += 1
+            self._destroy(browser)
+            return
+
+        try:
+            self._reset(browser)
+        except Exception as e:
+            print(f"⚠️ 重置浏览器实例失败，销毁该实例: {e}")
+            self._destroy(browser)
+            return
+
+        self._idle.put(browser)
+
+    def close(self):
+        """关闭池中所有空闲浏览器"""
+        self._closed = True
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._destroy(browser)
+
+    def stats(self):
+        """返回浏览器池统计"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': self._idle.qsize(),
+                'launched': self.launched,
+                'recycled': self.recycled,
+                'leases': self.leases,
+                'maxUses': self.max_uses
+            }
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+oshitabi cookie 持久化缓存
+按用户名保存登录后获得的cookie及其过期时间，避免每次检查都重新登录
+cookie保存在结果数据库（SQLite WAL）的 cookies 表中，每次写入只更新一行，多个服务进程共享；
+旧版的JSON缓存文件在首次使用时导入
+"""
+import json
+import os
+import time
+
+
+class CookieCache:
+    """
+    按用户名存储的cookie缓存（带过期元数据）
+
+    Args:
+        store (ResultsStore): 保存cookie的结果存储
+        ttl (float): cookie最长有效秒数
+        legacy_file (str): 旧版JSON缓存文件，导入其中未过期的条目后重命名为 *.imported（只导入一次）
+    """
+
+    def __init__(self, store, ttl=1800, legacy_file=None):
+        self.store = store
+        self.ttl = ttl
+        if legacy_file:
+            self._import_legacy_json(legacy_file)
+
+    def _import_legacy_json(self, legacy_file):
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ 读取旧版cookie缓存失败: {e}")
+            return
+
+        now = time.time()
+        cookies = {
+            username: (entry['cookie'], entry.get('obtained_at') or now, entry['expires_at'])
+            for username, entry in (legacy.items() if isinstance(legacy, dict) else [])
+            if isinstance(entry, dict) and entry.get('cookie') and (entry.get('expires_at') or 0) > now
+        }
+        # 数据库中已有的cookie更新，不被旧文件覆盖
+        cookies = {username: values for username, values in cookies.items() if not self.store.get_cookie(username)}
+        if cookies:
+            self.store.set_cookies(cookies)
+            print(f"✅ 已从 {legacy_file} 导入 {len(cookies)} 个cookie")
+        try:
+            os.replace(legacy_file, legacy_file + '.imported')
+        except OSError as e:
+            print(f"⚠️ 重命名旧版cookie缓存失败: {e}")
+
+    def get(self, username):
+        """获取未过期的cookie，不存在或已过期时返回None"""
+        entry = self.store.get_cookie(username)
+        if not entry or (entry[1] or 0) <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, username, cookie, expires_at=None):
+        """保存cookie；未提供过期时间时使用默认TTL"""
+        now = time.time()
+        if not expires_at or expires_at <= now:
+            expires_at = now + self.ttl
+        else:
+            expires_at = min(expires_at, now + self.ttl)
+        self.store.set_cookies({username: (cookie, now, expires_at)})
+
+    def invalidate(self, username):
+        """删除指定用户的cookie（会话失效时调用）"""
+        self.store.delete_cookie(username)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+ChromeDriver 解析
+启动时探测一次可用的 chromedriver 和 Chromium（路径和版本），结果缓存在内存和磁盘上；
+之后每次启动浏览器直接使用缓存的路径，不再访问网络，也不再逐个尝试失败的方式。
+只有缓存的文件被替换（大小/修改时间变化）或启动失败时才重新探测，且两次探测至少间隔 reprobe_interval 秒；
+探测失败的结果同样在这段时间内缓存，不会每次启动浏览器都重新探测。
+设置 allow_download 后，本地找不到可用的 chromedriver 时回退到 Selenium Manager / webdriver-manager 获取一次，结果同样缓存
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+DEFAULT_DRIVER_PATHS = ('/usr/bin/chromedriver', '/usr/local/bin/chromedriver')
+DEFAULT_BROWSER_NAMES = ('chromium', 'chromium-browser', 'google-chrome', 'google-chrome-stable', 'chrome')
+DEFAULT_BROWSER_PATHS = (
+    '/usr/bin/chromium',
+    '/usr/bin/chromium-browser',
+    '/usr/bin/google-chrome',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    '/Applications/Chromium.app/Contents/MacOS/Chromium'
+)
+
+VERSION_PATTERN = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+
+
+def probe_version(path, timeout=5):
+    """运行 `path --version`，返回版本号（如 '120.0.6099.224'），无法运行时返回None"""
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=timeout).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_PATTERN.search(output or '')
+    return match.group(0) if match else None
+
+
+def major_version(version):
+    return version.split('.', 1)[0] if version else None
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _unique(paths):
+    seen = []
+    for path in paths:
+        if path and path not in seen:
+            seen.append(path)
+    return seen
+
+
+class DriverResolver:
+    """
+    chromedriver / Chromium 路径解析（探测结果缓存在内存和 cache_file 中）
+
+    Args:
+        cache_file (str): 磁盘缓存文件（JSON），None 时只缓存在内存中
+        driver_path (str): 指定的 chromedriver 路径（指定后不再探测其他路径）
+        browser_path (str): 指定的 Chromium/Chrome 路径（指定后不再探测其他路径）
+        allow_download (bool): 本地找不到可用的 chromedriver 时，是否回退到 Selenium Manager / webdriver-manager
+            获取（需要网络，结果同样缓存）
+        probe_timeout (float): 运行 --version 的超时秒数
+        reprobe_interval (float): 本进程两次探测的最小间隔秒数（启动失败时在此间隔内不再重新探测，探测失败的结果也缓存这么久）
+    """
+
+    def __init__(self, cache_file=None, driver_path=None, browser_path=None, allow_download=False, probe_timeout=5,
+                 reprobe_interval=300):
+        self.cache_file = cache_file
+        self.driver_path = driver_path
+        self.browser_path = browser_path
+        self.allow_download = allow_download
+        self.probe_timeout = probe_timeout
+        self.reprobe_interval = reprobe_interval
+
+        self._lock = threading.Lock()
+        self._resolved = None
+        self._probed_at = None
+        self._probe_error = None
+        self.probes = 0
+        self.cache_hits = 0
+        self.last_probe_seconds = None
+
+    # ---- 候选路径 ----
+
+    def _driver_candidates(self):
+        if self.driver_path:
+            return [self.driver_path]
+        return _unique([shutil.which('chromedriver'), *DEFAULT_DRIVER_PATHS])
+
+    def _browser_candidates(self):
+        if self.browser_path:
+            return [self.browser_path]
+        return _unique([*(shutil.which(name) for name in DEFAULT_BROWSER_NAMES), *DEFAULT_BROWSER_PATHS])
+
+    def _find_browser(self):
+        for path in self._browser_candidates():
+            if os.path.isfile(path):
+                version = probe_version(path, self.probe_timeout)
+                if version:
+                    return path, version
+        return None, None
+
+    def _matches(self, path, browser_version):
+        """path 可以运行且与浏览器版本主号一致时返回其版本"""
+        version = probe_version(path, self.probe_timeout) if path else None
+        if version and (browser_version is None or major_version(version) == major_version(browser_version)):
+            return version
+        return None
+
+    def _selenium_manager(self, browser_version):
+        """用 Selenium Manager 获取 chromedriver（以及本地没有浏览器时下载的 Chrome for Testing）"""
+        try:
+            from selenium.webdriver.common.selenium_manager import SeleniumManager
+            args = ['--browser', 'chrome']
+            if self.browser_path:
+                args += ['--browser-path', self.browser_path]
+            paths = SeleniumManager().binary_paths(args)
+        except Exception as e:
+            print(f"⚠️ Selenium Manager 获取 ChromeDriver 失败: {e}")
+            return None, None, None
+        driver_path = paths.get('driver_path')
+        browser_path = paths.get('browser_path') or None
+        if browser_version is None and browser_path:
+            browser_version = probe_version(browser_path, self.probe_timeout)
+        version = self._matches(driver_path, browser_version)
+        return (driver_path, version, browser_path) if version else (None, None, None)
+
+    def _webdriver_manager(self, browser_version):
+        """用 webdriver-manager 下载 chromedriver"""
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+        except Exception as e:
+            print(f"⚠️ webdriver-manager 下载 ChromeDriver 失败: {e}")
+            return None, None
+        version = self._matches(path, browser_version)
+        return (path, version) if version else (None, None)
+
+    # ---- 探测和缓存 ----
+
+    def probe(self):
+        """
+        探测可用的 chromedriver 和浏览器（版本主号一致的组合优先）
+
+        Returns:
+            dict: {'driverPath', 'driverVersion', 'browserPath', 'browserVersion', 'source', ...}
+        """
+        started = time.perf_counter()
+        browser_path, browser_version = self._find_browser()
+
+        driver_path = driver_version = None
+        fallback = None
+        source = 'local'
+        for path in self._driver_candidates():
+            if not (os.path.isfile(path) and os.access(path, os.X_OK)):
+                continue
+            version = probe_version(path, self.probe_timeout)
+            if not version:
+                continue
+            if browser_version is None or major_version(version) == major_version(browser_version):
+                driver_path, driver_version = path, version
+                break
+            fallback = fallback or (path, version)
+
+        if driver_path is None and self.allow_download and not self.driver_path:
+            # 本地没有版本一致的 chromedriver：回退一次，得到的路径和本地路径一样缓存，之后不再访问网络
+            driver_path, driver_version, managed_browser = self._selenium_manager(browser_version)
+            if driver_path:
+                source = 'selenium-manager'
+                if browser_path is None and managed_browser:
+                    browser_path, browser_version = managed_browser, probe_version(managed_browser, self.probe_timeout)
+            else:
+                driver_path, driver_version = self._webdriver_manager(browser_version)
+                source = 'webdriver-manager'
+        if driver_path is None and fallback is not None:
+            # 版本不一致时仍然尝试（由 chromedriver 启动时报告具体错误）
+            driver_path, driver_version = fallback
+            source = 'local-mismatch'
+            print(f"⚠️ ChromeDriver {driver_version} 与浏览器 {browser_version} 版本不一致")
+        if driver_path is None:
+            hint = ("Selenium Manager / webdriver-manager 也未能获取" if self.allow_download
+                    else "或设置 CHROMEDRIVER_DOWNLOAD=true 允许通过 Selenium Manager / webdriver-manager 获取")
+            raise RuntimeError(f"未找到可用的 ChromeDriver（可通过 CHROMEDRIVER_PATH 指定，{hint}）")
+
+        self.probes += 1
+        self.last_probe_seconds = round(time.perf_counter() - started, 3)
+        return {
+            'driverPath': driver_path,
+            'driverVersion': driver_version,
+            'driverSignature': _file_signature(driver_path),
+            'browserPath': browser_path,
+            'browserVersion': browser_version,
+            'browserSignature': _file_signature(browser_path) if browser_path else None,
+            'source': source,
+            'probedAt': time.time()
+        }
+
+    def _valid(self, resolved):
+        """缓存的路径仍指向同一个文件（未被升级或删除）且与指定路径一致"""
+        if not resolved or _file_signature(resolved.get('driverPath') or '') != resolved.get('driverSignature'):
+            return False
+        if resolved.get('browserPath') and _file_signature(resolved['browserPath']) != resolved.get('browserSignature'):
+            return False
+        if self.driver_path and resolved['driverPath'] != self.driver_path:
+            return False
+        if self.browser_path and resolved.get('browserPath') != self.browser_path:
+            return False
+        return True
+
+    def _load_cache(self):
+        if not self.cache_file:
+            return None
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_cache(self, resolved):
+        if not self.cache_file:
+            return
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.chromedriver_', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(resolved, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.cache_file)
+        except OSError as e:
+            print(f"⚠️ 保存 ChromeDriver 缓存失败: {e}")
+
+    def _recently_probed(self):
+        return self._probed_at is not None and time.monotonic() - self._probed_at < self.reprobe_interval
+
+    def resolve(self):
+        """返回缓存的解析结果（内存 -> 磁盘 -> 重新探测）；最近一次探测失败时直接抛出同样的错误"""
+        resolved = self._resolved
+        if resolved is not None and self._valid(resolved):
+            self.cache_hits += 1
+            return resolved
+
+        with self._lock:
+            if self._resolved is not None and self._valid(self._resolved):
+                self.cache_hits += 1
+                return self._resolved
+
+            resolved = self._load_cache()
+            if self._valid(resolved):
+                self.cache_hits += 1
+            else:
+                if self._probe_error is not None and self._recently_probed():
+                    raise RuntimeError(self._probe_error)
+                self._probed_at = time.monotonic()
+                try:
+                    resolved = self.probe()
+                except RuntimeError as e:
+                    self._probe_error = str(e)
+                    raise
+                self._probe_error = None
+                self._save_cache(resolved)
+                print(f"✅ ChromeDriver {resolved['driverVersion']}: {resolved['driverPath']}"
+                      f"（浏览器 {resolved['browserVersion'] or '未知'}，探测耗时 {self.last_probe_seconds}s）")
+            self._resolved = resolved
+            return resolved
+
+    def invalidate(self):
+        """
+        丢弃缓存（启动失败时调用，下次 resolve 重新探测）
+
+        Returns:
+            bool: 是否已丢弃；本进程最近 reprobe_interval 秒内刚探测过时不丢弃（重新探测也不会得到不同的结果）
+        """
+        with self._lock:
+            if self._recently_probed():
+                return False
+            self._resolved = None
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    os.remove(self.cache_file)
+                except OSError:
+                    pass
+            return True
+
+    def stats(self):
+        resolved = self._resolved or {}
+        return {
+            'driverPath': resolved.get('driverPath'),
+            'driverVersion': resolved.get('driverVersion'),
+            'browserPath': resolved.get('browserPath'),
+            'browserVersion': resolved.get('browserVersion'),
+            'source': resolved.get('source'),
+            'probes': self.probes,
+            'cacheHits': self.cache_hits,
+            'lastProbeSeconds': self.last_probe_seconds,
+            'lastProbeError': self._probe_error
+        }
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+进程间文件锁
+多个服务进程（gunicorn workers）共享同一批文件时，用 flock 串行化"读取-合并-写入"；
+不支持 fcntl 的平台（Windows）上退化为进程内的线程锁
+"""
+import contextlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextlib.contextmanager
+def locked(path):
+    """
+    独占锁定 path（锁文件为 path + '.lock'），同一进程内的线程和其他进程都会等待
+
+    Args:
+        path (str): 被保护的文件路径
+    """
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(f'{path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class ProcessLease:
+    """
+    非阻塞的进程级独占租约（用于只允许一个进程执行的后台任务，如定期复查）
+
+    持有租约的进程退出时操作系统自动释放，其他进程下次尝试时即可取得
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        """尝试取得租约，已持有或取得成功时返回True"""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None and self._file is not True:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
@@ -1,4 +1,5 @@
 import api from './index.js'
+import { waitForJob } from './jobs.js'
 
 /**
  * 管理员登录
@@ -22,22 +23,54 @@ export const getAccounts = async () => {
 }
 
 /**
- * 批量生成乘车记录
- * @param {Array} usernames 用户名列表
- * @returns {Promise} 批量操作结果
+ * 批量生成乘车记录（流式读取每个账号的进度）
+ * @param {Array} usernames 用户名列表，为空时处理所有启用的账号
+ * @param {Function} onEvent 进度事件回调（start / progress / summary）
+ * @returns {Promise} 最终的 summary 事件
  */
-export const batchGenerateRecords = async (usernames) => {
-  const response = await api.post('/admin/batch-generate', {
-    usernames
+export const batchGenerateRecords = async (usernames, onEvent = null) => {
+  const response = await fetch('/api/admin/batch-generate', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ usernames })
   })
-  return response
+
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}))
+    throw new Error(error.message || '批量生成失败')
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let summary = null
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop()
+
+    for (const line of lines) {
+      if (!line.trim()) continue
+      const event = JSON.parse(line)
+      if (event.type === 'summary') summary = event
+      if (onEvent) onEvent(event)
+    }
+  }
+
+  return summary
 }
 
 /**
- * 检查所有账号的乘车记录
+ * 检查所有账号的乘车记录（提交后台任务并轮询结果）
+ * @param {Function} onProgress 进度回调
  * @returns {Promise} 检查结果
  */
-export const checkAllAccountsRecords = async () => {
-  const response = await api.post('/admin/check-all')
+export const checkAllAccountsRecords = async (onProgress = null) => {
+  const { jobId } = await api.post('/jobs/admin/check-all')
+  const response = await waitForJob(jobId, onProgress)
   return response
 }
@@ -0,0 +1,46 @@
+import api from './index.js'
+
+/**
+ * 查询后台任务状态
+ * @param {string} jobId 任务ID
+ * @returns {Promise} 任务状态和进度
+ */
+export const getJob = async (jobId) => {
+  const response = await api.get(`/jobs/${jobId}`)
+  return response.job
+}
+
+/**
+ * 获取后台任务结果
+ * @param {string} jobId 任务ID
+ * @returns {Promise} 任务结果
+ */
+export const getJobResult = async (jobId) => {
+  const response = await api.get(`/jobs/${jobId}/result`)
+  return response
+}
+
+/**
+ * 轮询等待后台任务完成并返回结果
+ * @param {string} jobId 任务ID
+ * @param {Function} onProgress 进度回调，参数为任务的 progress 字段
+ * @param {number} interval 轮询间隔（毫秒）
+ * @param {number} timeout 最长等待时间（毫秒），超过后抛出错误
+ * @returns {Promise} 任务结果
+ */
+export const waitForJob = async (jobId, onProgress = null, interval = 1000, timeout = 10 * 60 * 1000) => {
+  const deadline = Date.now() + timeout
+  while (true) {
+    const job = await getJob(jobId)
+    if (onProgress) {
+      onProgress(job.progress)
+    }
+    if (job.status === 'succeeded' || job.status === 'failed') {
+      return getJobResult(jobId)
+    }
+    if (Date.now() >= deadline) {
+      throw new Error(`任务 ${jobId} 等待超时（${Math.round(timeout / 1000)} 秒）`)
+    }
+    await new Promise(resolve => setTimeout(resolve, interval))
+  }
+}
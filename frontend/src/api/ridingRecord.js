@@ -1,23 +1,5 @@
 import api from './index.js'
-import axios from 'axios'
-
-// 为生成功能创建专门的API实例（更长的超时时间）
-const generateApi = axios.create({
-  baseURL: '/api',
-  timeout: 300000, // 5分钟超时，适应完整的自动化流程
-  headers: {
-    'Content-Type': 'application/json'
-  }
-})
-
-// 生成API的响应拦截器
-generateApi.interceptors.response.use(
-  response => response.data,
-  error => {
-    const message = error.response?.data?.message || error.message || '生成失败'
-    return Promise.reject(new Error(message))
-  }
-)
+import { waitForJob } from './jobs.js'
 
 /**
  * 检查乘车记录
@@ -34,19 +16,19 @@ export const checkRidingRecord = async (username, password) => {
 }
 
 /**
- * 生成乘车记录
+ * 生成乘车记录（提交后台任务并轮询结果）
  * @param {string} username 用户名
  * @param {string} password 密码
+ * @param {Function} onProgress 进度回调
  * @returns {Promise} 生成结果
  */
-export const generateRidingRecord = async (username, password) => {
+export const generateRidingRecord = async (username, password, onProgress = null) => {
   console.log('🚀 前端发送生成请求:', { username, password: password ? '***' : '空' })
-  const requestData = {
+  const { jobId } = await api.post('/jobs/riding-record/generate', {
     username,
     password
-  }
-  console.log('📤 请求数据:', requestData)
-  const response = await generateApi.post('/riding-record/generate', requestData)
+  })
+  const response = await waitForJob(jobId, onProgress)
   console.log('📥 后端响应:', response)
   return response
 }
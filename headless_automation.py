@@ -6,17 +6,207 @@
 import time
 import tempfile
 import os
+import threading
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from dotenv import load_dotenv
 
+from browser_pool import BrowserPool, allocate_debugging_port, release_debugging_port
+from driver_resolver import DriverResolver
+from http_generator import HttpSurveyGenerator, STORY_ITEM_ID, SURVEY_ID, SURVEY_ANSWERS
+from metrics import record_phase, span
+
 # 加载环境变量
 load_dotenv()
 
+# 浏览器池配置 - 从环境变量读取（BROWSER_POOL_SIZE=0 时每次生成都冷启动浏览器）
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '0'))
+BROWSER_MAX_USES = int(os.getenv('BROWSER_MAX_USES', '20'))
+
+# 生成方式：selenium（浏览器）、http（直接提交问卷）、auto（先HTTP，失败时回退到浏览器）
+GENERATION_MODE = os.getenv('GENERATION_MODE', 'selenium').lower()
+
+# 同时运行的生成任务上限（每个任务占用一个独立的浏览器）
+GENERATION_MAX_CONCURRENCY = int(os.getenv('GENERATION_MAX_CONCURRENCY', '2'))
+
+# 各步骤的等待超时（秒）和轮询间隔 - 条件满足即继续，不再固定sleep
+STEP_TIMEOUTS = {
+    'login_page': float(os.getenv('WAIT_TIMEOUT_LOGIN_PAGE', '15')),
+    'login_redirect': float(os.getenv('WAIT_TIMEOUT_LOGIN_REDIRECT', '20')),
+    'story_page': float(os.getenv('WAIT_TIMEOUT_STORY_PAGE', '20')),
+    'survey_modal': float(os.getenv('WAIT_TIMEOUT_SURVEY', '10')),
+    'survey_submit': float(os.getenv('WAIT_TIMEOUT_SUBMIT', '10'))
+}
+WAIT_POLL_INTERVAL = float(os.getenv('WAIT_POLL_INTERVAL', '0.1'))
+
+# 浏览器配置：full（默认）加载页面的全部资源；lightweight 不加载图片、字体和音视频，使用较小的窗口和省内存的启动参数
+BROWSER_PROFILE = os.getenv('BROWSER_PROFILE', 'full').lower()
+BROWSER_WINDOW_SIZE = os.getenv('BROWSER_WINDOW_SIZE', '')
+
+# lightweight 模式下通过CDP屏蔽的URL（通配符模式，逗号分隔，可用 BROWSER_BLOCKED_URLS 覆盖）
+DEFAULT_BLOCKED_URLS = (
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    '*.mp3*', '*.m4a*', '*.aac*', '*.ogg*', '*.wav*', '*.mp4*', '*.webm*', '*.m3u8*'
+)
+BROWSER_BLOCKED_URLS = [pattern.strip() for pattern in os.getenv('BROWSER_BLOCKED_URLS', ','.join(DEFAULT_BLOCKED_URLS)).split(',')
+                        if pattern.strip()]
+
+# 设置后只允许访问这些主机（逗号分隔，支持 *.example.com），其余第三方请求一律不解析；
+# 登录页、语音页等配置的地址所在主机始终允许
+BROWSER_ALLOWED_HOSTS = [host.strip() for host in os.getenv('BROWSER_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+# ChromeDriver 路径解析：探测一次后缓存在内存和磁盘上；CHROMEDRIVER_DOWNLOAD=true 时本地没有可用的chromedriver
+# 才回退到 Selenium Manager / webdriver-manager 一次
+driver_resolver = DriverResolver(
+    os.getenv('CHROMEDRIVER_CACHE_FILE', os.path.join('results', 'chromedriver.json')),
+    driver_path=os.getenv('CHROMEDRIVER_PATH') or None,
+    browser_path=os.getenv('CHROME_BINARY') or None,
+    allow_download=os.getenv('CHROMEDRIVER_DOWNLOAD', 'false').lower() == 'true',
+    reprobe_interval=float(os.getenv('CHROMEDRIVER_REPROBE_INTERVAL', '300'))
+)
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+_generation_semaphore = threading.BoundedSemaphore(max(1, GENERATION_MAX_CONCURRENCY))
+
+def site_hosts():
+    """生成流程访问的站点主机（第三方请求屏蔽时始终允许）"""
+    urls = [
+        os.getenv('JR_LOGIN_URL', 'https://orange-system.jr-central.co.jp/user/login?redirect=true'),
+        os.getenv('OSHITABI_LOGIN_URL', 'https://oshi-tabi.voistock.com/orange/login.php'),
+        os.getenv('VOICE_STORY_URL', 'https://oshi-tabi.voistock.com/bang-dream-10th/voice/685b5e4be9c4185cba9c2a94')
+    ]
+    return [host for host in dict.fromkeys(urlparse(url).hostname for url in urls) if host]
+
+def build_chrome_options(profile_dir, debugging_port, profile=None):
+    """
+    构建无头Chrome启动参数
+
+    Args:
+        profile (str): lightweight 或 full，默认使用 BROWSER_PROFILE
+    """
+    lightweight = (profile or BROWSER_PROFILE) == 'lightweight'
+    options = Options()
+    
+    # 无头模式
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument(f"--window-size={BROWSER_WINDOW_SIZE or ('1280,720' if lightweight else '1920,1080')}")
+    
+    # 避免检测
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    if lightweight:
+        # 不加载图片、不自动播放音视频（字体和音视频文件由 apply_resource_blocking 通过CDP屏蔽）
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2
+        })
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--autoplay-policy=user-gesture-required")
+        options.add_argument("--mute-audio")
+
+        # 减少后台进程和内存占用
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--disable-sync")
+        options.add_argument("--no-first-run")
+        options.add_argument("--renderer-process-limit=2")
+        options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication")
+
+        if BROWSER_ALLOWED_HOSTS:
+            # 未允许的主机一律解析失败，第三方脚本、统计和广告请求不会发出
+            allowed = list(dict.fromkeys(site_hosts() + BROWSER_ALLOWED_HOSTS))
+            rules = ', '.join(['MAP * ~NOTFOUND'] + [f'EXCLUDE {host}' for host in allowed])
+            options.add_argument(f"--host-resolver-rules={rules}")
+    
+    # 独立环境
+    options.add_argument(f"--user-data-dir={profile_dir}")
+    options.add_argument(f"--remote-debugging-port={debugging_port}")
+    return options
+
+def apply_resource_blocking(driver, profile=None):
+    """lightweight 模式下通过CDP屏蔽字体、图片和音视频请求（对浏览器中当前标签页的后续请求生效）"""
+    if (profile or BROWSER_PROFILE) != 'lightweight' or not BROWSER_BLOCKED_URLS:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BROWSER_BLOCKED_URLS})
+    except WebDriverException as e:
+        print(f"⚠️ 设置资源屏蔽失败: {e}")
+
+def create_headless_driver(profile_dir, debugging_port, profile=None):
+    """
+    启动无头Chrome并返回driver（使用缓存的ChromeDriver路径，启动失败时最多重新探测一次）
+
+    Args:
+        profile (str): lightweight 或 full，默认使用 BROWSER_PROFILE
+    """
+    from selenium.webdriver.chrome.service import Service
+
+    for attempt in range(2):
+        resolved = driver_resolver.resolve()
+        options = build_chrome_options(profile_dir, debugging_port, profile)
+        if resolved.get('browserPath'):
+            options.binary_location = resolved['browserPath']
+        try:
+            driver = webdriver.Chrome(service=Service(executable_path=resolved['driverPath']), options=options)
+            break
+        except WebDriverException as e:
+            # 驱动或浏览器可能已被升级/替换，丢弃缓存后重新探测（刚探测过时不再重复探测）
+            if attempt or not driver_resolver.invalidate():
+                raise
+            print(f"⚠️ ChromeDriver {resolved['driverPath']} 启动失败，重新探测: {e}")
+
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    apply_resource_blocking(driver, profile)
+    return driver
+
+def document_ready(driver):
+    """页面加载完成条件"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+def get_browser_pool():
+    """获取全局浏览器池（未启用时返回None）"""
+    global _browser_pool
+    if BROWSER_POOL_SIZE <= 0:
+        return None
+
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool(
+                create_headless_driver,
+                size=BROWSER_POOL_SIZE,
+                max_uses=BROWSER_MAX_USES,
+                reset_urls=[
+                    os.getenv('JR_LOGIN_URL', 'https://orange-system.jr-central.co.jp/user/login?redirect=true'),
+                    os.getenv('VOICE_STORY_URL', 'https://oshi-tabi.voistock.com/bang-dream-10th/voice/685b5e4be9c4185cba9c2a94')
+                ]
+            )
+        return _browser_pool
+
 class HeadlessAutomation:
-    def __init__(self, username=None, password=None):
-        self.driver = None
+    def __init__(self, username=None, password=None, driver=None):
+        # 传入driver时（来自浏览器池）直接使用，不负责启动和关闭
+        self.driver = driver
+        self.owns_driver = driver is None
         self.temp_dir = None
+        self.debugging_port = None
+        # 各步骤实际耗时（秒）
+        self.step_timings = {}
         self.username = username
         self.password = password
         
@@ -29,95 +219,54 @@ class HeadlessAutomation:
         try:
             print(f"🌐 设置无头浏览器...")
             
-            # 创建临时用户数据目录
+            started = time.monotonic()
+
+            # 创建临时用户数据目录，并分配独立的远程调试端口
             self.temp_dir = tempfile.mkdtemp(prefix="selenium_headless_")
-            
-            options = Options()
-            
-            # 无头模式
-            options.add_argument("--headless")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            
-            # 避免检测
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            
-            # 独立环境
-            options.add_argument(f"--user-data-dir={self.temp_dir}")
-            options.add_argument("--remote-debugging-port=9225")
-            
-            # 启动Chrome浏览器
-            from selenium.webdriver.chrome.service import Service
-
-            # 尝试多种ChromeDriver获取方式
-            driver_created = False
-
-            # 方案1: 使用webdriver-manager（如果网络可用）
-            try:
-                from webdriver_manager.chrome import ChromeDriverManager
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=options)
-                print("✅ 使用 webdriver-manager 自动管理的 ChromeDriver")
-                driver_created = True
-            except Exception as e:
-                print(f"⚠️ webdriver-manager 失败: {e}")
-
-            # 方案2: 使用系统路径（Linux/Docker环境）
-            if not driver_created:
-                chromedriver_paths = ['/usr/bin/chromedriver', '/usr/local/bin/chromedriver']
-                for path in chromedriver_paths:
-                    try:
-                        service = Service(executable_path=path)
-                        self.driver = webdriver.Chrome(service=service, options=options)
-                        print(f"✅ 使用系统路径: {path}")
-                        driver_created = True
-                        break
-                    except Exception as e:
-                        print(f"⚠️ 系统路径 {path} 失败: {e}")
-                        continue
-
-            # 方案3: 使用默认ChromeDriver（依赖PATH环境变量）
-            if not driver_created:
-                try:
-                    service = Service()
-                    self.driver = webdriver.Chrome(service=service, options=options)
-                    print("✅ 使用默认 ChromeDriver")
-                    driver_created = True
-                except Exception as e:
-                    print(f"⚠️ 默认 ChromeDriver 失败: {e}")
-
-            # 方案4: 尝试不指定service（让Selenium自动处理）
-            if not driver_created:
-                try:
-                    self.driver = webdriver.Chrome(options=options)
-                    print("✅ 使用 Selenium 自动管理的 ChromeDriver")
-                    driver_created = True
-                except Exception as e:
-                    print(f"⚠️ Selenium 自动管理失败: {e}")
-
-            if not driver_created:
-                raise Exception("所有ChromeDriver获取方式都失败了")
-
-
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            print(f"✅ 无头浏览器启动成功")
+            self.debugging_port = allocate_debugging_port()
+            self.driver = create_headless_driver(self.temp_dir, self.debugging_port)
+            self.step_timings['browser_setup'] = round(time.monotonic() - started, 3)
+            record_phase('generate.browser_setup', time.monotonic() - started, username=self.username)
+            print(f"✅ 无头浏览器启动成功（调试端口 {self.debugging_port}）")
             return True
             
         except Exception as e:
             print(f"❌ 无头浏览器设置失败: {e}")
             return False
     
+    def wait_for(self, step, condition):
+        """
+        等待条件满足并记录该步骤的实际耗时
+
+        Args:
+            step (str): 步骤名（对应 STEP_TIMEOUTS 中的超时配置）
+            condition (callable): 以driver为参数的等待条件
+
+        Returns:
+            bool: 条件是否在超时前满足
+        """
+        started = time.monotonic()
+        try:
+            WebDriverWait(self.driver, STEP_TIMEOUTS[step], poll_frequency=WAIT_POLL_INTERVAL).until(condition)
+            satisfied = True
+        except TimeoutException:
+            print(f"⚠️ 等待 {step} 超时（{STEP_TIMEOUTS[step]}s）")
+            satisfied = False
+
+        elapsed = time.monotonic() - started
+        self.step_timings[step] = round(elapsed, 3)
+        record_phase(f'generate.wait.{step}', elapsed, 'ok' if satisfied else 'error', username=self.username)
+        return satisfied
+
     def perform_login(self):
         """执行登录"""
         try:
             print(f"🔑 执行JR Central登录...")
             
             self.driver.get(self.jr_login_url)
-            time.sleep(3)
+            if not self.wait_for('login_page', EC.presence_of_element_located(("name", "login_id"))):
+                print(f"❌ 登录失败: JR登录页未加载出登录表单")
+                return False
             
             # 填写登录信息
             username_field = self.driver.find_element("name", "login_id")
@@ -132,7 +281,13 @@ class HeadlessAutomation:
             login_button = self.driver.find_element("css selector", "button[type='submit'], input[type='submit']")
             login_button.click()
             
-            time.sleep(5)
+            # 等待离开JR登录页（经redirectForm跳转到oshi-tabi）并加载完成
+            login_host = urlparse(self.jr_login_url).hostname
+            if not self.wait_for('login_redirect',
+                                 lambda d: urlparse(d.current_url).hostname != login_host and document_ready(d)):
+                # 仍停留在JR登录页：通常是账号或密码错误
+                print(f"❌ 登录失败: 提交后未离开JR登录页（当前页面 {self.driver.current_url}）")
+                return False
             print(f"✅ 登录完成")
             return True
             
@@ -145,9 +300,12 @@ class HeadlessAutomation:
         try:
             print(f"🚀 执行完整自动化...")
             
-            # 访问目标页面
+            # 访问目标页面，等待页面和问卷脚本加载完成
             self.driver.get(self.voice_story_url)
-            time.sleep(5)
+            if not self.wait_for('story_page',
+                                 lambda d: document_ready(d) and d.execute_script("return typeof getSurvey === 'function'")):
+                print(f"❌ 语音页面未加载完成或问卷脚本不可用（当前页面 {self.driver.current_url}）")
+                return False
             
             # 注入完整自动化脚本（简化版，避免jQuery依赖）
             automation_script = """
@@ -158,7 +316,7 @@ class HeadlessAutomation:
             localStorage.setItem('speedFlag', 'true');
             localStorage.setItem('speed', '285');
             localStorage.setItem('flagRegistered', Date.now());
-            localStorage.setItem('allowedItem', '685b5e4be9c4185cba9c2a94');
+            localStorage.setItem('allowedItem', '%s');
             
             sessionStorage.setItem('orangeLog_speed', '285');
             sessionStorage.setItem('orangeLog_lat', '35.6762');
@@ -182,7 +340,7 @@ class HeadlessAutomation:
             console.log('✅ 播放器已显示');
             
             // 触发问卷系统
-            var surveyId = '686028a78a3e46623d889025';
+            var surveyId = '%s';
             sessionStorage.setItem('openedSurvey', surveyId);
             
             if (typeof getSurvey === 'function') {
@@ -192,29 +350,22 @@ class HeadlessAutomation:
             console.log('📝 问卷系统已触发');
             
             return true;
-            """
+            """ % (STORY_ITEM_ID, SURVEY_ID)
             
             self.driver.execute_script(automation_script)
             print(f"✅ 自动化脚本执行完成")
             
             # 等待问卷生成
             print(f"⏳ 等待问卷生成...")
-            for i in range(10):
-                time.sleep(1)
-                
-                survey_exists = self.driver.execute_script("""
+            survey_exists = self.wait_for('survey_modal', lambda d: d.execute_script("""
                 var surveyModal = document.getElementById('surveyModal');
                 var surveyForm = document.getElementById('survey-form');
                 return surveyModal && surveyForm && surveyModal.style.display !== 'none';
-                """)
-                
-                if survey_exists:
-                    print(f"✅ 问卷已生成")
-                    break
-                
-                print(f"  等待问卷... ({i+1}/10)")
-            
-            if not survey_exists:
+                """))
+            
+            if survey_exists:
+                print(f"✅ 问卷已生成")
+            else:
                 print(f"⚠️ 问卷未生成，但继续执行填写脚本")
             
             # 执行问卷填写
@@ -224,15 +375,7 @@ class HeadlessAutomation:
             var filled = 0;
             
             // 填写所有问题
-            var questions = [
-                {id: 'question-682657575eda8', value: '東京'},
-                {id: 'question-682657575f052', value: '名古屋'},
-                {id: 'question-682657575f1ab', value: '１'},
-                {id: 'question-682657575f300', value: '１'},
-                {id: 'question-682657575f450', value: 'はい'},
-                {id: 'question-682657575f594', value: '推し旅公式Xまたは公式サイト'},
-                {id: 'question-682657575f6df', value: 'いいえ'}
-            ];
+            var questions = %s;
             
             questions.forEach(function(q) {
                 var element = document.getElementById(q.id);
@@ -247,25 +390,26 @@ class HeadlessAutomation:
             console.log('📊 填写完成，共', filled, '项');
             
             // 提交问卷
-            setTimeout(function() {
-                var submitButton = document.getElementById('survey-submit');
-                if (submitButton) {
-                    submitButton.disabled = false;
-                    submitButton.click();
-                    console.log('✅ 问卷已提交');
-                } else {
-                    console.log('❌ 未找到提交按钮');
-                }
-            }, 1000);
+            var submitButton = document.getElementById('survey-submit');
+            if (submitButton) {
+                submitButton.disabled = false;
+                submitButton.click();
+                console.log('✅ 问卷已提交');
+            } else {
+                console.log('❌ 未找到提交按钮');
+            }
             
             return filled;
-            """
+            """ % json.dumps([{'id': element_id, 'value': value} for element_id, value in SURVEY_ANSWERS], ensure_ascii=False)
             
             filled_count = self.driver.execute_script(fill_script)
             print(f"✅ 问卷填写完成，填写了 {filled_count} 项")
             
-            # 等待提交完成
-            time.sleep(3)
+            # 等待提交完成（问卷弹窗关闭）
+            self.wait_for('survey_submit', lambda d: d.execute_script("""
+                var surveyModal = document.getElementById('surveyModal');
+                return !surveyModal || surveyModal.style.display === 'none';
+                """))
             
             # 检查最终状态
             final_status = self.driver.execute_script("""
@@ -296,20 +440,26 @@ class HeadlessAutomation:
             print(f"🤖 开始无头自动化流程")
             print("=" * 60)
             
-            # 1. 设置无头浏览器
-            if not self.setup_headless_browser():
+            # 1. 设置无头浏览器（使用浏览器池时已提供driver）
+            if self.driver is None and not self.setup_headless_browser():
                 return False
             
             # 2. 执行登录
-            if not self.perform_login():
-                return False
+            with span('generate.login', username=self.username) as phase:
+                if not self.perform_login():
+                    phase.fail()
+                    return False
             
             # 3. 执行完整自动化
-            success = self.execute_complete_automation()
+            with span('generate.survey', username=self.username) as phase:
+                success = self.execute_complete_automation()
+                if not success:
+                    phase.fail()
             
             print(f"\n" + "=" * 60)
             print("无头自动化完成")
             print("=" * 60)
+            print(f"⏱️ 各步骤耗时: " + ", ".join(f"{step}={seconds}s" for step, seconds in self.step_timings.items()))
             
             if success:
                 print(f"🎉 无头自动化成功完成！")
@@ -324,7 +474,7 @@ class HeadlessAutomation:
             return False
         
         finally:
-            if self.driver:
+            if self.driver and self.owns_driver:
                 self.driver.quit()
             
             # 清理临时目录
@@ -332,13 +482,44 @@ class HeadlessAutomation:
                 import shutil
                 shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-def generate_riding_record(username, password):
+            if self.debugging_port:
+                release_debugging_port(self.debugging_port)
+
+def generate_riding_record_http(username, password, manager=None):
+    """
+    通过HTTP请求直接生成乘车记录（不启动浏览器）
+
+    Args:
+        username (str): 用户名
+        password (str): 密码
+        manager (MultiAccountRidingRecordManager): 用于登录的管理器，不传时新建
+
+    Returns:
+        dict: 包含成功状态和消息的字典
+    """
+    if manager is None:
+        from multi_account_certificate_manager import MultiAccountRidingRecordManager
+        manager = MultiAccountRidingRecordManager(os.getenv('CONFIG_FILE', 'accounts_config.json'))
+
+    try:
+        return HttpSurveyGenerator(manager).generate(username, password)
+    except Exception as e:
+        print(f"❌ HTTP方式生成乘车记录失败: {e}")
+        return {
+            'success': False,
+            'mode': 'http',
+            'message': f'生成失败: {str(e)}'
+        }
+
+def generate_riding_record(username, password, manager=None, mode=None):
     """
     生成乘车记录的公共接口
 
     Args:
         username (str): 用户名
         password (str): 密码
+        manager (MultiAccountRidingRecordManager): HTTP方式登录使用的管理器
+        mode (str): selenium / http / auto，默认使用 GENERATION_MODE
 
     Returns:
         dict: 包含成功状态和消息的字典
@@ -350,20 +531,47 @@ def generate_riding_record(username, password):
                 'message': '用户名和密码不能为空'
             }
 
+        mode = (mode or GENERATION_MODE).lower()
+
+        # HTTP方式：不启动浏览器；auto模式下失败时回退到浏览器
+        if mode in ('http', 'auto'):
+            result = generate_riding_record_http(username, password, manager)
+            if result.get('success') or mode == 'http':
+                return result
+            print(f"⚠️ HTTP方式生成失败（{result.get('message')}），回退到浏览器方式")
+
         print(f"🚀 开始为用户 {username} 生成乘车记录...")
 
-        automation = HeadlessAutomation(username, password)
-        success = automation.run_headless_automation()
+        # 限制同时运行的浏览器数量
+        with _generation_semaphore:
+            with span('generate.selenium', username=username) as phase:
+                pool = get_browser_pool()
+                if pool:
+                    browser = pool.acquire()
+                    success = False
+                    try:
+                        automation = HeadlessAutomation(username, password, driver=browser.driver)
+                        success = automation.run_headless_automation()
+                    finally:
+                        # 自动化流程会捕获异常并返回False，失败的实例可能停在任意页面，不放回池中
+                        pool.release(browser, discard=not success)
+                else:
+                    automation = HeadlessAutomation(username, password)
+                    success = automation.run_headless_automation()
+                if not success:
+                    phase.fail()
 
         if success:
             return {
                 'success': True,
-                'message': '乘车记录生成成功！'
+                'message': '乘车记录生成成功！',
+                'timings': automation.step_timings
             }
         else:
             return {
                 'success': False,
-                'message': '乘车记录生成失败，请检查账号信息或重试'
+                'message': '乘车记录生成失败，请检查账号信息或重试',
+                'timings': automation.step_timings
             }
 
     except Exception as e:
@@ -373,6 +581,26 @@ def generate_riding_record(username, password):
             'message': f'生成失败: {str(e)}'
         }
 
+def generate_riding_records(accounts, max_workers=None, manager=None):
+    """
+    并行为多个账号生成乘车记录
+
+    Args:
+        accounts (list): [(username, password), ...]
+        max_workers (int): 并行数，默认使用 GENERATION_MAX_CONCURRENCY
+        manager (MultiAccountRidingRecordManager): HTTP方式登录使用的管理器
+
+    Returns:
+        dict: {username: generate_riding_record 的返回值}
+    """
+    workers = max(1, min(max_workers or GENERATION_MAX_CONCURRENCY, len(accounts) or 1))
+    print(f"⚡ 并行生成 {len(accounts)} 个账号的乘车记录（{workers} 个线程）")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='generate') as executor:
+        futures = {username: executor.submit(generate_riding_record, username, password, manager)
+                   for username, password in accounts}
+        return {username: future.result() for username, future in futures.items()}
+
 def main():
     """主函数"""
     print(f"🤖 无头浏览器自动化工具")
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+出站HTTP请求辅助工具
+按主机自适应限速、熔断、超时与重试，按账号复用会话，供多账号并发检查共享使用
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HostRateLimiter:
+    """
+    按主机的自适应令牌桶限速器
+
+    每个主机一个令牌桶，按当前速率补充令牌；成功响应时速率加性增加（每秒约 +increase），
+    收到429/503时乘性减少（×decrease，cooldown秒内最多减少一次），即AIMD。
+    不限速的主机在第一次被限流时，从最近1秒内实际的请求速率开始减少。
+
+    Args:
+        rate (float): 每个主机每秒最多请求数，<=0 表示在被限流之前不限速
+        max_rate (float): 速率上限，默认等于 rate（只在限流后降低、再恢复到 rate）；rate<=0 时默认不设上限
+        min_rate (float): 速率下限
+        burst (float): 令牌桶容量（允许的突发请求数），默认 max(1, rate)
+        increase (float): 加性增加步长
+        decrease (float): 乘性减少系数
+        cooldown (float): 两次减少之间的最小间隔（秒），避免同一批失败把速率连续压低
+    """
+
+    def __init__(self, rate=0, max_rate=None, min_rate=0.5, burst=None, increase=1.0, decrease=0.5, cooldown=1.0):
+        self.rate = float(rate or 0)
+        self.max_rate = float(max_rate) if max_rate else (self.rate or float('inf'))
+        self.min_rate = float(min_rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        # 主机 -> {'rate', 'tokens', 'updated', 'last_decrease', 'window_start', 'window_count', 'observed'}
+        # rate为None表示不限速
+        self._buckets = {}
+
+    @staticmethod
+    def _host(url):
+        return urlparse(url).hostname or ''
+
+    def _bucket(self, host, now):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = {
+                'rate': self.rate if self.rate > 0 else None,
+                'tokens': self.burst,
+                'updated': now,
+                'last_decrease': 0.0,
+                'window_start': now,
+                'window_count': 0,
+                'observed': 0.0
+            }
+        return bucket
+
+    def acquire(self, url):
+        """为目标URL取得一个令牌，必要时阻塞等待；返回等待的秒数"""
+        host = self._host(url)
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(host, now)
+            rate = bucket['rate']
+            if rate is None:
+                # 不限速时统计实际请求速率（1秒窗口），被限流时以此为起点
+                elapsed = now - bucket['window_start']
+                if elapsed >= 1.0:
+                    bucket['observed'] = bucket['window_count'] / elapsed
+                    bucket['window_start'] = now
+                    bucket['window_count'] = 0
+                bucket['window_count'] += 1
+                return 0
+
+            burst = max(1.0, min(self.burst, rate))
+            bucket['tokens'] = min(burst, bucket['tokens'] + (now - bucket['updated']) * rate)
+            bucket['updated'] = now
+            # 令牌不足时预约（令牌数变为负数），之后的请求依次排队
+            bucket['tokens'] -= 1
+            wait = -bucket['tokens'] / rate if bucket['tokens'] < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self, url):
+        """成功响应：加性增加速率"""
+        with self._lock:
+            bucket = self._buckets.get(self._host(url))
+            if bucket and bucket['rate'] is not None:
+                bucket['rate'] = min(self.max_rate, bucket['rate'] + self.increase / bucket['rate'])
+
+    def on_throttle(self, url):
+        """收到429/503：乘性减少速率"""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(self._host(url), now)
+            if now - bucket['last_decrease'] < self.cooldown:
+                return
+            current = bucket['rate']
+            if current is None:
+                partial = bucket['window_count'] / max(now - bucket['window_start'], 1e-3)
+                current = min(self.max_rate, max(bucket['observed'], partial, self.min_rate))
+            bucket['rate'] = max(self.min_rate, current * self.decrease)
+            bucket['tokens'] = min(bucket['tokens'], 0)
+            bucket['updated'] = now
+            bucket['last_decrease'] = now
+
+    def rates(self):
+        """各主机当前速率（None表示不限速）"""
+        with self._lock:
+            return {host: (round(bucket['rate'], 2) if bucket['rate'] is not None else None)
+                    for host, bucket in self._buckets.items()}
+
+
+class CircuitOpenError(requests.RequestException):
+    """目标主机的熔断器处于打开状态，请求未发出"""
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝请求；
+    之后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        # 主机 -> {'state', 'failures', 'opened_at', 'probing'}
+        self._hosts = {}
+
+    def _host_state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0, 'probing': False}
+        return state
+
+    def before_request(self, host):
+        """请求前检查，熔断时抛出 CircuitOpenError"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            state = self._host_state(host)
+            if state['state'] == self.CLOSED:
+                return
+
+            remaining = state['opened_at'] + self.reset_timeout - time.monotonic()
+            if state['state'] == self.OPEN and remaining <= 0:
+                state['state'] = self.HALF_OPEN
+                state['probing'] = False
+
+            if state['state'] == self.HALF_OPEN and not state['probing']:
+                state['probing'] = True
+                return
+
+        raise CircuitOpenError(f"{host} 熔断中（连续失败 {state['failures']} 次），"
+                               f"{max(0, remaining):.0f} 秒后重试")
+
+    def record_success(self, host):
+        with self._lock:
+            state = self._host_state(host)
+            state.update(state=self.CLOSED, failures=0, probing=False)
+
+    def record_alive(self, host):
+        """主机有响应但不计为成功或失败（如429）：半开状态的探测视为成功并关闭熔断，其他状态不变"""
+        with self._lock:
+            state = self._host_state(host)
+            if state['state'] == self.HALF_OPEN:
+                state.update(state=self.CLOSED, failures=0, probing=False)
+
+    def record_failure(self, host):
+        with self._lock:
+            state = self._host_state(host)
+            state['failures'] += 1
+            if state['state'] == self.HALF_OPEN or state['failures'] >= self.failure_threshold > 0:
+                if state['state'] != self.OPEN:
+                    print(f"⚡ {host} 连续失败 {state['failures']} 次，熔断 {self.reset_timeout:.0f} 秒")
+                state.update(state=self.OPEN, opened_at=time.monotonic(), probing=False)
+
+    def states(self):
+        with self._lock:
+            return {host: state['state'] for host, state in self._hosts.items()}
+
+
+class OutboundClient:
+    """
+    共享的出站请求层：按主机限速（自适应令牌桶）、熔断、超时和带抖动的指数退避重试
+
+    幂等请求（GET/HEAD等）在连接错误、超时、429和5xx时重试；
+    POST等非幂等请求只在连接未建立（ConnectTimeout）或服务器明确拒绝（429/503）时重试，避免重复提交。
+    429/503 视为过载信号，降低该主机的速率；连接错误、超时和5xx（不含429）计入熔断器的连续失败次数。
+
+    Args:
+        limiter (HostRateLimiter): 按主机限速器
+        breaker (CircuitBreaker): 熔断器
+        max_retries (int): 最多重试次数
+        backoff_base (float): 退避基数（秒），第n次重试等待 uniform(0, min(backoff_max, base * 2**n))
+        backoff_max (float): 单次退避上限（秒）
+        timeout (tuple): 默认的 (连接超时, 读取超时)，请求未指定timeout时使用
+    """
+
+    IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+    OVERLOAD_STATUSES = frozenset((429, 503))
+    RETRY_AFTER_MAX = 60.0
+
+    def __init__(self, limiter=None, breaker=None, max_retries=2, backoff_base=0.5, backoff_max=10.0,
+                 timeout=(5.0, 20.0)):
+        self.limiter = limiter or HostRateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        """解析 Retry-After（秒数形式），无法解析时返回0"""
+        try:
+            return min(self.RETRY_AFTER_MAX, max(0.0, float(response.headers.get('Retry-After', 0))))
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def request(self, session, method, url, **kwargs):
+        """通过会话发送请求，返回最终的响应；重试耗尽的连接错误/超时会抛出"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).hostname or ''
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            try:
+                self.breaker.before_request(host)
+            except CircuitOpenError:
+                self._count('rejected')
+                raise
+            self.limiter.acquire(url)
+
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.breaker.record_failure(host)
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"🔁 {method} {host} 失败（{type(e).__name__}），{delay:.1f}秒后重试")
+            except Exception:
+                # 其他异常（ChunkedEncodingError、TooManyRedirects、InvalidURL等）不重试，
+                # 但同样计为失败，保证半开状态的探测标记被清除
+                self.breaker.record_failure(host)
+                raise
+            else:
+                status = response.status_code
+                if status != 429 and status < 500:
+                    self.breaker.record_success(host)
+                    self.limiter.on_success(url)
+                    return response
+
+                overloaded = status in self.OVERLOAD_STATUSES
+                if overloaded:
+                    self._count('throttled')
+                    self.limiter.on_throttle(url)
+                # 429 说明主机正常但请求过快，只降低速率，不计入熔断（半开状态的探测视为成功）
+                if status == 429:
+                    self.breaker.record_alive(host)
+                else:
+                    self.breaker.record_failure(host)
+                retryable = idempotent or overloaded
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                delay = max(self._backoff(attempt), self._retry_after(response))
+                response.close()
+                print(f"🔁 {method} {host} 返回 HTTP {status}，{delay:.1f}秒后重试")
+
+            attempt += 1
+            self._count('retries')
+            time.sleep(delay)
+
+    def stats(self):
+        """出站请求统计：重试/限流/熔断拒绝次数、各主机当前速率和熔断状态"""
+        with self._lock:
+            counters = {'retries': self.retries, 'throttled': self.throttled, 'rejected': self.rejected}
+        return dict(counters, hostRates=self.limiter.rates(), circuits=self.breaker.states())
+
+
+class SessionPool:
+    """按账号复用的 requests.Session 池
+
+    所有会话挂载同一个 HTTPAdapter，共享底层的 keep-alive 连接池；
+    每个账号保留独立的 cookie jar。
+    """
+
+    def __init__(self, headers=None, pool_connections=10, pool_maxsize=10, max_sessions=1000):
+        self.headers = dict(headers or {})
+        self.max_sessions = max_sessions
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _create_session(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def get(self, key):
+        """获取账号对应的会话，不存在时新建"""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                self.hits += 1
+                return session
+
+            self.misses += 1
+            session = self._create_session()
+            self._sessions[key] = session
+
+            # 超出上限时丢弃最久未使用的会话（共享的连接池不关闭）
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            return session
+
+    def discard(self, key):
+        """丢弃账号对应的会话（cookie jar一并丢弃）"""
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def stats(self):
+        """返回会话池命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'sessions': len(self._sessions),
+                'maxSessions': self.max_sessions,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': round(self.hits / total * 100, 1) if total > 0 else 0
+            }
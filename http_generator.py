@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+纯HTTP生成乘车记录
+复用 MultiAccountRidingRecordManager 的登录流程，直接提交问卷表单，不启动浏览器
+"""
+import os
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from dotenv import load_dotenv
+
+from metrics import span
+
+# 加载环境变量
+load_dotenv()
+
+# 语音故事页面对应的条目和问卷
+STORY_ITEM_ID = '685b5e4be9c4185cba9c2a94'
+SURVEY_ID = '686028a78a3e46623d889025'
+
+# 问卷答案（元素ID -> 填写值）
+SURVEY_ANSWERS = [
+    ('question-682657575eda8', '東京'),
+    ('question-682657575f052', '名古屋'),
+    ('question-682657575f1ab', '１'),
+    ('question-682657575f300', '１'),
+    ('question-682657575f450', 'はい'),
+    ('question-682657575f594', '推し旅公式Xまたは公式サイト'),
+    ('question-682657575f6df', 'いいえ')
+]
+
+
+class SurveyFormParser(HTMLParser):
+    """提取页面中的CSRF令牌、问卷表单地址和表单字段"""
+
+    def __init__(self, form_id='survey-form'):
+        super().__init__()
+        self.form_id = form_id
+        self.csrf_token = None
+        self.form_action = None
+        self.hidden_fields = {}
+        self.field_names = {}
+        self._in_form = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if tag == 'meta' and attrs.get('name') == 'csrf-token':
+            self.csrf_token = attrs.get('content')
+        elif tag == 'form' and attrs.get('id') == self.form_id:
+            self._in_form = True
+            self.form_action = attrs.get('action')
+        elif tag in ('input', 'select', 'textarea'):
+            name = attrs.get('name')
+            if name == '_token' and attrs.get('value'):
+                self.csrf_token = attrs.get('value')
+            if not self._in_form or not name:
+                return
+            if attrs.get('id'):
+                self.field_names[attrs['id']] = name
+            if tag == 'input' and attrs.get('type') == 'hidden':
+                self.hidden_fields[name] = attrs.get('value', '')
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._in_form = False
+
+
+class HttpSurveyGenerator:
+    """通过HTTP请求直接提交问卷来生成乘车记录"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.voice_story_url = os.getenv('VOICE_STORY_URL', 'https://oshi-tabi.voistock.com/bang-dream-10th/voice/685b5e4be9c4185cba9c2a94')
+        # 问卷表单地址（可包含 {survey_id}），以及表单中未给出action时使用的提交地址
+        self.survey_form_url = os.getenv('SURVEY_FORM_URL', '')
+        self.survey_submit_url = os.getenv('SURVEY_SUBMIT_URL', '')
+
+    @property
+    def available(self):
+        """是否配置了问卷接口地址"""
+        return bool(self.survey_form_url or self.survey_submit_url)
+
+    def _timed(self, timings, step, func, *args, **kwargs):
+        with span(f'generate.http.{step}') as current:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[step] = round(time.perf_counter() - current.started, 3)
+
+    def build_payload(self, parser):
+        """组装问卷提交数据：表单隐藏字段 + 问卷答案"""
+        payload = dict(parser.hidden_fields)
+        payload.setdefault('surveyId', SURVEY_ID)
+        if parser.csrf_token:
+            payload.setdefault('_token', parser.csrf_token)
+
+        for element_id, value in SURVEY_ANSWERS:
+            payload[parser.field_names.get(element_id, element_id)] = value
+        return payload
+
+    def generate(self, username, password):
+        """
+        为指定账号生成乘车记录
+
+        Returns:
+            dict: 与 generate_riding_record 相同结构的结果（附加 mode 和 timings）
+        """
+        timings = {}
+        result = {'success': False, 'mode': 'http', 'timings': timings}
+
+        if not self.available:
+            result['message'] = '未配置 SURVEY_FORM_URL / SURVEY_SUBMIT_URL，无法使用HTTP生成'
+            return result
+
+        print(f"🚀 使用HTTP方式为 {username} 生成乘车记录...")
+
+        # 1. 登录（JR -> oshi-tabi）
+        cookie, _ = self._timed(timings, 'login', self.manager.login_with_credentials, username, username, password)
+        if not cookie:
+            result['message'] = '登录失败，请检查账号信息'
+            return result
+
+        session = self.manager.session_pool.get(username)
+        headers = {'Referer': self.voice_story_url}
+
+        # 2. 访问语音故事页面（获取CSRF令牌）
+        response = self._timed(timings, 'story_page', self.manager._request,
+                               session, 'GET', self.voice_story_url)
+        if response.status_code != 200:
+            result['message'] = f'语音页面访问失败: HTTP {response.status_code}'
+            return result
+
+        parser = SurveyFormParser()
+        parser.feed(response.text)
+
+        # 3. 获取问卷表单（如已配置）
+        submit_url = self.survey_submit_url
+        if self.survey_form_url:
+            form_url = self.survey_form_url.format(survey_id=SURVEY_ID, item_id=STORY_ITEM_ID)
+            form_response = self._timed(timings, 'survey_form', self.manager._request,
+                                        session, 'GET', form_url, headers=headers)
+            if form_response.status_code != 200:
+                result['message'] = f'问卷表单获取失败: HTTP {form_response.status_code}'
+                return result
+            parser.feed(form_response.text)
+            if parser.form_action:
+                submit_url = urljoin(form_url, parser.form_action)
+
+        if not submit_url:
+            result['message'] = '未找到问卷提交地址'
+            return result
+
+        # 4. 提交问卷
+        payload = self.build_payload(parser)
+        submit_headers = dict(headers)
+        if parser.csrf_token:
+            submit_headers['X-CSRF-TOKEN'] = parser.csrf_token
+        submit_response = self._timed(timings, 'survey_submit', self.manager._request,
+                                      session, 'POST', submit_url, data=payload,
+                                      headers=submit_headers)
+
+        if submit_response.status_code >= 400 or self.manager.is_session_expired(submit_response):
+            result['message'] = f'问卷提交失败: HTTP {submit_response.status_code}'
+            return result
+
+        print(f"✅ HTTP方式问卷提交完成（{len(payload)} 个字段）")
+        result['success'] = True
+        result['message'] = '乘车记录生成成功！'
+        return result
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+后台任务队列
+将耗时的生成/检查操作放到有界线程池中执行，HTTP请求只负责提交和查询
+任务状态同时写入 jobs 目录，多个服务进程（gunicorn workers）可以查询彼此提交的任务
+执行中的任务定期写入心跳时间，心跳过期的未完成任务（执行进程已退出或卡死）视为已中断
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobQueue:
+    """有界线程池 + 内存/磁盘双份任务状态的后台任务队列"""
+
+    def __init__(self, jobs_dir, max_workers=2, history_limit=200, heartbeat_interval=10, stale_after=60):
+        self.jobs_dir = jobs_dir
+        self.history_limit = history_limit
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        # 本进程的实例ID（容器重启后进程号可能被复用，不能用 pid 判断任务归属）
+        self.instance_id = uuid.uuid4().hex
+        self._jobs = OrderedDict()
+        self._summaries = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+        if not os.path.exists(self.jobs_dir):
+            os.makedirs(self.jobs_dir)
+
+        self._recover_interrupted_jobs()
+
+        threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True).start()
+
+    def _job_file(self, job_id):
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def _persist(self, job):
+        """写入任务状态文件（先写临时文件再替换）"""
+        temp_file = None
+        try:
+            # 心跳线程和任务线程可能同时保存同一任务，临时文件名不能相同
+            fd, temp_file = tempfile.mkstemp(dir=self.jobs_dir, prefix=f"{job['id']}.", suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(job, f, indent=2, ensure_ascii=False)
+            os.chmod(temp_file, 0o644)
+            os.replace(temp_file, self._job_file(job['id']))
+        except (OSError, TypeError) as e:
+            print(f"⚠️ 保存任务状态失败 {job['id']}: {e}")
+            if temp_file and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _interrupted(self, job):
+        """未完成、不属于本进程且心跳已过期（或没有心跳记录）的任务"""
+        if job.get('status') in FINISHED_STATES or job.get('owner') == self.instance_id:
+            return False
+        heartbeat = job.get('heartbeat_at')
+        return not isinstance(heartbeat, (int, float)) or time.time() - heartbeat > self.stale_after
+
+    def _mark_interrupted(self, job):
+        job['status'] = JOB_FAILED
+        job['error'] = '任务执行进程已退出或无响应，任务已中断'
+        job['finished_at'] = datetime.now().isoformat()
+        self._persist(job)
+        return job
+
+    def _recover_interrupted_jobs(self):
+        """服务重启后，将心跳已过期的未完成任务标记为失败（其他进程正在执行的任务不受影响）"""
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, filename), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                continue
+
+            if self._interrupted(job):
+                self._mark_interrupted(job)
+
+    def _heartbeat_loop(self):
+        """定期为本进程未完成的任务写入心跳时间"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            now = time.time()
+            with self._lock:
+                snapshots = []
+                for job in self._jobs.values():
+                    if job['status'] not in FINISHED_STATES:
+                        job['heartbeat_at'] = now
+                        snapshots.append(dict(job))
+            for snapshot in snapshots:
+                self._persist(snapshot)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job['heartbeat_at'] = time.time()
+            snapshot = dict(job)
+        self._persist(snapshot)
+
+    def _prune(self):
+        """内存中只保留最近的已完成任务（磁盘文件保留）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+    def submit(self, job_type, func, *args, **kwargs):
+        """
+        提交任务
+
+        Args:
+            job_type (str): 任务类型
+            func (callable): 任务函数，第一个参数为进度回调 progress(current, total, message=None)
+
+        Returns:
+            str: 任务ID
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'type': job_type,
+            'status': JOB_QUEUED,
+            'progress': {'current': 0, 'total': None, 'message': None},
+            'result': None,
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            # 执行任务的进程实例和心跳时间（多进程部署时用于判断任务是否已中断）
+            'owner': self.instance_id,
+            'heartbeat_at': time.time()
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+            snapshot = dict(job)
+        self._persist(snapshot)
+
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        print(f"📥 已提交任务 {job_type} ({job_id})")
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        def progress(current, total, message=None):
+            self._update(job_id, progress={'current': current, 'total': total, 'message': message})
+
+        self._update(job_id, status=JOB_RUNNING, started_at=datetime.now().isoformat())
+        started = time.monotonic()
+
+        try:
+            result = func(progress, *args, **kwargs)
+            self._update(job_id, status=JOB_SUCCEEDED, result=result,
+                         finished_at=datetime.now().isoformat())
+            print(f"✅ 任务完成 {job_id}（耗时 {time.monotonic() - started:.1f}s）")
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status=JOB_FAILED, error=str(e),
+                         finished_at=datetime.now().isoformat())
+            print(f"❌ 任务失败 {job_id}: {e}")
+
+    def get(self, job_id):
+        """获取任务状态（先查内存，再查磁盘）"""
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+            return None
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+
+        job_file = self._job_file(job_id)
+        if not os.path.exists(job_file):
+            return None
+        try:
+            with open(job_file, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+        # 其他进程的任务心跳过期时（进程已退出），标记为失败，避免客户端一直轮询
+        if self._interrupted(job):
+            job = self._mark_interrupted(job)
+        return job
+
+    def list_jobs(self, limit=50):
+        """列出最近的任务（包括其他服务进程提交的任务，不含结果内容）"""
+        with self._lock:
+            local = {job_id: dict(job) for job_id, job in self._jobs.items()}
+
+        # 按修改时间取最近的任务文件；其他进程的任务摘要按文件修改时间缓存，避免重复解析结果内容
+        entries = []
+        for entry in os.scandir(self.jobs_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.name[:-5]))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+
+        jobs = []
+        summaries = {}
+        for mtime, job_id in entries[:limit + len(local)]:
+            job = local.get(job_id)
+            if job is None:
+                cached = self._summaries.get(job_id)
+                if cached and cached[0] == mtime:
+                    job = dict(cached[1])
+                else:
+                    job = self.get(job_id)
+                    if job is None:
+                        continue
+                    job.pop('result', None)
+                summaries[job_id] = (mtime, dict(job))
+            jobs.append(job)
+        self._summaries = summaries
+
+        jobs.sort(key=lambda job: job.get('created_at') or '', reverse=True)
+        jobs = jobs[:limit]
+        for job in jobs:
+            job.pop('result', None)
+        return jobs
+
+    def count(self, status):
+        """内存中处于指定状态的任务数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] == status)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+耗时统计
+为登录、证书页面获取、解析和生成的各个阶段记录耗时：
+每个阶段输出一行JSON结构化日志，并汇总到直方图，以Prometheus文本格式导出
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 结构化耗时日志（每行一个JSON对象），TIMING_LOG=false 时关闭
+timing_logger = logging.getLogger('riding_record.timing')
+if not timing_logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    timing_logger.addHandler(_handler)
+    timing_logger.propagate = False
+timing_logger.setLevel(logging.INFO if os.getenv('TIMING_LOG', 'true').lower() == 'true' else logging.WARNING)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """按标签分组的直方图（线程安全）"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._lock = threading.Lock()
+        # 标签值 -> [各分桶计数, 总和, 总数]
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+        for key in sorted(snapshot):
+            counts, total, count = snapshot[key]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {total!r}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class CallbackMetric:
+    """导出时调用回调函数取值的指标（如连接池、浏览器池的当前状态），回调返回None时不导出"""
+
+    def __init__(self, name, documentation, func, metric_type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.metric_type = metric_type
+
+    def render(self):
+        try:
+            value = self.func()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}',
+                f'{self.name} {_format_value(value)}']
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name, documentation, func):
+        return self.register(CallbackMetric(name, documentation, func))
+
+    def counter(self, name, documentation, func):
+        return self.register(CallbackMetric(name, documentation, func, metric_type='counter'))
+
+    def render(self):
+        """导出为Prometheus文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+phase_seconds = registry.register(Histogram(
+    'riding_record_phase_seconds',
+    'Duration of login, certificate fetch, parse and generation phases in seconds.',
+    labelnames=('phase', 'outcome')
+))
+
+
+def record_phase(phase, seconds, outcome='ok', **fields):
+    """
+    记录一个已完成阶段的耗时
+
+    Args:
+        phase (str): 阶段名（如 login.csrf_post）
+        seconds (float): 耗时（秒）
+        outcome (str): ok / error
+        **fields: 只写入日志的附加字段（如 username），不作为直方图标签
+    """
+    phase_seconds.observe(seconds, phase=phase, outcome=outcome)
+    if timing_logger.isEnabledFor(logging.INFO):
+        entry = {'event': 'phase', 'phase': phase, 'seconds': round(seconds, 4), 'outcome': outcome}
+        entry.update(fields)
+        timing_logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+class Span:
+    """一个计时阶段；可在阶段内将 outcome 设为 'error' 表示失败"""
+
+    def __init__(self, phase, fields):
+        self.phase = phase
+        self.fields = fields
+        self.outcome = 'ok'
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def fail(self):
+        self.outcome = 'error'
+
+
+@contextmanager
+def span(phase, **fields):
+    """
+    计时上下文管理器，阶段内抛出异常时 outcome 记为 error
+
+    用法:
+        with span('login.page', username=username) as s:
+            response = ...
+            if response.status_code != 200:
+                s.fail()
+    """
+    current = Span(phase, fields)
+    try:
+        yield current
+    except BaseException:
+        current.outcome = 'error'
+        raise
+    finally:
+        current.seconds = time.perf_counter() - current.started
+        record_phase(phase, current.seconds, current.outcome, **fields)
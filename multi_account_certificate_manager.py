@@ -3,15 +3,22 @@
 多账号乘车记录管理器
 支持动态账号管理，外部配置文件，强制重新登录
 """
-import requests
-import json
-import re
-import time
+import hashlib
 import os
-import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
+from account_store import AccountStore
+from cookie_cache import CookieCache
+from http_client import CircuitBreaker, HostRateLimiter, OutboundClient, SessionPool
+from metrics import span
+from page_archive import PageArchive
+from record_parser import (PARSER_VERSION, CertificatePageParser, extract_csrf_token, parse_jp_date,
+                           parse_redirect_form)
+from results_store import ResultsStore
+
 # 加载环境变量
 load_dotenv()
 
@@ -20,51 +27,138 @@ RESULTS_DIR = "results"
 if not os.path.exists(RESULTS_DIR):
     os.makedirs(RESULTS_DIR)
 
+# 所有请求共享的默认请求头
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,ja;q=0.7',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
 class MultiAccountRidingRecordManager:
-    def __init__(self, config_file='accounts_config.json'):
+    def __init__(self, config_file='accounts_config.json', max_workers=None, rate_limit=None, verbose=True):
         self.config_file = config_file
-        self.accounts = {}
+        # 加载配置时是否逐个打印账号（账号很多时关闭以加快启动）
+        self.verbose = verbose
+        # 账号配置（内存索引、延迟合并保存、配置文件修改后自动重新加载）
+        self.account_store = AccountStore(
+            config_file,
+            save_delay=float(os.getenv('ACCOUNTS_SAVE_DELAY', '2')),
+            reload_interval=float(os.getenv('ACCOUNTS_RELOAD_INTERVAL', '2'))
+        )
+
+        # 并发检查配置 - 从环境变量读取（默认1，即顺序检查）
+        self.max_workers = max_workers or int(os.getenv('CHECK_MAX_WORKERS', '1'))
+        if rate_limit is None:
+            rate_limit = float(os.getenv('HOST_RATE_LIMIT', '0'))
+        self.rate_limiter = HostRateLimiter(
+            rate_limit,
+            max_rate=float(os.getenv('HOST_RATE_MAX', '0')) or None,
+            min_rate=float(os.getenv('HOST_RATE_MIN', '0.5')),
+            burst=float(os.getenv('HOST_RATE_BURST', '0')) or None
+        )
+
+        # 共享的出站请求层（限速、熔断、超时和重试），登录和证书页面请求都经过这里
+        self.http = OutboundClient(
+            limiter=self.rate_limiter,
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5')),
+                reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+            ),
+            max_retries=int(os.getenv('HTTP_MAX_RETRIES', '2')),
+            backoff_base=float(os.getenv('HTTP_BACKOFF_BASE', '0.5')),
+            backoff_max=float(os.getenv('HTTP_BACKOFF_MAX', '10')),
+            timeout=(float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')), float(os.getenv('HTTP_READ_TIMEOUT', '20')))
+        )
+
+        # 按账号复用的会话池（登录和证书页面共用keep-alive连接）
+        self.session_pool = SessionPool(
+            headers=DEFAULT_HEADERS,
+            pool_connections=int(os.getenv('HTTP_POOL_CONNECTIONS', '10')),
+            pool_maxsize=int(os.getenv('HTTP_POOL_MAXSIZE', str(max(10, self.max_workers)))),
+            max_sessions=int(os.getenv('SESSION_POOL_MAX', '1000'))
+        )
+
+        # 检查结果存储（SQLite增量写入，同时按配置顺序导出已启用账号的结果到 multi_account_results.json）
+        self.results_store = ResultsStore(
+            os.getenv('RESULTS_DB', os.path.join(RESULTS_DIR, 'results.db')),
+            export_file=os.path.join(RESULTS_DIR, 'multi_account_results.json'),
+            export_interval=float(os.getenv('RESULTS_EXPORT_INTERVAL', '5')),
+            export_usernames=self.enabled_usernames
+        )
+
+        # oshitabi cookie缓存（保存在结果数据库中）- 未过期时直接访问证书页面，跳过登录流程
+        self.cookie_cache = CookieCache(
+            self.results_store,
+            ttl=int(os.getenv('COOKIE_CACHE_TTL', '1800')),
+            legacy_file=os.getenv('COOKIE_CACHE_FILE', os.path.join(RESULTS_DIR, 'cookies_cache.json'))
+        )
+
+        # 证书页面归档（替代逐账号的HTML文件）
+        self.page_archive = PageArchive(
+            os.getenv('PAGE_ARCHIVE_DIR', os.path.join(RESULTS_DIR, 'pages')),
+            codec=os.getenv('PAGE_ARCHIVE_CODEC', 'auto')
+        )
 
         # URLs - 从环境变量读取
         self.jr_login_url = os.getenv('JR_LOGIN_URL', 'https://orange-system.jr-central.co.jp/user/login?redirect=true')
         self.riding_record_url = os.getenv('RIDING_RECORD_URL', 'https://oshi-tabi.voistock.com/bang-dream-10th/mygo/certificate/data')
         self.oshitabi_login_url = os.getenv('OSHITABI_LOGIN_URL', 'https://oshi-tabi.voistock.com/orange/login.php')
         self.target_text = os.getenv('TARGET_TEXT', '新幹線乗車証明')
+        self.page_parser = CertificatePageParser(self.target_text)
 
         # 加载配置
         self.load_accounts_config()
+
+    def _request(self, session, method, url, phase=None, username=None, **kwargs):
+        """
+        发送HTTP请求（经过共享的出站请求层：按主机限速、熔断、超时和重试）
+
+        指定 phase 时记录该请求的耗时（含重试和限速等待），HTTP 4xx/5xx 记为失败
+        """
+        if phase is None:
+            return self.http.request(session, method, url, **kwargs)
+
+        with span(phase, username=username) as current:
+            response = self.http.request(session, method, url, **kwargs)
+            if response.status_code >= 400:
+                current.fail()
+        return response
     
+    @property
+    def accounts(self):
+        """当前的账号配置 {username: account}（只读快照，修改请使用 add_account 等方法）"""
+        return self.account_store.accounts
+
+    @accounts.setter
+    def accounts(self, accounts):
+        # 替换为内存中的账号（临时管理器使用，不读写配置文件）
+        self.account_store.replace(accounts)
+
+    def enabled_usernames(self):
+        """配置中已启用的账号（按配置顺序）"""
+        return [username for username, account in self.accounts.items() if account.get('enabled', True)]
+
+    @property
+    def accounts_version(self):
+        """账号配置版本号，账号增删改或配置文件重新加载时递增（用于失效缓存的账号列表）"""
+        self.account_store.maybe_reload()
+        return self.account_store.version
+
     def load_accounts_config(self):
         """加载账号配置文件"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-
-                    # 支持两种格式：数组格式和对象格式
-                    if isinstance(config.get('accounts'), list):
-                        # 数组格式：转换为以username为key的对象格式
-                        accounts_list = config.get('accounts', [])
-                        self.accounts = {}
-                        for account in accounts_list:
-                            username = account.get('username')
-                            if username:
-                                self.accounts[username] = {
-                                    'username': username,
-                                    'password': account.get('password'),
-                                    'display_name': account.get('description', username),
-                                    'enabled': account.get('active', True)
-                                }
-                    else:
-                        # 对象格式：直接使用
-                        self.accounts = config.get('accounts', {})
-
-                print(f"✅ 加载了 {len(self.accounts)} 个账号配置")
+            if self.account_store.load():
+                accounts = self.account_store.accounts
+                print(f"✅ 加载了 {len(accounts)} 个账号配置")
 
                 # 显示账号列表（不显示密码）
-                for username, account in self.accounts.items():
-                    status = "启用" if account.get('enabled', True) else "禁用"
-                    print(f"  📋 {account.get('display_name', username)} ({username}) - {status}")
+                if self.verbose:
+                    for username, account in accounts.items():
+                        status = "启用" if account.get('enabled', True) else "禁用"
+                        print(f"  📋 {account.get('display_name', username)} ({username}) - {status}")
 
             else:
                 print(f"⚠️ 配置文件 {self.config_file} 不存在")
@@ -87,15 +181,9 @@ class MultiAccountRidingRecordManager:
             return
 
     def save_accounts_config(self):
-        """保存账号配置文件"""
+        """立即保存账号配置文件（先写临时文件再替换）"""
         try:
-            config = {
-                'accounts': self.accounts
-            }
-
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
-
+            self.account_store.save()
             print(f"✅ 配置文件已保存: {self.config_file}")
             return True
 
@@ -104,175 +192,188 @@ class MultiAccountRidingRecordManager:
             return False
 
     def add_account(self, username, password, display_name=None, enabled=True):
-        """添加新账号到配置"""
-        if username in self.accounts:
-            print(f"⚠️ 账号 {username} 已存在，跳过添加")
-            return False
-
-        self.accounts[username] = {
+        """添加新账号到配置（短时间内的多次新增合并为一次保存）"""
+        added = self.account_store.add(username, {
             'username': username,
             'password': password,
             'display_name': display_name or username,
             'enabled': enabled
-        }
+        })
+        if not added:
+            print(f"⚠️ 账号 {username} 已存在，跳过添加")
+            return False
 
         print(f"✅ 已添加新账号: {display_name or username} ({username})")
-        return self.save_accounts_config()
+        return True
+
+    def update_account_password(self, username, password):
+        """更新已有账号的密码（仅内存中）"""
+        if username not in self.accounts:
+            return False
 
-    def perform_login_and_get_cookie(self, username):
-        """执行登录并获取cookie"""
+        self.account_store.set_password(username, password)
+        return True
+
+    def perform_login_and_get_cookie(self, username, account=None):
+        """执行登录并获取cookie（account 指定时使用给定的账号信息，不要求账号在配置中）"""
         try:
-            if username not in self.accounts:
+            account = account or self.accounts.get(username)
+            if account is None:
                 print(f"❌ 未找到账号 {username} 的配置")
                 return None
-            
-            account = self.accounts[username]
+
             if not account.get('enabled', True):
                 print(f"⚠️ 账号 {username} 已禁用")
                 return None
             
             print(f"🔑 为 {account.get('display_name', username)} 执行登录...")
-            
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,ja;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Referer': self.jr_login_url
-            })
+
+            with span('login', username=username) as phase:
+                oshitabi_cookie, oshitabi_expires = self.login_with_credentials(
+                    username, account['username'], account['password']
+                )
+                if not oshitabi_cookie:
+                    phase.fail()
+            return oshitabi_cookie
+
+        except Exception as e:
+            print(f"❌ {username} 登录失败: {e}")
+            return None
+
+    def login_with_credentials(self, session_key, login_id, password):
+        """
+        执行JR登录 -> oshi-tabi重定向的完整登录流程，并以 session_key 更新cookie缓存
+        （成功时保存新cookie；失败时删除旧cookie，会话cookie已被清空，旧cookie不再可信）
+
+        Args:
+            session_key (str): 会话池和cookie缓存中使用的键（通常为用户名）
+            login_id (str): JR登录ID
+            password (str): 密码
+
+        Returns:
+            tuple: (oshitabi cookie值, 过期时间戳)，失败时为 (None, None)
+        """
+        oshitabi_cookie, oshitabi_expires = self._login_with_credentials(session_key, login_id, password)
+        if oshitabi_cookie:
+            self.cookie_cache.set(session_key, oshitabi_cookie, oshitabi_expires)
+        else:
+            self.cookie_cache.invalidate(session_key)
+        return oshitabi_cookie, oshitabi_expires
+
+    def _login_with_credentials(self, session_key, login_id, password):
+        """登录流程本身（不读写cookie缓存）"""
+        username = session_key
+        try:
+            # 复用账号会话的连接，但清空cookie以保证完整的重新登录
+            session = self.session_pool.get(session_key)
+            session.cookies.clear()
+            login_headers = {'Referer': self.jr_login_url}
             
             # 1. 获取登录页面
-            response = session.get(self.jr_login_url)
+            response = self._request(session, 'GET', self.jr_login_url, headers=login_headers,
+                                     phase='login.page', username=username)
             if response.status_code != 200:
                 print(f"❌ 获取登录页面失败: {response.status_code}")
-                return None
+                return None, None
             
             # 2. 提取CSRF令牌
-            csrf_patterns = [
-                r'name=["\']_token["\'][^>]*value=["\']([^"\']+)["\']',
-                r'value=["\']([^"\']+)["\'][^>]*name=["\']_token["\']',
-            ]
-            
-            csrf_token = None
-            for pattern in csrf_patterns:
-                matches = re.findall(pattern, response.text, re.IGNORECASE)
-                if matches:
-                    csrf_token = matches[0]
-                    break
+            csrf_token = extract_csrf_token(response.text)
             
             if not csrf_token:
                 print("❌ 未找到CSRF令牌")
-                return None
+                return None, None
             
             # 3. 提交登录表单
             form_data = {
                 '_token': csrf_token,
                 'redirect': 'true',
-                'login_id': account['username'],
-                'password': account['password']
+                'login_id': login_id,
+                'password': password
             }
             
-            login_response = session.post(
-                self.jr_login_url,
+            login_response = self._request(
+                session, 'POST', self.jr_login_url,
                 data=form_data,
-                allow_redirects=True
+                headers=login_headers,
+                allow_redirects=True,
+                phase='login.csrf_post',
+                username=username
             )
             
             # 4. 检查登录是否成功并处理重定向
-            if "redirectForm" in login_response.text and "oshi-tabi.voistock.com" in login_response.text:
+            redirect_form = parse_redirect_form(login_response.text)
+            if redirect_form is not None:
                 print("🔄 执行oshi-tabi重定向...")
                 
                 # 提取重定向表单数据
-                otp_match = re.search(r'name="otp" value="([^"]+)"', login_response.text)
-                login_id_match = re.search(r'name="loginId" value="([^"]+)"', login_response.text)
-                register_id_match = re.search(r'name="registerId" value="([^"]+)"', login_response.text)
-                
-                if otp_match and login_id_match and register_id_match:
-                    oshitabi_login_data = {
-                        'otp': otp_match.group(1),
-                        'loginId': login_id_match.group(1),
-                        'registerId': register_id_match.group(1)
-                    }
+                if redirect_form:
+                    oshitabi_login_data = redirect_form
                     
-                    oshitabi_response = session.post(
-                        self.oshitabi_login_url,
+                    oshitabi_response = self._request(
+                        session, 'POST', self.oshitabi_login_url,
                         data=oshitabi_login_data,
-                        allow_redirects=True
+                        headers=login_headers,
+                        allow_redirects=True,
+                        phase='login.oshitabi_redirect',
+                        username=username
                     )
                     
                     # 5. 获取oshitabi cookie
                     oshitabi_cookie = None
+                    oshitabi_expires = None
                     for cookie in session.cookies:
                         if cookie.name == 'oshitabi':
                             oshitabi_cookie = cookie.value
+                            oshitabi_expires = cookie.expires
                             break
                     
                     if oshitabi_cookie:
                         print(f"✅ 成功获得 {username} 的oshitabi cookie")
-                        return oshitabi_cookie
+                        return oshitabi_cookie, oshitabi_expires
                     else:
                         print(f"❌ 未获得 {username} 的oshitabi cookie")
-                        return None
+                        return None, None
                 else:
                     print("❌ 无法提取重定向表单数据")
-                    return None
+                    return None, None
             else:
                 print(f"❌ {username} 登录失败")
-                return None
+                return None, None
                 
         except Exception as e:
             print(f"❌ {username} 登录失败: {e}")
-            return None
+            return None, None
     
 
     
 
 
-    def extract_riding_record_details(self, content):
-        """提取乘车记录详细信息"""
+    def extract_riding_record_details(self, content, page=None):
+        """
+        提取乘车记录详细信息
+
+        Args:
+            content (str): 证书页面HTML
+            page (dict): 已有的 page_parser.parse() 结果，避免重复解析
+        """
         try:
+            if page is None:
+                page = self.page_parser.parse(content, extract_details=True)
+
             details = {
-                "riding_date": None,
-                "expiry_date": None,
+                "riding_date": page['riding_date'],
+                "expiry_date": page['expiry_date'],
                 "status": None,
                 "expiry_status": None
             }
             
-            # 提取有効期限
-            expiry_patterns = [
-                r'有効期限[：:]\s*(\d{4}年\d{1,2}月\d{1,2}日)まで',
-                r'tillDate[^>]*>([^<]+)</div>'
-            ]
-
-            for pattern in expiry_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                if matches:
-                    expiry_date = matches[0].strip()
-                    # 去掉"まで"后缀（如果存在）
-                    if expiry_date.endswith('まで'):
-                        expiry_date = expiry_date[:-2]
-                    details["expiry_date"] = expiry_date
-                    print(f"📅 有效期限: {details['expiry_date']}")
-                    break
-            
-            # 提取乗車日
-            riding_patterns = [
-                r'乗車日[：:]\s*(\d{4}年\d{1,2}月\d{1,2}日)',
-                r'ridingDate[^>]*>([^<]+)</div>'
-            ]
-            
-            for pattern in riding_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                if matches:
-                    details["riding_date"] = matches[0].strip()
-                    print(f"🚄 乗車日: {details['riding_date']}")
-                    break
+            if details["expiry_date"]:
+                print(f"📅 有效期限: {details['expiry_date']}")
+            if details["riding_date"]:
+                print(f"🚄 乗車日: {details['riding_date']}")
             
             # 提取状态
-            if re.search(r'CERTIFIED!', content, re.IGNORECASE):
+            if page['certified']:
                 details["status"] = "CERTIFIED!"
                 print(f"✅ 状态: CERTIFIED!")
             
@@ -291,10 +392,8 @@ class MultiAccountRidingRecordManager:
         """检查有效期状态"""
         try:
             # 解析日期
-            match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', expiry_date_str)
-            if match:
-                year, month, day = match.groups()
-                expiry_date = datetime(int(year), int(month), int(day))
+            expiry_date = parse_jp_date(expiry_date_str)
+            if expiry_date:
                 current_date = datetime.now()
                 
                 if current_date <= expiry_date:
@@ -311,10 +410,21 @@ class MultiAccountRidingRecordManager:
     
 
 
-    def check_all_accounts_force_login(self):
+    def check_all_accounts_force_login(self, max_workers=None):
         """检查所有账号的乘车记录（强制重新登录，不使用cookies缓存）"""
+        return self.check_all_accounts(force_login=True, max_workers=max_workers)
+
+    def check_all_accounts(self, force_login=False, max_workers=None, progress_callback=None):
+        """检查所有账号的乘车记录
+
+        Args:
+            force_login (bool): 是否强制重新登录（不使用cookie缓存）
+            max_workers (int): 并发检查的线程数，默认使用 CHECK_MAX_WORKERS，1 表示顺序检查
+            progress_callback (callable): 每完成一个账号调用一次 progress_callback(已完成数, 总数, 用户名)
+        """
+        mode = "强制重新登录" if force_login else "优先使用cookie缓存"
         try:
-            print(f"🚄 多账号乘车记录管理器（强制重新登录）")
+            print(f"🚄 多账号乘车记录管理器（{mode}）")
             print("=" * 60)
 
             if not self.accounts:
@@ -322,16 +432,37 @@ class MultiAccountRidingRecordManager:
                 print(f"💡 请编辑 {self.config_file} 添加账号信息")
                 return False
 
-            results = {}
-            all_have_records = True
-
+            usernames = []
             for username, account in self.accounts.items():
                 if not account.get('enabled', True):
                     print(f"⏭️ 跳过已禁用的账号: {username}")
                     continue
+                usernames.append(username)
+
+            workers = max(1, min(max_workers or self.max_workers, len(usernames) or 1))
 
-                # 强制重新登录检查
-                has_record, record_info = self.check_riding_record_for_user_force_login(username)
+            outcomes = {}
+            if workers == 1:
+                for username in usernames:
+                    outcomes[username] = self.check_riding_record_for_user(username, force_login)
+                    if progress_callback:
+                        progress_callback(len(outcomes), len(usernames), username)
+            else:
+                print(f"⚡ 并发检查 {len(usernames)} 个账号（{workers} 个线程）")
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {executor.submit(self.check_riding_record_for_user, username, force_login): username
+                               for username in usernames}
+                    for future in as_completed(futures):
+                        username = futures[future]
+                        outcomes[username] = future.result()
+                        if progress_callback:
+                            progress_callback(len(outcomes), len(usernames), username)
+
+            # 按配置顺序汇总，保证与顺序检查的结果文件一致
+            results = {}
+            all_have_records = True
+            for username in usernames:
+                has_record, record_info = outcomes[username]
                 results[username] = {
                     "has_riding_record": has_record,
                     "info": record_info
@@ -340,92 +471,191 @@ class MultiAccountRidingRecordManager:
                 if not has_record:
                     all_have_records = False
 
-            # 保存总体结果
-            with open(os.path.join(RESULTS_DIR, 'multi_account_results.json'), 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+            # 保存总体结果（逐账号写入存储，并立即导出JSON）
+            self.results_store.upsert_many(results, export=False)
+            self.results_store.export_json()
 
             print(f"\n" + "=" * 60)
-            print("强制重新登录检查完成")
+            print(f"{mode}检查完成")
             print("=" * 60)
 
             # 统计
-            total_accounts = len([a for a in self.accounts.values() if a.get('enabled', True)])
+            total_accounts = len(usernames)
             accounts_with_records = sum(1 for r in results.values() if r["has_riding_record"])
+            changed_accounts = sum(1 for r in results.values()
+                                   if isinstance(r["info"], dict) and r["info"].get("changed", True))
 
             print(f"📊 统计:")
             print(f"  总账号数: {total_accounts}")
             print(f"  有乘车记录账号: {accounts_with_records}")
+            print(f"  页面有变化账号: {changed_accounts}")
             print(f"  成功率: {accounts_with_records/total_accounts*100:.1f}%" if total_accounts > 0 else "  成功率: 0%")
 
             return all_have_records
 
         except Exception as e:
-            print(f"❌ 强制重新登录检查失败: {e}")
+            print(f"❌ {mode}检查失败: {e}")
             return False
 
+    def fetch_riding_record_page(self, username, cookie, page_meta=None):
+        """
+        使用oshitabi cookie访问乘车记录页面（复用账号会话）
+
+        Args:
+            page_meta (dict): 上次抓取的页面信息；包含ETag/Last-Modified时发送条件请求，
+                              页面未变化时服务器返回304
+        """
+        session = self.session_pool.get(username)
+
+        # 替换会话中已有的oshitabi cookie，避免新旧值同时发送
+        for existing in list(session.cookies):
+            if existing.name == 'oshitabi':
+                session.cookies.clear(existing.domain, existing.path, existing.name)
+
+        # cookie域名取自证书页面地址（本地模拟服务器等非voistock.com地址同样适用）
+        host = urlparse(self.riding_record_url).hostname
+        if host.endswith('.voistock.com'):
+            session.cookies.set('oshitabi', cookie, domain='.voistock.com')
+        session.cookies.set('oshitabi', cookie, domain=host)
+
+        headers = {}
+        if page_meta:
+            if page_meta.get('etag'):
+                headers['If-None-Match'] = page_meta['etag']
+            if page_meta.get('last_modified'):
+                headers['If-Modified-Since'] = page_meta['last_modified']
+
+        return self._request(session, 'GET', self.riding_record_url, headers=headers,
+                             phase='certificate.fetch', username=username)
+
+    def is_session_expired(self, response):
+        """判断证书页面响应是否表示oshitabi会话已失效"""
+        if response.status_code in (401, 403, 419):
+            return True
+
+        # 会话失效时会被重定向回登录页
+        for resp in list(response.history) + [response]:
+            if 'login' in resp.url.split('?')[0].lower():
+                return True
+
+        return 'name="login_id"' in response.text or 'redirectForm' in response.text
+
     def check_riding_record_for_user_force_login(self, username):
         """检查指定用户的乘车记录（强制重新登录，不使用cookies缓存）"""
-        try:
-            if username not in self.accounts:
-                return False, f"账号 {username} 不存在"
+        return self.check_riding_record_for_user(username, force_login=True)
 
-            account = self.accounts[username]
-            display_name = account.get('display_name', username)
+    def check_riding_record_for_user(self, username, force_login=False, account=None):
+        """检查指定用户的乘车记录
 
-            print(f"\n📋 检查 {display_name} ({username}) 的乘车记录（强制重新登录）")
-            print("-" * 50)
+        Args:
+            username (str): 用户名
+            force_login (bool): 是否强制重新登录；为False时优先使用缓存的cookie，
+                                仅在会话失效时才重新登录
+            account (dict): 使用给定的账号信息（username/password），用于尚未加入配置的账号
 
-            # 强制重新登录获取新的cookie（不使用缓存）
-            print(f"🔄 强制重新登录 {username}...")
-            cookie = self.perform_login_and_get_cookie(username)
-            if not cookie:
-                return False, "重新登录失败，无法获取cookie"
-
-            # 使用新获取的cookie访问证书页面
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,ja;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
+        Returns:
+            tuple: (是否有乘车记录, 结果信息)
+        """
+        with span('check', username=username, force_login=force_login) as phase:
+            has_riding_record, result = self._check_riding_record_for_user(username, force_login, account)
+            # 失败时结果信息为错误描述字符串
+            if isinstance(result, str):
+                phase.fail()
 
-            session.cookies.set('oshitabi', cookie, domain='.voistock.com')
-            session.cookies.set('oshitabi', cookie, domain='oshi-tabi.voistock.com')
+        # 记录检查时间和连续失败次数（定期复查按此安排下次检查）
+        if username in self.accounts:
+            self.results_store.record_check(username, success=not isinstance(result, str))
+        return has_riding_record, result
 
-            # 访问乘车记录页面
-            response = session.get(self.riding_record_url, timeout=15)
+    def _check_riding_record_for_user(self, username, force_login, account=None):
+        mode = "强制重新登录" if force_login else "优先使用cookie缓存"
+        try:
+            account = account or self.accounts.get(username)
+            if account is None:
+                return False, f"账号 {username} 不存在"
 
-            if response.status_code != 200:
-                return False, f"乘车记录页面访问失败: HTTP {response.status_code}"
+            display_name = account.get('display_name', username)
 
-            # 保存页面内容
-            with open(os.path.join(RESULTS_DIR, f'{username}_riding_record_page.html'), 'w', encoding='utf-8') as f:
-                f.write(response.text)
+            print(f"\n📋 检查 {display_name} ({username}) 的乘车记录（{mode}）")
+            print("-" * 50)
 
-            # 检查乘车记录
-            has_riding_record = self.target_text in response.text
+            response = None
+
+            # 上次抓取的页面信息（用于条件请求和变化检测）；解析规则变化后不再沿用
+            page_meta = self.results_store.get_page_meta(username)
+            if page_meta and page_meta['parser_version'] != PARSER_VERSION:
+                page_meta = None
+
+            # 先用缓存的cookie直接访问证书页面
+            if not force_login:
+                cached_cookie = self.cookie_cache.get(username)
+                if cached_cookie:
+                    print(f"🍪 使用 {username} 的缓存cookie")
+                    response = self.fetch_riding_record_page(username, cached_cookie, page_meta)
+                    if self.is_session_expired(response):
+                        print(f"⌛ {username} 的缓存cookie已失效，重新登录")
+                        self.cookie_cache.invalidate(username)
+                        response = None
+
+            if response is None:
+                # 重新登录获取新的cookie
+                print(f"🔄 重新登录 {username}...")
+                cookie = self.perform_login_and_get_cookie(username, account)
+                if not cookie:
+                    return False, "重新登录失败，无法获取cookie"
+
+                # 使用新获取的cookie访问证书页面
+                response = self.fetch_riding_record_page(username, cookie, page_meta)
+
+            # 判断页面是否变化：304（服务器确认未变化）或内容哈希与上次相同
+            if response.status_code == 304 and page_meta:
+                changed = False
+            elif response.status_code != 200:
+                return False, f"乘车记录页面访问失败: HTTP {response.status_code}"
+            else:
+                content_hash = hashlib.sha256(response.content).hexdigest()
+                changed = not page_meta or page_meta['content_hash'] != content_hash
+
+            if changed:
+                # 归档页面内容（压缩，按内容哈希去重）
+                with span('certificate.archive', username=username):
+                    self.page_archive.store(username, response.content, content_hash)
+
+                # 检查乘车记录（一次扫描同时提取详细信息所需的字段）
+                with span('certificate.parse', username=username):
+                    page = self.page_parser.parse(response.text)
+                has_riding_record = page['has_target']
+                details = self.extract_riding_record_details(response.text, page=page) if has_riding_record else None
+
+                self.results_store.set_page_meta(
+                    username, content_hash, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                    PARSER_VERSION, has_riding_record, details
+                )
+            else:
+                # 页面未变化：跳过写入和解析，沿用上次的解析结果（有效期状态按当前日期重新计算）
+                print(f"♻️ {display_name} 的证书页面未变化，沿用上次的解析结果")
+                has_riding_record = page_meta['has_riding_record']
+                details = page_meta['details']
+                if details and details.get('expiry_date'):
+                    details['expiry_status'] = self.check_expiry_status(details['expiry_date'])
+
+                # 200响应的验证器变化时（如服务器开始返回ETag）更新，以便下次发送条件请求
+                validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                if response.status_code == 200 and validators != (page_meta['etag'], page_meta['last_modified']):
+                    self.results_store.set_page_meta(username, page_meta['content_hash'], *validators,
+                                                     PARSER_VERSION, has_riding_record, details)
 
             if has_riding_record:
                 print(f"✅ {display_name} 已有乘车记录")
 
-                # 提取详细信息
-                details = self.extract_riding_record_details(response.text)
-
                 result = {
                     "username": username,
                     "display_name": display_name,
                     "has_riding_record": True,
                     "riding_record_details": details,
-                    "check_time": datetime.now().isoformat()
+                    "check_time": datetime.now().isoformat(),
+                    "changed": changed
                 }
-
-                # 保存个人结果
-                with open(os.path.join(RESULTS_DIR, f'{username}_riding_record_result.json'), 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
-
                 return True, result
             else:
                 print(f"❌ {display_name} 暂无乘车记录")
@@ -433,44 +663,25 @@ class MultiAccountRidingRecordManager:
                     "username": username,
                     "display_name": display_name,
                     "has_riding_record": False,
-                    "check_time": datetime.now().isoformat()
+                    "check_time": datetime.now().isoformat(),
+                    "changed": changed
                 }
                 return False, result
 
         except Exception as e:
-            print(f"❌ 强制重新登录检查 {username} 乘车记录失败: {e}")
+            print(f"❌ 检查 {username} 乘车记录失败（{mode}）: {e}")
             return False, str(e)
 
     def update_single_user_result(self, username, record_info):
         """
-        更新单个用户的结果到multi_account_results.json文件
+        更新单个用户的结果（写入结果存储，multi_account_results.json 延迟导出）
 
         Args:
             username (str): 用户名
             record_info (dict): 记录信息
         """
         try:
-            results_file = os.path.join(RESULTS_DIR, 'multi_account_results.json')
-
-            # 读取现有结果
-            results = {}
-            if os.path.exists(results_file):
-                try:
-                    with open(results_file, 'r', encoding='utf-8') as f:
-                        results = json.load(f)
-                except (json.JSONDecodeError, FileNotFoundError):
-                    results = {}
-
-            # 更新单个用户的结果
-            results[username] = {
-                "has_riding_record": True,
-                "info": record_info
-            }
-
-            # 保存更新后的结果
-            with open(results_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
-
+            self.results_store.upsert(username, True, record_info)
             print(f"✅ 已更新 {username} 的查询结果到文件")
 
         except Exception as e:
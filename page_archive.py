@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+证书页面归档
+按内容哈希去重保存压缩后的页面快照（优先zstd，未安装 zstandard 时使用gzip），
+并用SQLite索引记录每个账号在各时间点抓取到的页面，便于审计页面的变化
+"""
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class PageArchive:
+    """
+    内容寻址的页面归档
+
+    Args:
+        root_dir (str): 归档目录（objects/ 保存压缩后的页面，index.db 为索引）
+        codec (str): auto / zstd / gzip；auto 在安装了 zstandard 时使用zstd
+    """
+
+    def __init__(self, root_dir, codec='auto'):
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, 'objects')
+        self.index_path = os.path.join(root_dir, 'index.db')
+
+        codec = (codec or 'auto').lower()
+        if codec == 'auto':
+            codec = 'zstd' if zstandard is not None else 'gzip'
+        if codec == 'zstd' and zstandard is None:
+            print("⚠️ 未安装 zstandard，页面归档改用gzip压缩")
+            codec = 'gzip'
+        if codec not in CODEC_EXTENSIONS:
+            raise ValueError(f'不支持的压缩方式: {codec}')
+        self.codec = codec
+
+        self._local = threading.local()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self):
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER,
+                    stored_size INTEGER
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_user_time ON snapshots (username, fetched_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_hash ON snapshots (content_hash)')
+
+    def _object_path(self, content_hash, codec):
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash[2:] + CODEC_EXTENSIONS[codec])
+
+    def _find_object(self, content_hash):
+        """查找已保存的页面对象，返回 (路径, 压缩方式)，不存在时返回 (None, None)"""
+        for codec in CODEC_EXTENSIONS:
+            path = self._object_path(content_hash, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def _compress(self, content):
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(content)
+        return gzip.compress(content, compresslevel=6, mtime=0)
+
+    @staticmethod
+    def _decompress(data, codec):
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError('读取zstd压缩的页面需要安装 zstandard')
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def store(self, username, content, content_hash=None, fetched_at=None):
+        """
+        归档一次抓取到的页面
+
+        Args:
+            username (str): 账号
+            content (bytes): 页面原始内容
+            content_hash (str): 内容的SHA-256（已计算时传入，避免重复计算）
+            fetched_at (float): 抓取时间戳，默认当前时间
+
+        Returns:
+            str: 内容哈希
+        """
+        content_hash = content_hash or hashlib.sha256(content).hexdigest()
+
+        # 相同内容只保存一份
+        path, _ = self._find_object(content_hash)
+        if path is None:
+            path = self._object_path(content_hash, self.codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self._compress(content))
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT INTO snapshots (username, fetched_at, content_hash, size, stored_size) VALUES (?, ?, ?, ?, ?)',
+                (username, fetched_at or time.time(), content_hash, len(content), os.path.getsize(path))
+            )
+        return content_hash
+
+    def load(self, content_hash):
+        """读取页面内容（bytes），不存在时返回None"""
+        if not HASH_PATTERN.match(content_hash or ''):
+            return None
+        path, codec = self._find_object(content_hash)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return self._decompress(f.read(), codec)
+
+    def history(self, username, limit=50):
+        """账号的页面快照历史（最新的在前）"""
+        rows = self._connect().execute(
+            'SELECT fetched_at, content_hash, size, stored_size FROM snapshots '
+            'WHERE username = ? ORDER BY fetched_at DESC LIMIT ?', (username, limit)
+        ).fetchall()
+        return [{'fetchedAt': row[0], 'contentHash': row[1], 'size': row[2], 'storedSize': row[3]} for row in rows]
+
+    def latest(self, username):
+        """账号最近一次归档的页面内容（bytes），没有时返回None"""
+        history = self.history(username, limit=1)
+        return self.load(history[0]['contentHash']) if history else None
+
+    def latest_hashes(self):
+        """每个账号最近一次归档的内容哈希 {username: content_hash}"""
+        rows = self._connect().execute('''
+            SELECT s.username, s.content_hash FROM snapshots s
+            JOIN (SELECT username, MAX(fetched_at) AS fetched_at FROM snapshots GROUP BY username) latest
+              ON s.username = latest.username AND s.fetched_at = latest.fetched_at
+        ''').fetchall()
+        return dict(rows)
+
+    def stats(self):
+        """归档统计：快照数、去重后的对象数、原始大小和压缩后占用"""
+        snapshots, objects, raw_size = self._connect().execute(
+            'SELECT COUNT(*), COUNT(DISTINCT content_hash), COALESCE(SUM(size), 0) FROM snapshots'
+        ).fetchone()
+        stored_size = 0
+        for directory, _, files in os.walk(self.objects_dir):
+            stored_size += sum(os.path.getsize(os.path.join(directory, name))
+                               for name in files if not name.endswith('.tmp'))
+        return {
+            'codec': self.codec,
+            'snapshots': snapshots,
+            'objects': objects,
+            'rawBytes': raw_size,
+            'storedBytes': stored_size
+        }
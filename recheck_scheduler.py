@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+定期复查调度器
+按"下次检查时间"维护账号的优先队列：从未检查过或临近有效期的账号优先检查，
+有效期还很长的账号很少检查，检查失败的账号按指数退避重试
+"""
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from record_parser import parse_jp_date
+
+
+class RecheckPolicy:
+    """
+    下次检查时间的计算规则
+
+    Args:
+        min_interval (float): 最短检查间隔（秒），临近有效期的账号按此间隔检查
+        max_interval (float): 最长检查间隔（秒），有效期还很长或已过期的账号按此间隔检查
+        no_record_interval (float): 暂无乘车记录的账号的检查间隔（秒）
+        expiry_fraction (float): 有记录的账号按剩余有效期的这一比例安排下次检查
+        failure_backoff (float): 检查失败后的首次重试间隔（秒），之后每次失败翻倍，不超过 no_record_interval
+        jitter (float): 间隔的随机抖动比例，避免同一批检查的账号之后同时到期
+    """
+
+    def __init__(self, min_interval=3600, max_interval=7 * 86400, no_record_interval=6 * 3600,
+                 expiry_fraction=0.1, failure_backoff=300, jitter=0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.no_record_interval = no_record_interval
+        self.expiry_fraction = expiry_fraction
+        self.failure_backoff = failure_backoff
+        self.jitter = jitter
+
+    @staticmethod
+    def last_check_time(entry, state):
+        """最近一次检查的时间戳：优先使用检查记录，其次是结果中的 check_time"""
+        if state and state.get('last_check'):
+            return state['last_check']
+        info = entry.get('info') if entry else None
+        if isinstance(info, dict) and info.get('check_time'):
+            try:
+                return datetime.fromisoformat(info['check_time']).timestamp()
+            except ValueError:
+                return None
+        return None
+
+    def interval(self, entry, state, now=None):
+        """
+        距上次检查应间隔的秒数（不含抖动）
+
+        Args:
+            entry (dict): 账号的检查结果 {'has_riding_record', 'info'}，没有时为None
+            state (dict): 账号的检查记录 {'last_check', 'failures'}，没有时为None
+        """
+        now = now or time.time()
+        failures = (state or {}).get('failures') or 0
+        if failures:
+            return min(self.no_record_interval, self.failure_backoff * (2 ** (failures - 1)))
+
+        if not entry or not entry.get('has_riding_record'):
+            return self.no_record_interval
+
+        info = entry.get('info')
+        details = info.get('riding_record_details') if isinstance(info, dict) else None
+        expiry = parse_jp_date((details or {}).get('expiry_date'))
+        if expiry is None:
+            return min(self.max_interval, max(self.min_interval, 86400))
+
+        remaining = expiry.timestamp() - now
+        if remaining <= 0:
+            return self.max_interval
+        # 临近有效期的账号检查得更频繁，并保证在到期时再检查一次（更新有效期状态）
+        interval = min(self.max_interval, max(self.min_interval, remaining * self.expiry_fraction))
+        last_check = self.last_check_time(entry, state) or now
+        return min(interval, max(self.min_interval, expiry.timestamp() - last_check))
+
+    def next_due(self, entry, state, now=None):
+        """下次检查的时间戳；从未检查过的账号立即到期"""
+        now = now or time.time()
+        last_check = self.last_check_time(entry, state)
+        if last_check is None:
+            return now
+        interval = self.interval(entry, state, now)
+        return last_check + interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class RecheckScheduler:
+    """
+    后台复查调度器
+
+    用最小堆按下次检查时间排列已启用的账号；弹出到期账号时重新读取检查记录，
+    安排之后又被其他途径（检查所有账号、单账号查询）检查过的账号会被重新安排而不是重复检查。
+
+    Args:
+        get_manager (callable): 返回当前的 MultiAccountRidingRecordManager
+        policy (RecheckPolicy): 下次检查时间的计算规则
+        max_workers (int): 并发检查的线程数
+        batch_size (int): 每轮最多检查的账号数
+        poll_interval (float): 没有到期账号时最长的等待秒数（同时用于发现新增/删除的账号）
+        lease (ProcessLease): 多进程部署时只有取得租约的进程执行复查，其他进程定期重试
+    """
+
+    def __init__(self, get_manager, policy=None, max_workers=2, batch_size=50, poll_interval=30, lease=None):
+        self.get_manager = get_manager
+        self.policy = policy or RecheckPolicy()
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.lease = lease
+
+        self._heap = []
+        # 账号 -> 当前有效的下次检查时间（堆中时间不一致的条目已过时，弹出时跳过）
+        self._due = {}
+        # 账号 -> 安排下次检查时依据的上次检查时间；手动触发的账号不做重新安排
+        self._basis = {}
+        self._forced = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._synced_version = None
+
+        self.checks = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_run = None
+
+    # ---- 队列维护 ----
+
+    def _push(self, username, due, basis=None):
+        self._due[username] = due
+        self._basis[username] = basis
+        heapq.heappush(self._heap, (due, username))
+
+    def _schedule(self, username, entry, state, now):
+        self._push(username, self.policy.next_due(entry, state, now), self.policy.last_check_time(entry, state))
+
+    def sync(self, mgr):
+        """账号配置变化时，加入新启用的账号、移除已删除或禁用的账号"""
+        version = (id(mgr), mgr.accounts_version)
+        if version == self._synced_version:
+            return
+        enabled = [username for username, account in mgr.accounts.items() if account.get('enabled', True)]
+        results = mgr.results_store.get_many(enabled)
+        states = mgr.results_store.get_check_states(enabled)
+        now = time.time()
+
+        with self._lock:
+            enabled_set = set(enabled)
+            for username in list(self._due):
+                if username not in enabled_set:
+                    del self._due[username]
+                    self._basis.pop(username, None)
+                    self._forced.discard(username)
+            for username in enabled:
+                if username not in self._due:
+                    self._schedule(username, results.get(username), states.get(username), now)
+            # 清理已移除账号的过时条目
+            self._heap = [item for item in self._heap if self._due.get(item[1]) == item[0]]
+            heapq.heapify(self._heap)
+            self._synced_version = version
+
+    def _pop_due(self, now):
+        """取出已到期的账号（最多 batch_size 个）"""
+        due = []
+        with self._lock:
+            while self._heap and len(due) < self.batch_size:
+                due_time, username = self._heap[0]
+                if self._due.get(username) != due_time:
+                    heapq.heappop(self._heap)
+                    continue
+                if due_time > now:
+                    break
+                heapq.heappop(self._heap)
+                del self._due[username]
+                due.append((username, self._basis.pop(username, None)))
+        return due
+
+    def trigger(self, username):
+        """
+        让账号在下一轮检查
+
+        请求写入结果存储而不是本进程的队列：多进程部署时处理请求的进程不一定持有复查租约，
+        持有租约的进程在每轮开始时取出请求（最迟 poll_interval 秒后执行）
+        """
+        self.get_manager().results_store.request_recheck(username)
+        self._wakeup.set()
+
+    def _claim_requests(self, mgr, now):
+        """将结果存储中待处理的复查请求加入队列并立即到期"""
+        usernames = mgr.results_store.take_recheck_requests()
+        with self._lock:
+            for username in usernames:
+                account = mgr.accounts.get(username)
+                if account and account.get('enabled', True):
+                    self._push(username, now)
+                    self._forced.add(username)
+
+    # ---- 执行 ----
+
+    def _check(self, mgr, username):
+        try:
+            has_record, info = mgr.check_riding_record_for_user(username)
+        except Exception as e:
+            print(f"⚠️ 定期复查 {username} 失败: {e}")
+            return False
+        if isinstance(info, str):
+            # 失败时保留上次的结果，只记录失败次数（由检查记录决定退避间隔）
+            return False
+        mgr.results_store.upsert(username, has_record, info)
+        return True
+
+    def run_due(self, now=None):
+        """检查所有已到期的账号，返回本轮检查的账号数"""
+        mgr = self.get_manager()
+        self.sync(mgr)
+        now = now or time.time()
+        self._claim_requests(mgr, now)
+
+        candidates = self._pop_due(now)
+        if not candidates:
+            return 0
+
+        # 安排之后又被其他途径检查过的账号按最新的检查记录重新安排
+        names = [username for username, _ in candidates]
+        results = mgr.results_store.get_many(names)
+        states = mgr.results_store.get_check_states(names)
+        usernames = []
+        with self._lock:
+            for username, basis in candidates:
+                last_check = self.policy.last_check_time(results.get(username), states.get(username))
+                if (username not in self._forced and last_check is not None
+                        and (basis is None or last_check > basis)):
+                    self._schedule(username, results.get(username), states.get(username), now)
+                    self.skipped += 1
+                else:
+                    self._forced.discard(username)
+                    usernames.append(username)
+
+        if usernames:
+            print(f"⏰ 定期复查 {len(usernames)} 个到期账号")
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(usernames)),
+                                    thread_name_prefix='recheck') as executor:
+                outcomes = list(executor.map(lambda username: self._check(mgr, username), usernames))
+
+            results = mgr.results_store.get_many(usernames)
+            states = mgr.results_store.get_check_states(usernames)
+            finished = time.time()
+            with self._lock:
+                for username, success in zip(usernames, outcomes):
+                    self.checks += 1
+                    self.failures += not success
+                    account = mgr.accounts.get(username)
+                    if account and account.get('enabled', True):
+                        self._schedule(username, results.get(username), states.get(username), finished)
+                self.last_run = finished
+        return len(usernames)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            if self.lease is not None and not self.lease.try_acquire():
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"⚠️ 定期复查失败: {e}")
+
+            with self._lock:
+                next_due = self._heap[0][0] if self._heap else None
+            timeout = self.poll_interval
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, next_due - time.time()))
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self):
+        """启动后台调度线程"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._loop, name='recheck-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self.lease is not None:
+            self.lease.release()
+
+    # ---- 状态 ----
+
+    def upcoming(self, limit=20):
+        """即将到期的账号 [{'username', 'due'}]，按到期时间排序"""
+        with self._lock:
+            entries = heapq.nsmallest(limit, ((due, username) for username, due in self._due.items()))
+        return [{'username': username, 'due': datetime.fromtimestamp(due).isoformat()} for due, username in entries]
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            overdue = sum(1 for due in self._due.values() if due <= now)
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'leader': self.lease.held if self.lease is not None else None,
+                'scheduled': len(self._due),
+                'overdue': overdue,
+                'checks': self.checks,
+                'failures': self.failures,
+                'skipped': self.skipped,
+                'lastRun': datetime.fromtimestamp(self.last_run).isoformat() if self.last_run else None
+            }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+页面解析
+预编译证书页面和登录页面使用的正则，每个字段只查找第一个匹配
+"""
+import re
+from datetime import datetime
+
+# 解析结果的版本号：提取规则变化时递增，使已缓存的解析结果失效并重新解析页面
+PARSER_VERSION = 1
+
+
+class FieldPattern:
+    """
+    预编译的字段正则
+
+    ignore_case=True 时先按原样大小写查找（可利用字面量前缀快速扫描），
+    找不到再忽略大小写查找，结果与直接忽略大小写查找相同（除非页面中同时出现多种大小写写法）
+    """
+
+    def __init__(self, pattern, ignore_case=False):
+        self.exact = re.compile(pattern)
+        self.insensitive = re.compile(pattern, re.IGNORECASE) if ignore_case else None
+
+    def search(self, content):
+        match = self.exact.search(content)
+        if match is None and self.insensitive is not None:
+            match = self.insensitive.search(content)
+        return match
+
+
+# 日期（2025年8月31日）
+JP_DATE_PATTERN = re.compile(r'(\d{4})年(\d{1,2})月(\d{1,2})日')
+
+# 证书页面字段：按优先级排列的候选正则，取第一个匹配的分组1
+CERTIFICATE_FIELDS = (
+    ('expiry_date', (
+        FieldPattern(r'有効期限[：:]\s*(\d{4}年\d{1,2}月\d{1,2}日)まで'),
+        FieldPattern(r'tillDate[^>]*>([^<]+)</div>', ignore_case=True)
+    )),
+    ('riding_date', (
+        FieldPattern(r'乗車日[：:]\s*(\d{4}年\d{1,2}月\d{1,2}日)'),
+        FieldPattern(r'ridingDate[^>]*>([^<]+)</div>', ignore_case=True)
+    )),
+)
+CERTIFIED_PATTERN = FieldPattern(r'CERTIFIED!', ignore_case=True)
+
+# 登录页面
+CSRF_PATTERNS = (
+    re.compile(r'name=["\']_token["\'][^>]*value=["\']([^"\']+)["\']', re.IGNORECASE),
+    re.compile(r'value=["\']([^"\']+)["\'][^>]*name=["\']_token["\']', re.IGNORECASE),
+)
+REDIRECT_FIELD_PATTERN = re.compile(r'name="(otp|loginId|registerId)" value="([^"]+)"')
+REDIRECT_FIELDS = ('otp', 'loginId', 'registerId')
+
+
+class CertificatePageParser:
+    """证书页面解析器：判断是否包含目标文本，并提取有效期、乘车日和CERTIFIED!状态"""
+
+    def __init__(self, target_text):
+        self.target_text = target_text
+
+    def parse(self, content, extract_details=None):
+        """
+        解析证书页面
+
+        Args:
+            content (str): 页面HTML
+            extract_details (bool): 是否提取详细字段；默认仅在包含目标文本时提取
+
+        Returns:
+            dict: {'has_target', 'riding_date', 'expiry_date', 'certified'}
+        """
+        result = {
+            'has_target': self.target_text in content,
+            'riding_date': None,
+            'expiry_date': None,
+            'certified': False
+        }
+        if extract_details is None:
+            extract_details = result['has_target']
+        if not extract_details:
+            return result
+
+        for field, patterns in CERTIFICATE_FIELDS:
+            for pattern in patterns:
+                match = pattern.search(content)
+                if match:
+                    result[field] = match.group(1).strip()
+                    break
+
+        # 去掉"まで"后缀（如果存在）
+        if result['expiry_date'] and result['expiry_date'].endswith('まで'):
+            result['expiry_date'] = result['expiry_date'][:-2]
+
+        result['certified'] = CERTIFIED_PATTERN.search(content) is not None
+        return result
+
+
+def parse_jp_date(text):
+    """解析文本中的第一个日期（2025年8月31日），找不到或日期无效时返回None"""
+    match = JP_DATE_PATTERN.search(text or '')
+    if not match:
+        return None
+    try:
+        return datetime(*(int(value) for value in match.groups()))
+    except ValueError:
+        return None
+
+
+def extract_csrf_token(content):
+    """提取登录页面中的 _token，找不到时返回None"""
+    for pattern in CSRF_PATTERNS:
+        match = pattern.search(content)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_redirect_form(content):
+    """
+    解析登录后返回的 oshi-tabi 重定向表单
+
+    Returns:
+        dict: {'otp', 'loginId', 'registerId'}；页面不是重定向表单时返回None，字段不全时返回 {}
+    """
+    if "redirectForm" not in content or "oshi-tabi.voistock.com" not in content:
+        return None
+
+    # 一次扫描取得三个字段（各取第一次出现的值）
+    fields = {}
+    for match in REDIRECT_FIELD_PATTERN.finditer(content):
+        fields.setdefault(match.group(1), match.group(2))
+        if len(fields) == len(REDIRECT_FIELDS):
+            return fields
+    return {}
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+乘车记录检查结果存储
+基于SQLite（WAL模式）按账号增量写入，保留 multi_account_results.json 导出以兼容旧的读取方式
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+class ResultsStore:
+    """
+    检查结果存储
+
+    Args:
+        db_path (str): SQLite数据库文件路径
+        export_file (str): 兼容用的JSON导出文件路径（multi_account_results.json）
+        export_interval (float): 单账号更新后延迟导出JSON的秒数（合并短时间内的多次更新）
+        export_usernames (callable): 返回要导出的账号列表（按此顺序导出，通常为配置中已启用的账号）；
+            不传时导出全部结果。已从配置中删除的账号的旧结果不会出现在导出文件中
+    """
+
+    def __init__(self, db_path, export_file=None, export_interval=5.0, export_usernames=None):
+        self.db_path = db_path
+        self.export_file = export_file
+        self.export_interval = export_interval
+        self.export_usernames = export_usernames
+
+        self._local = threading.local()
+        self._export_lock = threading.Lock()
+        self._export_timer = None
+        self._write_count = 0
+
+        directory = os.path.dirname(self.db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._init_schema()
+        self._import_legacy_json()
+
+    def _connect(self):
+        """每个线程使用独立的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    username TEXT PRIMARY KEY,
+                    has_riding_record INTEGER,
+                    info TEXT,
+                    check_time TEXT,
+                    updated_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_results_check_time ON results (check_time)')
+            # 证书页面的内容哈希、HTTP验证器和解析结果，用于条件请求和变化检测
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    username TEXT PRIMARY KEY,
+                    content_hash TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    parser_version INTEGER,
+                    has_riding_record INTEGER,
+                    details TEXT,
+                    updated_at REAL
+                )
+            ''')
+            # 每个账号最近一次检查的时间和连续失败次数，用于安排定期复查
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS checks (
+                    username TEXT PRIMARY KEY,
+                    last_check REAL,
+                    failures INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            # 登录后获得的oshitabi cookie（按账号单行更新，多进程共享）
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cookies (
+                    username TEXT PRIMARY KEY,
+                    cookie TEXT,
+                    obtained_at REAL,
+                    expires_at REAL
+                )
+            ''')
+            # 手动触发的复查请求（任意进程写入，由持有复查租约的进程取出执行）
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recheck_requests (
+                    username TEXT PRIMARY KEY,
+                    requested_at REAL
+                )
+            ''')
+
+    def _import_legacy_json(self):
+        """首次使用时导入已有的 multi_account_results.json"""
+        if not self.export_file or not os.path.exists(self.export_file):
+            return
+
+        conn = self._connect()
+        if conn.execute('SELECT COUNT(*) FROM results').fetchone()[0] > 0:
+            return
+
+        try:
+            with open(self.export_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+
+        if isinstance(legacy, dict) and legacy:
+            self.upsert_many(legacy, export=False)
+            print(f"✅ 已从 {self.export_file} 导入 {len(legacy)} 条检查结果")
+
+    @staticmethod
+    def _row_values(username, entry):
+        info = entry.get('info')
+        check_time = info.get('check_time') if isinstance(info, dict) else None
+        return (
+            username,
+            1 if entry.get('has_riding_record') else 0,
+            json.dumps(info, ensure_ascii=False),
+            check_time,
+            time.time()
+        )
+
+    @staticmethod
+    def _row_to_entry(row):
+        return {
+            'has_riding_record': bool(row[1]),
+            'info': json.loads(row[2]) if row[2] is not None else None
+        }
+
+    def upsert(self, username, has_riding_record, info, export=True):
+        """写入或更新单个账号的结果"""
+        self.upsert_many({username: {'has_riding_record': has_riding_record, 'info': info}}, export=export)
+
+    def upsert_many(self, results, export=True):
+        """在一个事务中写入多个账号的结果 {username: {'has_riding_record', 'info'}}"""
+        conn = self._connect()
+        with conn:
+            conn.executemany('''
+                INSERT INTO results (username, has_riding_record, info, check_time, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    has_riding_record = excluded.has_riding_record,
+                    info = excluded.info,
+                    check_time = excluded.check_time,
+                    updated_at = excluded.updated_at
+            ''', [self._row_values(username, entry) for username, entry in results.items()])
+        self._write_count += 1
+
+        if export:
+            self.schedule_export()
+
+    def version(self):
+        """
+        结果版本标识：本进程写入次数 + 数据库/WAL文件的修改时间
+        （其他进程写入时WAL文件的修改时间会变化）
+        """
+        mtimes = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return (self._write_count, tuple(mtimes))
+
+    def get(self, username):
+        """获取单个账号的结果，不存在时返回None"""
+        row = self._connect().execute(
+            'SELECT username, has_riding_record, info FROM results WHERE username = ?', (username,)
+        ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get_many(self, usernames):
+        """批量获取多个账号的结果"""
+        usernames = list(usernames)
+        results = {}
+        conn = self._connect()
+        # SQLite 单条语句的参数数量有限，分批查询
+        for i in range(0, len(usernames), 500):
+            chunk = usernames[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(
+                f'SELECT username, has_riding_record, info FROM results WHERE username IN ({placeholders})', chunk
+            ):
+                results[row[0]] = self._row_to_entry(row)
+        return results
+
+    def get_all(self):
+        """获取全部结果（与 multi_account_results.json 结构相同）"""
+        rows = self._connect().execute(
+            'SELECT username, has_riding_record, info FROM results ORDER BY rowid'
+        ).fetchall()
+        return {row[0]: self._row_to_entry(row) for row in rows}
+
+    def get_page_meta(self, username):
+        """获取账号证书页面的上次抓取信息，不存在时返回None"""
+        row = self._connect().execute(
+            'SELECT content_hash, etag, last_modified, parser_version, has_riding_record, details '
+            'FROM pages WHERE username = ?', (username,)
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            'content_hash': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'parser_version': row[3],
+            'has_riding_record': bool(row[4]),
+            'details': json.loads(row[5]) if row[5] is not None else None
+        }
+
+    def set_page_meta(self, username, content_hash, etag, last_modified, parser_version,
+                      has_riding_record, details):
+        """保存账号证书页面的抓取信息和解析结果"""
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                INSERT INTO pages (username, content_hash, etag, last_modified, parser_version,
+                                   has_riding_record, details, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    parser_version = excluded.parser_version,
+                    has_riding_record = excluded.has_riding_record,
+                    details = excluded.details,
+                    updated_at = excluded.updated_at
+            ''', (username, content_hash, etag, last_modified, parser_version,
+                  1 if has_riding_record else 0,
+                  json.dumps(details, ensure_ascii=False) if details is not None else None,
+                  time.time()))
+
+    def record_check(self, username, success, checked_at=None):
+        """记录一次检查：成功时清零连续失败次数，失败时加一"""
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                INSERT INTO checks (username, last_check, failures) VALUES (?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    last_check = excluded.last_check,
+                    failures = CASE WHEN excluded.failures = 0 THEN 0 ELSE checks.failures + 1 END
+            ''', (username, checked_at or time.time(), 0 if success else 1))
+
+    def get_check_states(self, usernames=None):
+        """获取账号的检查状态 {username: {'last_check', 'failures'}}，不指定时返回全部"""
+        conn = self._connect()
+        if usernames is None:
+            rows = conn.execute('SELECT username, last_check, failures FROM checks').fetchall()
+        else:
+            usernames = list(usernames)
+            rows = []
+            for i in range(0, len(usernames), 500):
+                chunk = usernames[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows.extend(conn.execute(
+                    f'SELECT username, last_check, failures FROM checks WHERE username IN ({placeholders})', chunk
+                ))
+        return {row[0]: {'last_check': row[1], 'failures': row[2]} for row in rows}
+
+    def get_cookie(self, username):
+        """获取账号保存的cookie，返回 (cookie, expires_at)，不存在时返回None"""
+        row = self._connect().execute(
+            'SELECT cookie, expires_at FROM cookies WHERE username = ?', (username,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set_cookies(self, cookies):
+        """写入或更新多个账号的cookie {username: (cookie, obtained_at, expires_at)}"""
+        conn = self._connect()
+        with conn:
+            conn.executemany('''
+                INSERT INTO cookies (username, cookie, obtained_at, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    cookie = excluded.cookie,
+                    obtained_at = excluded.obtained_at,
+                    expires_at = excluded.expires_at
+            ''', [(username, *values) for username, values in cookies.items()])
+
+    def delete_cookie(self, username):
+        """删除账号的cookie，返回是否存在"""
+        conn = self._connect()
+        with conn:
+            return conn.execute('DELETE FROM cookies WHERE username = ?', (username,)).rowcount > 0
+
+    def request_recheck(self, username):
+        """记录一个手动复查请求（同一账号重复请求只保留一条）"""
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO recheck_requests (username, requested_at) VALUES (?, ?)',
+                         (username, time.time()))
+
+    def take_recheck_requests(self):
+        """取出并删除所有待处理的复查请求，按请求时间排序"""
+        conn = self._connect()
+        with conn:
+            rows = conn.execute('SELECT username, requested_at FROM recheck_requests ORDER BY requested_at').fetchall()
+            # 只删除已读取的请求（读取之后其他进程新写入的请求留到下一轮）
+            conn.executemany('DELETE FROM recheck_requests WHERE username = ? AND requested_at = ?', rows)
+        return [row[0] for row in rows]
+
+    def export_results(self):
+        """导出文件的内容：指定了 export_usernames 时只包含这些账号（按其顺序），否则为全部结果"""
+        if self.export_usernames is None:
+            return self.get_all()
+        usernames = list(self.export_usernames())
+        results = self.get_many(usernames)
+        return {username: results[username] for username in usernames if username in results}
+
+    def export_json(self):
+        """导出为 multi_account_results.json（先写临时文件再替换）"""
+        if not self.export_file:
+            return
+
+        with self._export_lock:
+            self._export_timer = None
+            # 多个服务进程可能同时导出，临时文件名不能相同
+            fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.export_file)), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.export_results(), f, indent=2, ensure_ascii=False)
+            os.chmod(temp_file, 0o644)
+            os.replace(temp_file, self.export_file)
+
+    def schedule_export(self):
+        """延迟导出JSON，合并短时间内的多次更新"""
+        if not self.export_file:
+            return
+        if self.export_interval <= 0:
+            self.export_json()
+            return
+
+        with self._export_lock:
+            if self._export_timer is not None:
+                return
+            self._export_timer = threading.Timer(self.export_interval, self._export_safely)
+            self._export_timer.daemon = True
+            self._export_timer.start()
+
+    def _export_safely(self):
+        try:
+            self.export_json()
+        except Exception as e:
+            print(f"⚠️ 导出检查结果JSON失败: {e}")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+前端静态文件服务
+启动时索引 frontend/dist（小文件及其预压缩版本直接缓存在内存中），带内容哈希的文件使用长期不可变缓存，
+按 Accept-Encoding 返回构建时生成的 .br / .gz 文件
+
+生成预压缩文件（构建前端之后运行，安装 brotli 时同时生成 .br）:
+    python static_assets.py frontend/dist
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Vite 构建产物的文件名带有内容哈希（index-1ecaf460.js），内容变化时文件名随之变化
+HASHED_NAME_PATTERN = re.compile(r'-[0-9a-f]{8}\.[a-z0-9]+$')
+
+# 值得预压缩的文本类文件（woff2/图片本身已压缩）
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.xml', '.map', '.ico', '.wasm')
+
+# 预压缩文件后缀 -> Content-Encoding，按优先级排列
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+CONTENT_TYPES = {
+    '.js': 'text/javascript; charset=utf-8',
+    '.mjs': 'text/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json',
+    '.svg': 'image/svg+xml',
+    '.woff2': 'font/woff2',
+    '.woff': 'font/woff',
+    '.wasm': 'application/wasm'
+}
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+def content_type_for(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in CONTENT_TYPES:
+        return CONTENT_TYPES[extension]
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def precompress(dist_dir, min_size=512):
+    """
+    为 dist 目录中的文本类文件生成 .gz（以及安装了 brotli 时的 .br），只保留比原文件小的版本
+
+    Returns:
+        list: [(相对路径, 原始大小, {后缀: 压缩后大小})]
+    """
+    report = []
+    for directory, _, files in os.walk(dist_dir):
+        for name in sorted(files):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+
+            variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(data, quality=11)
+
+            sizes = {}
+            for suffix, compressed in variants.items():
+                if len(compressed) >= len(data) * 0.95:
+                    continue
+                temp_path = f'{path}{suffix}.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(temp_path, path + suffix)
+                sizes[suffix] = len(compressed)
+            report.append((os.path.relpath(path, dist_dir), len(data), sizes))
+    return report
+
+
+class StaticAssets:
+    """
+    dist 目录的内存索引
+
+    Args:
+        dist_dir (str): 前端构建目录
+        max_cached_file (int): 单个文件（含预压缩版本）不超过此大小时缓存内容，否则按需从磁盘读取
+        max_cache_bytes (int): 内存中缓存的内容总大小上限
+        refresh_interval (float): 检查 index.html 是否被重新构建的最短间隔（秒）
+    """
+
+    INDEX = 'index.html'
+
+    def __init__(self, dist_dir, max_cached_file=1024 * 1024, max_cache_bytes=32 * 1024 * 1024,
+                 refresh_interval=2.0):
+        self.dist_dir = os.path.abspath(dist_dir)
+        self.max_cached_file = max_cached_file
+        self.max_cache_bytes = max_cache_bytes
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._index_signature = None
+        self._last_check = 0.0
+        self.cached_bytes = 0
+        self.hits = 0
+        self.not_modified = 0
+        self.scan()
+
+    # ---- 索引 ----
+
+    def _index_stat(self):
+        try:
+            stat = os.stat(os.path.join(self.dist_dir, self.INDEX))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_entry(self, rel_path, budget):
+        path = os.path.join(self.dist_dir, rel_path)
+        stat = os.stat(path)
+        immutable = HASHED_NAME_PATTERN.search(rel_path) is not None
+        variants = {}
+        for suffix, encoding in ENCODINGS:
+            if os.path.exists(path + suffix):
+                variants[encoding] = path + suffix
+
+        total = stat.st_size + sum(os.path.getsize(variant) for variant in variants.values())
+        cache = total <= self.max_cached_file and total <= budget
+
+        if cache or stat.st_size <= self.max_cached_file:
+            with open(path, 'rb') as f:
+                data = f.read()
+            etag = hashlib.sha1(data).hexdigest()[:20]
+        else:
+            data = None
+            etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+        bodies = {None: data if cache else None}
+        for encoding, variant_path in variants.items():
+            if cache:
+                with open(variant_path, 'rb') as f:
+                    bodies[encoding] = f.read()
+            else:
+                bodies[encoding] = None
+
+        return {
+            'path': path,
+            'variants': variants,
+            'bodies': bodies,
+            'etag': etag,
+            'content_type': content_type_for(rel_path),
+            'cache_control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            'size': stat.st_size
+        }, (total if cache else 0)
+
+    def scan(self):
+        """重新索引 dist 目录（目录不存在时索引为空）"""
+        entries = {}
+        cached_bytes = 0
+        if os.path.isdir(self.dist_dir):
+            for directory, _, files in os.walk(self.dist_dir):
+                for name in files:
+                    if name.endswith(('.br', '.gz', '.tmp')):
+                        continue
+                    rel_path = os.path.relpath(os.path.join(directory, name), self.dist_dir).replace(os.sep, '/')
+                    try:
+                        entry, used = self._read_entry(rel_path, self.max_cache_bytes - cached_bytes)
+                    except OSError:
+                        continue
+                    entries[rel_path] = entry
+                    cached_bytes += used
+
+        with self._lock:
+            self._entries = entries
+            self.cached_bytes = cached_bytes
+            self._index_signature = self._index_stat()
+            self._last_check = time.monotonic()
+        return len(entries)
+
+    def maybe_refresh(self):
+        """前端重新构建（index.html 变化）后重新索引"""
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return
+        self._last_check = now
+        if self._index_stat() != self._index_signature:
+            print(f"🔄 前端文件已变化，重新索引 {self.dist_dir}")
+            self.scan()
+
+    @property
+    def built(self):
+        return self.INDEX in self._entries
+
+    def lookup(self, rel_path):
+        """按请求路径查找文件；不存在且不是静态资源目录下的路径时回退到 index.html（SPA路由）"""
+        self.maybe_refresh()
+        rel_path = (rel_path or '').lstrip('/')
+        entry = self._entries.get(rel_path or self.INDEX)
+        if entry is None and not rel_path.startswith('assets/'):
+            entry = self._entries.get(self.INDEX)
+        return entry
+
+    # ---- 响应 ----
+
+    @staticmethod
+    def choose_encoding(entry, accept_encodings):
+        """按客户端支持的编码选择预压缩版本（br优先），返回 Content-Encoding 或None"""
+        for _, encoding in ENCODINGS:
+            if encoding in entry['variants'] and accept_encodings.quality(encoding) > 0:
+                return encoding
+        return None
+
+    def response(self, entry, request, response_class):
+        """
+        构建文件响应（If-None-Match 匹配时返回304）
+
+        Args:
+            entry (dict): lookup 返回的索引项
+            request: Flask请求
+            response_class: Flask的Response类
+        """
+        encoding = self.choose_encoding(entry, request.accept_encodings)
+        etag = entry['etag'] + (f'-{encoding}' if encoding else '')
+        headers = {
+            'Cache-Control': entry['cache_control'],
+            'ETag': f'"{etag}"',
+            'Vary': 'Accept-Encoding'
+        }
+
+        if etag in request.if_none_match:
+            self.not_modified += 1
+            return response_class(status=304, headers=headers)
+
+        body = entry['bodies'].get(encoding)
+        if body is None:
+            with open(entry['variants'][encoding] if encoding else entry['path'], 'rb') as f:
+                body = f.read()
+        else:
+            self.hits += 1
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return response_class(body, status=200, headers=headers, content_type=entry['content_type'])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'built': self.built,
+                'files': len(self._entries),
+                'compressedVariants': sum(len(entry['variants']) for entry in self._entries.values()),
+                'cachedBytes': self.cached_bytes,
+                'memoryHits': self.hits,
+                'notModified': self.not_modified
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='为前端构建产物生成预压缩的 .br / .gz 文件')
+    parser.add_argument('dist_dir', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   'frontend', 'dist'))
+    parser.add_argument('--min-size', type=int, default=512, help='小于此大小（字节）的文件不压缩')
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("⚠️ 未安装 brotli，只生成 .gz 文件（pip install brotli）")
+    report = precompress(args.dist_dir, args.min_size)
+    for rel_path, size, sizes in report:
+        variants = '，'.join(f"{suffix} {compressed / 1024:.1f}KB" for suffix, compressed in sorted(sizes.items()))
+        print(f"  {rel_path}: {size / 1024:.1f}KB → {variants or '不压缩'}")
+    print(f"✅ 已处理 {len(report)} 个文件")
+
+
+if __name__ == '__main__':
+    main()
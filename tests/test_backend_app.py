@@ -0,0 +1,74 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """在临时目录中导入后端（results/、任务目录等都创建在这里）"""
+    cwd = os.getcwd()
+    fast_start = os.environ.get('FAST_START')
+    os.chdir(tmp_path_factory.mktemp('backend'))
+    os.environ['FAST_START'] = 'true'
+    sys.path.insert(0, BACKEND_DIR)
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+        if fast_start is None:
+            os.environ.pop('FAST_START', None)
+        else:
+            os.environ['FAST_START'] = fast_start
+
+
+class FakePageArchive:
+    def load(self, content_hash):
+        return '<script>alert(1)</script>' if content_hash == 'abc123' else None
+
+
+class FakeManager:
+    page_archive = FakePageArchive()
+    accounts = {
+        'alice': {'username': 'alice', 'password': 'pw', 'enabled': True},
+        'bob': {'username': 'bob', 'password': 'pw', 'enabled': False}
+    }
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_manager', lambda: FakeManager())
+    monkeypatch.setattr(app_module, 'load_generation', lambda: True)
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('usernames', [[], ['bob'], ['nobody']])
+def test_batch_generate_rejects_usernames_without_enabled_accounts(client, usernames):
+    response = client.post('/api/admin/batch-generate', json={'usernames': usernames})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'usernames 中没有已启用的账号'
+
+
+@pytest.mark.parametrize('concurrency', ['abc', 0, -1, 1.5, True])
+def test_batch_generate_rejects_invalid_concurrency(client, concurrency):
+    response = client.post('/api/admin/batch-generate', json={'concurrency': concurrency})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'concurrency 必须是正整数'
+
+
+def test_archived_page_is_sandboxed(client):
+    response = client.get('/api/admin/pages/abc123')
+    assert response.status_code == 200
+    assert response.headers['Content-Security-Policy'] == 'sandbox'
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+
+
+@pytest.mark.parametrize('path', ['/api', '/api/', '/api/no-such-endpoint', '/api/admin/unknown/path'])
+def test_unknown_api_path_returns_json_404(client, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert response.is_json
+    assert response.get_json()['success'] is False
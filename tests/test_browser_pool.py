@@ -0,0 +1,36 @@
+import pytest
+
+import headless_automation
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def execute_script(self, script):
+        return 'complete'
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = BrowserPool(lambda profile_dir, debugging_port: FakeDriver(), size=1)
+    monkeypatch.setattr(pool, '_is_healthy', lambda browser: True)
+    monkeypatch.setattr(pool, '_reset', lambda browser: None)
+    monkeypatch.setattr(headless_automation, 'get_browser_pool', lambda: pool)
+    yield pool
+    pool.close()
+
+
+@pytest.mark.parametrize('success', [True, False])
+def test_failed_generation_discards_pooled_browser(pool, monkeypatch, success):
+    monkeypatch.setattr(headless_automation.HeadlessAutomation, 'run_headless_automation', lambda self: success)
+
+    result = headless_automation.generate_riding_record('alice', 'pw', mode='selenium')
+
+    assert result['success'] is success
+    assert pool.recycled == (0 if success else 1)
+    assert pool._idle.qsize() == (1 if success else 0)
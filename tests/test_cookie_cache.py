@@ -0,0 +1,58 @@
+import json
+import os
+import time
+
+from cookie_cache import CookieCache
+from results_store import ResultsStore
+
+
+def make_store(tmp_path):
+    return ResultsStore(os.path.join(tmp_path, 'results.db'))
+
+
+def test_set_get_and_invalidate(tmp_path):
+    cache = CookieCache(make_store(tmp_path), ttl=60)
+    cache.set('alice', 'cookie-1')
+    assert cache.get('alice') == 'cookie-1'
+
+    cache.set('alice', 'cookie-2', expires_at=time.time() + 3600)
+    assert cache.get('alice') == 'cookie-2'
+
+    cache.invalidate('alice')
+    assert cache.get('alice') is None
+
+
+def test_expired_cookie_is_not_returned(tmp_path):
+    store = make_store(tmp_path)
+    cache = CookieCache(store, ttl=60)
+    store.set_cookies({'alice': ('stale', time.time() - 120, time.time() - 60)})
+    assert cache.get('alice') is None
+
+
+def test_shared_between_instances(tmp_path):
+    first = CookieCache(make_store(tmp_path))
+    second = CookieCache(make_store(tmp_path))
+    first.set('alice', 'cookie')
+    assert second.get('alice') == 'cookie'
+
+
+def test_imports_unexpired_legacy_entries_once(tmp_path):
+    legacy_file = os.path.join(tmp_path, 'cookies_cache.json')
+    now = time.time()
+    with open(legacy_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'alice': {'cookie': 'valid', 'obtained_at': now, 'expires_at': now + 600},
+            'bob': {'cookie': 'expired', 'obtained_at': now - 900, 'expires_at': now - 300}
+        }, f)
+
+    store = make_store(tmp_path)
+    cache = CookieCache(store, legacy_file=legacy_file)
+    assert cache.get('alice') == 'valid'
+    assert cache.get('bob') is None
+
+    assert not os.path.exists(legacy_file)
+    assert os.path.exists(legacy_file + '.imported')
+
+    cache.invalidate('alice')
+    CookieCache(store, legacy_file=legacy_file)
+    assert cache.get('alice') is None
@@ -0,0 +1,59 @@
+import pytest
+
+from driver_resolver import DriverResolver
+
+
+def make_resolver(monkeypatch, outcome, reprobe_interval=300):
+    resolver = DriverResolver(reprobe_interval=reprobe_interval)
+    calls = []
+
+    def probe():
+        calls.append(1)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(resolver, 'probe', probe)
+    monkeypatch.setattr(resolver, '_valid', lambda resolved: resolved is not None)
+    return resolver, calls
+
+
+def test_failed_probe_is_cached(monkeypatch):
+    resolver, calls = make_resolver(monkeypatch, RuntimeError('未找到可用的 ChromeDriver'))
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match='未找到可用的 ChromeDriver'):
+            resolver.resolve()
+    assert len(calls) == 1
+    assert resolver.stats()['lastProbeError'] == '未找到可用的 ChromeDriver'
+
+
+def test_failed_probe_is_retried_after_interval(monkeypatch):
+    resolver, calls = make_resolver(monkeypatch, RuntimeError('未找到可用的 ChromeDriver'), reprobe_interval=0)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            resolver.resolve()
+    assert len(calls) == 2
+
+
+def test_invalidate_after_recent_probe_is_refused(monkeypatch):
+    resolved = {'driverPath': '/usr/bin/chromedriver', 'driverVersion': '120.0.6099.224', 'browserVersion': None}
+    resolver, calls = make_resolver(monkeypatch, resolved)
+
+    assert resolver.resolve() is resolved
+    # 刚探测过：启动失败时不再重新探测
+    assert resolver.invalidate() is False
+    assert resolver.resolve() is resolved
+    assert len(calls) == 1
+
+
+def test_invalidate_without_probe_in_this_process(monkeypatch):
+    resolved = {'driverPath': '/usr/bin/chromedriver', 'driverVersion': '120.0.6099.224', 'browserVersion': None}
+    resolver, calls = make_resolver(monkeypatch, resolved)
+    # 缓存来自磁盘（其他进程探测的结果）时允许丢弃并重新探测
+    resolver._resolved = resolved
+
+    assert resolver.invalidate() is True
+    assert resolver.resolve() is resolved
+    assert len(calls) == 1
@@ -0,0 +1,50 @@
+import pytest
+
+from headless_automation import HeadlessAutomation
+
+
+class FakeElement:
+    def clear(self):
+        pass
+
+    def send_keys(self, value):
+        pass
+
+    def click(self):
+        pass
+
+
+class FakeDriver:
+    current_url = 'https://orange-system.jr-central.co.jp/user/login?redirect=true'
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, value):
+        return FakeElement()
+
+    def execute_script(self, script, *args):
+        return True
+
+
+def make_automation(monkeypatch, timed_out_step):
+    automation = HeadlessAutomation('alice', 'pw', driver=FakeDriver())
+    monkeypatch.setattr(automation, 'wait_for', lambda step, condition: step != timed_out_step)
+    return automation
+
+
+@pytest.mark.parametrize('step', ['login_page', 'login_redirect'])
+def test_login_fails_when_wait_times_out(monkeypatch, capsys, step):
+    automation = make_automation(monkeypatch, step)
+    assert automation.perform_login() is False
+    assert '❌ 登录失败' in capsys.readouterr().out
+
+
+def test_login_succeeds_when_all_waits_pass(monkeypatch):
+    assert make_automation(monkeypatch, None).perform_login() is True
+
+
+def test_automation_stops_when_story_page_times_out(monkeypatch, capsys):
+    automation = make_automation(monkeypatch, 'story_page')
+    assert automation.execute_complete_automation() is False
+    assert '语音页面未加载完成' in capsys.readouterr().out
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+import requests
+
+from http_client import CircuitBreaker, CircuitOpenError, HostRateLimiter, OutboundClient
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按顺序返回预设的结果（异常实例会被抛出）"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def make_client():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    return OutboundClient(limiter=HostRateLimiter(rate=0), breaker=breaker, max_retries=0), breaker
+
+
+def test_half_open_probe_throttled_with_429_closes_circuit():
+    client, breaker = make_client()
+    url = 'http://mock.test/page'
+    session = FakeSession([requests.ConnectionError('down'), 429, 200])
+
+    with pytest.raises(requests.ConnectionError):
+        client.request(session, 'GET', url)
+    assert breaker.states()['mock.test'] == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        client.request(session, 'GET', url)
+
+    time.sleep(0.06)
+    # 半开状态的探测请求返回429：主机有响应，熔断关闭
+    assert client.request(session, 'GET', url).status_code == 429
+    assert breaker.states()['mock.test'] == CircuitBreaker.CLOSED
+
+    assert client.request(session, 'GET', url).status_code == 200
+    assert session.calls == 3
+
+
+def test_half_open_probe_failure_reopens_circuit():
+    client, breaker = make_client()
+    url = 'http://mock.test/page'
+    session = FakeSession([requests.ConnectionError('down'), 502])
+
+    with pytest.raises(requests.ConnectionError):
+        client.request(session, 'GET', url)
+    time.sleep(0.06)
+    assert client.request(session, 'GET', url).status_code == 502
+    assert breaker.states()['mock.test'] == CircuitBreaker.OPEN
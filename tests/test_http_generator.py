@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from http_generator import SURVEY_ANSWERS, SURVEY_ID, HttpSurveyGenerator
+from mock_server import SURVEY_QUESTION_IDS, SURVEY_SUBMIT_PATH, mock_env, start_mock_server
+
+
+@pytest.fixture
+def mock_site(tmp_path, monkeypatch):
+    server, base_url = start_mock_server()
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('results')
+    for key, value in mock_env(base_url).items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.delenv('SURVEY_SUBMIT_URL', raising=False)
+    monkeypatch.setenv('HOST_RATE_LIMIT', '0')
+    monkeypatch.setenv('RESULTS_EXPORT_INTERVAL', '0')
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def manager(tmp_path, mock_site):
+    from multi_account_certificate_manager import MultiAccountRidingRecordManager
+
+    config_path = os.path.join(tmp_path, 'accounts_config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'accounts': {'alice': {'username': 'alice', 'password': 'password', 'enabled': True}}}, f)
+    return MultiAccountRidingRecordManager(config_path)
+
+
+def test_generate_submits_parsed_survey_form(mock_site, manager, monkeypatch):
+    submitted = []
+    request = manager._request
+
+    def recording_request(session, method, url, **kwargs):
+        if method == 'POST' and url.endswith(SURVEY_SUBMIT_PATH):
+            submitted.append((url, kwargs['data'], kwargs['headers']))
+        return request(session, method, url, **kwargs)
+
+    monkeypatch.setattr(manager, '_request', recording_request)
+
+    result = HttpSurveyGenerator(manager).generate('alice', 'password')
+
+    assert result['success'], result
+    assert 'alice' in mock_site.state.generated
+    assert len(submitted) == 1
+
+    url, payload, headers = submitted[0]
+    # 提交地址取自问卷表单的 action
+    assert url.endswith(SURVEY_SUBMIT_PATH)
+    # 表单隐藏字段原样提交，CSRF令牌同时放在请求头中
+    assert payload['surveyId'] == SURVEY_ID
+    assert payload['_token'] and headers['X-CSRF-TOKEN'] == payload['_token']
+    # 问卷答案按表单中元素ID对应的字段名提交
+    answers = dict(SURVEY_ANSWERS)
+    for i, question_id in enumerate(SURVEY_QUESTION_IDS):
+        assert payload[f'answers[{i}]'] == answers[question_id]
+
+
+def test_generate_fails_without_survey_form(mock_site, manager):
+    mock_site.state.config.survey_form = False
+
+    result = HttpSurveyGenerator(manager).generate('alice', 'password')
+
+    assert not result['success']
+    assert result['message'] == '未找到问卷提交地址'
+    assert 'alice' not in mock_site.state.generated
+
+
+def test_generate_requires_survey_settings(manager, monkeypatch):
+    monkeypatch.delenv('SURVEY_FORM_URL')
+
+    result = HttpSurveyGenerator(manager).generate('alice', 'password')
+
+    assert not result['success']
+    assert 'SURVEY_FORM_URL' in result['message']
@@ -0,0 +1,25 @@
+import json
+import os
+import threading
+
+from job_queue import JobQueue
+
+
+def test_concurrent_persist_of_same_job(tmp_path, capsys):
+    queue = JobQueue(str(tmp_path), heartbeat_interval=60)
+    job = {'id': 'job-1', 'status': 'running', 'progress': 0}
+
+    def writer(n):
+        for i in range(50):
+            queue._persist(dict(job, progress=n * 100 + i))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert '保存任务状态失败' not in capsys.readouterr().out
+    with open(os.path.join(tmp_path, 'job-1.json'), encoding='utf-8') as f:
+        assert json.load(f)['id'] == 'job-1'
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]